@@ -0,0 +1,215 @@
+"""
+Extraction throughput of the worker: thread pool vs process pool.
+
+Extracts a mixed corpus (PDF, DOCX, CSV and, when tesseract is installed,
+PNG) with N threads calling extraction.extract_file directly
+(EXTRACTION_MODE=thread) and with N threads handing files to an
+ExtractionPool of N processes (EXTRACTION_MODE=process), for N = 1, 2, 4 ...
+up to the usable CPUs. Reports files/s and the speed-up over N=1.
+
+    python benchmarks/bench_extraction_pool.py [--files 120] [--pdf-pages 40]
+    python benchmarks/bench_extraction_pool.py --corpus /path/to/samples
+
+Needs the worker's requirements (PyPDF2, python-docx, pandas, pillow,
+pytesseract). With --corpus, files are typed by extension.
+"""
+import argparse
+import os
+import shutil
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(ROOT, "worker"))
+
+import extraction  # noqa: E402
+
+MIME_TYPES = {
+    ".pdf": "application/pdf",
+    ".png": "image/png",
+    ".jpg": "image/jpeg",
+    ".jpeg": "image/jpeg",
+    ".docx": "application/vnd.openxmlformats-officedocument.wordprocessingml.document",
+    ".csv": "text/csv",
+}
+WORDS = (
+    "invoice total supplier quantum tunnelling question marks section answer "
+    "research abstract method result table figure payment due amount"
+).split()
+
+
+def _line(i: int) -> str:
+    return " ".join(WORDS[(i * 7 + j) % len(WORDS)] for j in range(12))
+
+
+# ---- corpus ----
+def write_pdf(path: str, pages: int):
+    """Plain PDF with one text line per row, built by hand (no PDF writer needed)."""
+    objects = [
+        b"<< /Type /Catalog /Pages 2 0 R >>",
+        None,  # pages, filled in below
+        b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>",
+    ]
+    kids = []
+    for p in range(pages):
+        lines = "".join(
+            f"BT /F1 9 Tf 40 {800 - 14 * row} Td ({_line(p * 50 + row)}) Tj ET\n"
+            for row in range(50)
+        ).encode()
+        objects.append(b"<< /Length %d >>\nstream\n%s\nendstream" % (len(lines), lines))
+        content_id = len(objects)
+        objects.append(
+            b"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 595 842] "
+            b"/Resources << /Font << /F1 3 0 R >> >> /Contents %d 0 R >>" % content_id
+        )
+        kids.append(len(objects))
+    objects[1] = b"<< /Type /Pages /Kids [%s] /Count %d >>" % (
+        b" ".join(b"%d 0 R" % k for k in kids),
+        len(kids),
+    )
+
+    out = bytearray(b"%PDF-1.4\n")
+    offsets = []
+    for i, body in enumerate(objects, start=1):
+        offsets.append(len(out))
+        out += b"%d 0 obj\n%s\nendobj\n" % (i, body)
+    xref = len(out)
+    out += b"xref\n0 %d\n0000000000 65535 f \n" % (len(objects) + 1)
+    out += b"".join(b"%010d 00000 n \n" % o for o in offsets)
+    out += b"trailer\n<< /Size %d /Root 1 0 R >>\nstartxref\n%d\n%%%%EOF\n" % (
+        len(objects) + 1,
+        xref,
+    )
+    with open(path, "wb") as f:
+        f.write(out)
+
+
+def write_docx(path: str, paragraphs: int):
+    document = extraction.docx.Document()
+    for i in range(paragraphs):
+        document.add_paragraph(_line(i))
+    document.save(path)
+
+
+def write_csv(path: str, rows: int):
+    with open(path, "w") as f:
+        f.write("id,supplier,amount,note\n")
+        for i in range(rows):
+            f.write(f"{i},{WORDS[i % len(WORDS)]},{i * 3.5:.2f},{_line(i)}\n")
+
+
+def write_png(path: str):
+    from PIL import ImageDraw
+
+    img = extraction.Image.new("RGB", (1200, 500), "white")
+    draw = ImageDraw.Draw(img)
+    for row in range(12):
+        draw.text((20, 20 + 38 * row), _line(row), fill="black")
+    img.save(path)
+
+
+def has_tesseract() -> bool:
+    try:
+        extraction.pytesseract.get_tesseract_version()
+        return True
+    except Exception:
+        return False
+
+
+def build_corpus(directory: str, files: int, pdf_pages: int) -> list[tuple[str, str]]:
+    kinds = ["pdf", "pdf", "docx", "csv"] + (["png"] if has_tesseract() else [])
+    corpus = []
+    for i in range(files):
+        kind = kinds[i % len(kinds)]
+        path = os.path.join(directory, f"sample-{i}.{kind}")
+        if kind == "pdf":
+            write_pdf(path, pdf_pages)
+        elif kind == "docx":
+            write_docx(path, 400)
+        elif kind == "csv":
+            write_csv(path, 2000)
+        else:
+            write_png(path)
+        corpus.append((path, MIME_TYPES["." + kind]))
+    return corpus
+
+
+def load_corpus(directory: str) -> list[tuple[str, str]]:
+    corpus = []
+    for name in sorted(os.listdir(directory)):
+        mime = MIME_TYPES.get(os.path.splitext(name)[1].lower())
+        if mime:
+            corpus.append((os.path.join(directory, name), mime))
+    if not corpus:
+        sys.exit(f"no files with a known extension in {directory}")
+    return corpus
+
+
+# ---- runs ----
+def run(corpus, workers: int, mode: str) -> float:
+    """Seconds to extract the corpus with `workers` threads (and processes)."""
+    pool = None
+    extract = extraction.extract_file
+    if mode == "process":
+        pool = extraction.ExtractionPool(workers)
+        pool.start()  # warm processes, as the worker does at startup
+        extract = pool.run
+    try:
+        start = time.perf_counter()
+        with ThreadPoolExecutor(workers) as executor:
+            results = list(executor.map(lambda item: extract(*item), corpus))
+        elapsed = time.perf_counter() - start
+    finally:
+        if pool is not None:
+            pool.shutdown()
+    assert len(results) == len(corpus)
+    return elapsed
+
+
+def worker_counts(limit: int) -> list[int]:
+    counts, n = [], 1
+    while n < limit:
+        counts.append(n)
+        n *= 2
+    return counts + [limit]
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--corpus", help="directory of sample files (default: generated)")
+    parser.add_argument("--files", type=int, default=120)
+    parser.add_argument("--pdf-pages", type=int, default=40)
+    parser.add_argument("--max-workers", type=int, default=extraction.EXTRACTION_PROCESSES)
+    args = parser.parse_args()
+
+    tmpdir = None
+    if args.corpus:
+        corpus = load_corpus(args.corpus)
+    else:
+        tmpdir = tempfile.mkdtemp(prefix="extraction-bench-")
+        corpus = build_corpus(tmpdir, args.files, args.pdf_pages)
+    kinds = sorted({os.path.splitext(path)[1] for path, _ in corpus})
+    print(f"{len(corpus)} files ({', '.join(kinds)}), "
+          f"{extraction._usable_cpus()} usable CPUs\n")
+
+    try:
+        extraction.extract_file(*corpus[0])  # imports / caches outside the timings
+        print(f"{'workers':>7} {'threads f/s':>12} {'x':>6} {'processes f/s':>14} {'x':>6}")
+        base = {}
+        for n in worker_counts(args.max_workers):
+            row = [f"{n:>7}"]
+            for mode in ("thread", "process"):
+                rate = len(corpus) / run(corpus, n, mode)
+                base.setdefault(mode, rate)
+                width = 12 if mode == "thread" else 14
+                row.append(f"{rate:>{width}.1f} {rate / base[mode]:>5.2f}x")
+            print(" ".join(row))
+    finally:
+        if tmpdir:
+            shutil.rmtree(tmpdir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
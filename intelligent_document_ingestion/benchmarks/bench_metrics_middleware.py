@@ -0,0 +1,76 @@
+"""
+Per-request overhead of observability.MetricsMiddleware.
+
+Drives a minimal ASGI app directly (no HTTP server, no FastAPI routing) with
+and without the middleware and reports the difference per request.
+
+    python benchmarks/bench_metrics_middleware.py [--requests 200000]
+"""
+import argparse
+import asyncio
+import os
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(ROOT, "file-processing-backend"))
+
+import metrics  # noqa: E402
+from observability import MetricsMiddleware  # noqa: E402
+
+
+class _Route:
+    path = "/api/v1/uploads/{file_id}/status"
+
+
+ROUTE = _Route()
+START = {"type": "http.response.start", "status": 200, "headers": [(b"content-type", b"application/json")]}
+BODY = {"type": "http.response.body", "body": b'{"status":"completed"}'}
+
+
+async def endpoint(scope, receive, send):
+    scope["route"] = ROUTE  # what the router does once it matched
+    await send(START)
+    await send(BODY)
+
+
+async def receive():
+    return {"type": "http.request", "body": b"", "more_body": False}
+
+
+async def send(message):
+    pass
+
+
+async def drive(app, n: int) -> float:
+    start = time.perf_counter()
+    for _ in range(n):
+        scope = {"type": "http", "method": "GET", "path": "/api/v1/uploads/abc/status"}
+        await app(scope, receive, send)
+    return time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--requests", type=int, default=200_000)
+    parser.add_argument("--rounds", type=int, default=5)
+    args = parser.parse_args()
+
+    wrapped = MetricsMiddleware(endpoint)
+    base, instrumented = [], []
+    for _ in range(args.rounds):
+        base.append(asyncio.run(drive(endpoint, args.requests)))
+        instrumented.append(asyncio.run(drive(wrapped, args.requests)))
+
+    per_req = lambda seconds: min(seconds) / args.requests * 1e6  # noqa: E731
+    print(f"bare app          {per_req(base):7.2f} us/request")
+    print(f"with middleware   {per_req(instrumented):7.2f} us/request")
+    print(f"overhead          {per_req(instrumented) - per_req(base):7.2f} us/request")
+
+    start = time.perf_counter()
+    text = metrics.render_prometheus()
+    print(f"render /metrics   {(time.perf_counter() - start) * 1e3:7.2f} ms ({len(text)} bytes)")
+
+
+if __name__ == "__main__":
+    main()
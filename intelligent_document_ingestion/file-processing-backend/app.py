@@ -1,3 +1,5 @@
+import base64
+import hashlib
 import json
 import os
 import uuid
@@ -6,15 +8,46 @@ from datetime import datetime
 import boto3
 import redis
 from dotenv import load_dotenv
-from fastapi import FastAPI, HTTPException, Body, Depends, status
+from fastapi import FastAPI, HTTPException, Body, Depends, Header, Query, Request, Response, status
+from fastapi.concurrency import run_in_threadpool
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import PlainTextResponse, StreamingResponse
 from fastapi.security import OAuth2PasswordRequestForm
-from pydantic import BaseModel
-from sqlalchemy import Column, String, DateTime, Text, Integer, JSON as SAJSON
+from pydantic import BaseModel, Field
+from sqlalchemy import (
+    Column, String, DateTime, Text, Integer, Index, and_, cast, func, literal_column,
+    select, tuple_, type_coerce, JSON as SAJSON,
+)
+from sqlalchemy.dialects.postgresql import JSONB
 from sqlalchemy.orm import Session
 
-from config import Base, S3_BUCKET_NAME, AWS_REGION, engine, s3_client, SessionLocal
-from helper import get_db, build_s3_key
+from config import (
+    Base,
+    BACKEND_IO_MODE,
+    S3_BUCKET_NAME,
+    AWS_REGION,
+    SEARCH_TS_CONFIG,
+    engine,
+    replica_engine,
+    LazyClient,
+    s3_client,
+    SessionLocal,
+)
+from events import StatusEventBus, TERMINAL_STATUSES
+from helper import get_db, get_read_db, build_s3_key, etag_matches
+import bootstrap
+import idempotency
+import metrics
+import outbox
+import passwords
+import purge
+import rate_limit
+from observability import MetricsMiddleware, instrument_engine
+from replicas import read_router
+from presign_cache import PresignedUrlCache, SIGN_SECONDS as S3_PRESIGN_SECONDS
+from responses import CompressionMiddleware, FastJSONResponse
+from sqs_publisher import SqsBatchPublisher, SqsPublishTimeout
+from status_cache import StatusCache, Uncached, status_entry
 from user import (
     User,
     get_current_user,
@@ -25,8 +58,10 @@ from user import (
     AdminUserResponse,
     AdminUpdateUserRequest,
     get_user_by_username,
-    verify_password,
+    user_cache,
     hash_password,
+    hash_password_async,
+    verify_password_async,
     create_access_token,
 )
 
@@ -46,10 +81,41 @@ class Document(Base):
     completed_time = Column(DateTime, nullable=True)
     s3_key = Column(String)
     error = Column(Text, nullable=True)
-    extracted_metadata = Column(SAJSON, nullable=True)  # flexible for demo
+    # JSONB on Postgres (GIN-indexed for search), JSON elsewhere
+    extracted_metadata = Column(SAJSON().with_variant(JSONB(), "postgresql"), nullable=True)
+    # copy of extracted_metadata["documentType"], the common search filter
+    document_type = Column(String, nullable=True)
+    multipart_upload_id = Column(String, nullable=True)  # set while a multipart upload is open
+    # bumped on every ORM update (here and in the worker); drives the ETags
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    # hex SHA-256 of the uploaded bytes: sent by the client or set by the worker
+    content_sha256 = Column(String(64), nullable=True)
+
+
+# Serves the history listings: newest-first per user, keyset on (upload_time, file_id)
+Index(
+    "ix_documents_user_upload_time",
+    Document.user_id,
+    Document.upload_time.desc(),
+    Document.file_id.desc(),
+)
 
+# Search fast path: a user's documents of one type, newest first
+Index(
+    "ix_documents_user_type_upload_time",
+    Document.user_id,
+    Document.document_type,
+    Document.upload_time.desc(),
+)
 
-Base.metadata.create_all(bind=engine)
+# Dedup lookups: a user's completed documents by content hash
+Index(
+    "ix_documents_user_sha256_completed",
+    Document.user_id,
+    Document.content_sha256,
+    postgresql_where=Document.status == "completed",
+    sqlite_where=Document.status == "completed",
+)
 
 # ======== Pydantic Schemas ========
 class UploadRequest(BaseModel):
@@ -57,15 +123,79 @@ class UploadRequest(BaseModel):
     fileName: str
     fileSize: int
     fileType: str
+    # optional hex SHA-256 of the file, enables deduplication
+    sha256: str | None = Field(None, pattern="^[0-9a-fA-F]{64}$")
 
 
 class UploadResponse(BaseModel):
     fileId: str
-    uploadUrl: str
+    # None when uploadRequired is False: the file was already processed
+    uploadUrl: str | None = None
     uploadMethod: str = "PUT"
     headers: dict
     expiresIn: int
     s3Key: str
+    uploadRequired: bool = True
+    deduplicatedFrom: str | None = None
+
+
+class BatchUploadRequest(BaseModel):
+    files: list[UploadRequest]
+
+
+class BatchUploadItem(BaseModel):
+    fileName: str
+    code: int  # 200, or 500 when presigning this file failed
+    data: UploadResponse | None = None
+    detail: str | None = None
+
+
+class BatchUploadResponse(BaseModel):
+    results: list[BatchUploadItem]
+
+
+class MultipartInitiateRequest(UploadRequest):
+    partSize: int | None = None  # bytes, default MULTIPART_PART_SIZE
+
+
+class MultipartInitiateResponse(BaseModel):
+    fileId: str
+    uploadId: str
+    s3Key: str
+    partSize: int
+    partCount: int
+
+
+class MultipartPartsRequest(BaseModel):
+    uploadId: str
+    partNumbers: list[int]
+
+
+class MultipartPartUrl(BaseModel):
+    partNumber: int
+    uploadUrl: str
+
+
+class MultipartPartsResponse(BaseModel):
+    uploadId: str
+    expiresIn: int
+    parts: list[MultipartPartUrl]
+
+
+class MultipartPart(BaseModel):
+    partNumber: int
+    eTag: str
+    size: int | None = None
+
+
+class MultipartCompleteRequest(BaseModel):
+    uploadId: str
+    # omit to complete with every part S3 has received
+    parts: list[MultipartPart] | None = None
+
+
+class MultipartAbortRequest(BaseModel):
+    uploadId: str
 
 
 class StatusResponse(BaseModel):
@@ -74,10 +204,26 @@ class StatusResponse(BaseModel):
     message: str
     metadata: dict | None = None
     downloadUrl: str | None = None
+    downloadUrlExpiresAt: datetime | None = None
     lastUpdated: datetime | None = None
     error: str | None = None
 
 
+class BatchStatusRequest(BaseModel):
+    fileIds: list[str]
+
+
+class BatchStatusItem(BaseModel):
+    fileId: str
+    code: int  # 200 or 404, reported per item
+    data: StatusResponse | None = None
+    detail: str | None = None
+
+
+class BatchStatusResponse(BaseModel):
+    results: list[BatchStatusItem]
+
+
 class UploadCompleteRequest(BaseModel):
     fileId: str
 
@@ -95,51 +241,116 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Next-Cursor", "ETag"],
 )
+app.add_middleware(CompressionMiddleware)
+# added last = outermost, so latencies include the other middleware
+app.add_middleware(MetricsMiddleware)
+instrument_engine(engine)
+if replica_engine is not None:
+    instrument_engine(replica_engine, "replica")
 
 # ======== Optional Redis (for status caching) ========
 REDIS_HOST = os.getenv("REDIS_HOST")
 REDIS_PORT = int(os.getenv("REDIS_PORT", "6379"))
+# Built without connecting (redis-py connects on first command); the
+# startup hook checks it and falls back to no cache when it's unreachable.
 redis_client: redis.Redis | None = None
-
 if REDIS_HOST:
+    redis_client = redis.Redis(
+        host=REDIS_HOST,
+        port=REDIS_PORT,
+        decode_responses=True,
+        socket_connect_timeout=float(os.getenv("REDIS_CONNECT_TIMEOUT", "2")),
+    )
+
+# write-through status cache shared with the worker (see status_cache.py)
+status_cache = StatusCache(redis_client)
+# signed download URLs, reused until shortly before they expire
+presigned_urls = PresignedUrlCache(
+    lambda **kwargs: s3_client.generate_presigned_url(**kwargs), redis_client
+)
+# first responses of Idempotency-Key requests (see idempotency.py)
+idempotency_store = idempotency.IdempotencyStore(redis_client)
+
+# ======== Status events (SSE push instead of polling) ========
+status_events = StatusEventBus(redis_client, REDIS_HOST, REDIS_PORT)
+MAX_STREAM_FILE_IDS = int(os.getenv("STATUS_STREAM_MAX_FILE_IDS", "100"))
+STREAM_KEEPALIVE_SECONDS = float(os.getenv("STATUS_STREAM_KEEPALIVE_SECONDS", "15"))
+# Without Redis pub/sub (not configured, or failed mid-stream) the worker's
+# transitions can't reach us, so re-check the status cache (the DB on a
+# miss) at this (slow) interval while the stream is idle.
+STREAM_FALLBACK_POLL_SECONDS = float(
+    os.getenv("STATUS_STREAM_FALLBACK_POLL_SECONDS", "5")
+)
+
+# ======== Rate limiting (see rate_limit.py) ========
+rate_limit.limiter.redis_client = redis_client
+POLL_LIMIT = [Depends(rate_limit.rate_limit("poll"))]
+UPLOAD_LIMIT = [Depends(rate_limit.rate_limit("upload"))]
+ADMIN_LIMIT = [Depends(rate_limit.rate_limit("admin"))]
+
+@app.on_event("startup")
+def init_database():
+    if bootstrap.AUTO_INIT_DB:
+        bootstrap.bootstrap()
+
+
+@app.on_event("startup")
+def connect_redis():
+    global redis_client
+    if redis_client is None:
+        return
     try:
-        redis_client = redis.Redis(
-            host=REDIS_HOST,
-            port=REDIS_PORT,
-            decode_responses=True,
-        )
-        # Simple ping check
         redis_client.ping()
         print(f"[APP] Connected to Redis at {REDIS_HOST}:{REDIS_PORT}")
     except Exception as e:
         print("[APP] Redis unavailable, running without cache:", e)
         redis_client = None
+        status_cache.redis_client = None
+        presigned_urls.redis_client = None
+        status_events.redis_client = None
+        rate_limit.limiter.redis_client = None
+        idempotency_store.redis_client = None
+        return
+    # drop cached users on every replica when one of them changes a user
+    user_cache.attach_redis(redis_client)
+
+
+@app.on_event("startup")
+def warm_password_pool():
+    # spawn the Argon2 workers before the first login burst
+    passwords.warm_up()
+
+
+@app.on_event("shutdown")
+def stop_password_pool():
+    passwords.shutdown()
+
 
 # ======== Routes ========
 
 
-@app.post("/api/v1/uploads/request", response_model=UploadResponse)
-def request_upload(
-    payload: UploadRequest = Body(...),
-    current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db),
-):
+# Simple allowlist
+ALLOWED_FILE_TYPES = [
+    "application/pdf",
+    "image/jpeg",
+    "image/png",
+    "text/csv",
+    "application/vnd.openxmlformats-officedocument.wordprocessingml.document",
+    "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+]
+UPLOAD_URL_EXPIRES_IN = 1800  # 30 min
+
+
+def _validate_upload(payload: UploadRequest):
     if payload.fileSize <= 0:
         raise HTTPException(status_code=400, detail="Invalid file size")
-
-    # Simple allowlist
-    allowed = [
-        "application/pdf",
-        "image/jpeg",
-        "image/png",
-        "text/csv",
-        "application/vnd.openxmlformats-officedocument.wordprocessingml.document",
-        "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
-    ]
-    if payload.fileType not in allowed:
+    if payload.fileType not in ALLOWED_FILE_TYPES:
         raise HTTPException(status_code=400, detail="Unsupported file type")
 
+
+def _new_document(payload: UploadRequest, user_id: str) -> Document:
     file_id = str(uuid.uuid4())
     # get extension from filename
     if "." in payload.fileName:
@@ -147,34 +358,142 @@ def request_upload(
     else:
         extension = "bin"
 
-    s3_key = build_s3_key(payload.userId, file_id, extension)
-
-    # Create DB record
-    doc = Document(
+    return Document(
         file_id=file_id,
-        user_id=current_user.user_id,  # use logged-in user
+        user_id=user_id,  # use logged-in user
         file_name=payload.fileName,
         file_type=payload.fileType,
         file_size=payload.fileSize,
         status="pending",
-        s3_key=s3_key,
+        s3_key=build_s3_key(payload.userId, file_id, extension),
         upload_time=datetime.utcnow(),
+        content_sha256=payload.sha256.lower() if payload.sha256 else None,
     )
-    db.add(doc)
-    db.commit()
 
-    # Presigned URL
-    expires_in = 1800  # 30 min
-    try:
+
+# ======== Content-hash deduplication ========
+# When the request carries a SHA-256 and the same user already has a
+# completed document with that hash, the new document is completed on the
+# spot from the earlier one's metadata and S3 object: no PUT, no job.
+# Matches are per user, so a hash alone never reveals someone else's
+# document. The worker records the hash for clients that don't send one.
+
+def _duplicates_select(user_id: str, hashes: list[str]):
+    """Completed documents of `user_id` with one of `hashes`, newest first."""
+    return (
+        select(Document)
+        .where(
+            Document.user_id == user_id,
+            Document.content_sha256.in_(hashes),
+            Document.status == "completed",
+        )
+        .order_by(Document.completed_time.desc())
+    )
+
+
+def _newest_by_hash(docs) -> dict[str, Document]:
+    found = {}
+    for d in docs:
+        found.setdefault(d.content_sha256, d)
+    return found
+
+
+def _find_duplicates(db: Session, user_id: str, hashes: list[str]) -> dict[str, Document]:
+    """{sha256: newest completed document of `user_id` with that content}"""
+    hashes = [h for h in hashes if h]
+    if not hashes:
+        return {}
+    return _newest_by_hash(db.execute(_duplicates_select(user_id, hashes)).scalars())
+
+
+def _complete_from_duplicate(doc: Document, source: Document):
+    doc.status = "completed"
+    doc.completed_time = datetime.utcnow()
+    doc.s3_key = source.s3_key  # shared object, see _s3_object_shared
+    doc.document_type = source.document_type
+    doc.extracted_metadata = {
+        **(source.extracted_metadata or {}),
+        "deduplicatedFrom": source.file_id,
+    }
+
+
+def _deduplicated_response(doc: Document) -> UploadResponse:
+    return UploadResponse(
+        fileId=doc.file_id,
+        uploadRequired=False,
+        deduplicatedFrom=doc.extracted_metadata["deduplicatedFrom"],
+        headers={},
+        expiresIn=0,
+        s3Key=doc.s3_key,
+    )
+
+
+def _s3_object_shared(db: Session, doc: Document) -> bool:
+    """Whether another document points at doc's S3 object (deduplicated uploads)."""
+    return (
+        db.query(Document.file_id)
+        .filter(Document.s3_key == doc.s3_key, Document.file_id != doc.file_id)
+        .first()
+        is not None
+    )
+
+
+def _presign_upload(doc: Document) -> UploadResponse:
+    with S3_PRESIGN_SECONDS.labels("put_object").time():
         upload_url = s3_client.generate_presigned_url(
             ClientMethod="put_object",
             Params={
                 "Bucket": S3_BUCKET_NAME,
-                "Key": s3_key,
+                "Key": doc.s3_key,
             },
             HttpMethod="PUT",
-            ExpiresIn=expires_in,
+            ExpiresIn=UPLOAD_URL_EXPIRES_IN,
         )
+    return UploadResponse(
+        fileId=doc.file_id,
+        uploadUrl=upload_url,
+        uploadMethod="PUT",
+        headers={},
+        expiresIn=UPLOAD_URL_EXPIRES_IN,
+        s3Key=doc.s3_key,
+    )
+
+
+@app.post("/api/v1/uploads/request", response_model=UploadResponse, dependencies=UPLOAD_LIMIT)
+def request_upload(
+    payload: UploadRequest = Body(...),
+    current_user: User = Depends(get_current_user),
+    db: Session = Depends(get_db),
+    idempotency_key: str | None = Header(None),
+):
+    return idempotency_store.run(
+        "request_upload",
+        current_user.user_id,
+        idempotency_key,
+        payload,
+        lambda: _request_upload(db, payload, current_user.user_id),
+        ttl=UPLOAD_URL_EXPIRES_IN,
+    )
+
+
+def _request_upload(db: Session, payload: UploadRequest, user_id: str) -> UploadResponse:
+    _validate_upload(payload)
+
+    # Create DB record
+    doc = _new_document(payload, user_id)
+    source = _find_duplicates(db, doc.user_id, [doc.content_sha256]).get(doc.content_sha256)
+    if source is not None:
+        _complete_from_duplicate(doc, source)
+    db.add(doc)
+    db.commit()
+
+    if source is not None:
+        _cache_doc_status(doc)
+        return _deduplicated_response(doc)
+
+    # Presigned URL
+    try:
+        return _presign_upload(doc)
     except Exception as e:
         db.delete(doc)
         db.commit()
@@ -182,96 +501,575 @@ def request_upload(
             status_code=500, detail=f"Failed to create presigned URL: {e}"
         )
 
-    return UploadResponse(
-        fileId=file_id,
-        uploadUrl=upload_url,
-        uploadMethod="PUT",
-        headers={},
-        expiresIn=expires_in,
-        s3Key=s3_key,
-    )
 
+MAX_BATCH_UPLOADS = int(os.getenv("UPLOAD_BATCH_MAX_FILES", "500"))
 
-@app.get("/api/v1/uploads/{file_id}/status", response_model=StatusResponse)
-def get_status(
-    file_id: str,
+
+@app.post(
+    "/api/v1/uploads/request:batch", response_model=BatchUploadResponse, dependencies=UPLOAD_LIMIT
+)
+def request_upload_batch(
+    body: BatchUploadRequest = Body(...),
+    current_user: User = Depends(get_current_user),
     db: Session = Depends(get_db),
 ):
-    # ---- Optional Redis cache ----
-    cache_key = f"status:{file_id}"
-    if redis_client:
+    """
+    request_upload for many files: one transaction for all Document rows,
+    then one presigned PUT per file. Invalid entries reject the whole batch;
+    a file whose presign fails is dropped on its own and reported inline.
+    """
+    if not body.files:
+        raise HTTPException(status_code=400, detail="files is required")
+    if len(body.files) > MAX_BATCH_UPLOADS:
+        raise HTTPException(
+            status_code=400, detail=f"At most {MAX_BATCH_UPLOADS} files per request"
+        )
+
+    invalid = []
+    for i, payload in enumerate(body.files):
+        try:
+            _validate_upload(payload)
+        except HTTPException as e:
+            invalid.append({"index": i, "fileName": payload.fileName, "detail": e.detail})
+    if invalid:
+        raise HTTPException(status_code=400, detail=invalid)
+
+    docs = [_new_document(payload, current_user.user_id) for payload in body.files]
+    sources = _find_duplicates(db, current_user.user_id, list({d.content_sha256 for d in docs}))
+    deduplicated = []
+    for doc in docs:
+        if doc.content_sha256 in sources:
+            _complete_from_duplicate(doc, sources[doc.content_sha256])
+            deduplicated.append(doc)
+    db.add_all(docs)
+    db.commit()
+    if deduplicated:
+        _cache_statuses([_status_entry(d) for d in deduplicated])
+
+    results = []
+    failed_ids = []
+    for doc in docs:
+        if doc in deduplicated:
+            results.append(
+                BatchUploadItem(fileName=doc.file_name, code=200, data=_deduplicated_response(doc))
+            )
+            continue
         try:
-            cached = redis_client.get(cache_key)
-            if cached:
-                data = json.loads(cached)
-                return StatusResponse(**data)
+            results.append(
+                BatchUploadItem(fileName=doc.file_name, code=200, data=_presign_upload(doc))
+            )
         except Exception as e:
-            # don't break if Redis is acting up
-            print("[APP] Redis read error:", e)
+            failed_ids.append(doc.file_id)
+            results.append(
+                BatchUploadItem(
+                    fileName=doc.file_name,
+                    code=500,
+                    detail=f"Failed to create presigned URL: {e}",
+                )
+            )
+
+    if failed_ids:
+        db.query(Document).filter(Document.file_id.in_(failed_ids)).delete(
+            synchronize_session=False
+        )
+        db.commit()
+
+    return BatchUploadResponse(results=results)
 
+
+# ======== Multipart uploads (large files) ========
+# initiate -> presign parts (in parallel, any order) -> complete -> the usual
+# /api/v1/uploads/complete. GET .../parts lists what S3 already has, so a
+# client can resume by re-uploading only the missing parts.
+MULTIPART_PART_SIZE = int(os.getenv("MULTIPART_PART_SIZE", str(16 * 1024 * 1024)))
+MULTIPART_MIN_PART_SIZE = 5 * 1024 * 1024  # S3 minimum for all but the last part
+MULTIPART_MAX_PARTS = 10000
+MULTIPART_PRESIGN_MAX_PARTS = 1000  # per presign call
+MULTIPART_STALE_HOURS = float(os.getenv("MULTIPART_STALE_HOURS", "24"))
+
+
+def _multipart_doc(db: Session, file_id: str, upload_id: str, user: User) -> Document:
     doc = db.query(Document).filter(Document.file_id == file_id).first()
-    if not doc:
+    if not doc or doc.user_id != user.user_id:
         raise HTTPException(status_code=404, detail="fileId not found")
+    if doc.multipart_upload_id != upload_id:
+        raise HTTPException(status_code=409, detail="No such open multipart upload")
+    return doc
+
+
+def _list_uploaded_parts(doc: Document) -> list[MultipartPart]:
+    parts = []
+    marker = 0
+    while True:
+        resp = s3_client.list_parts(
+            Bucket=S3_BUCKET_NAME,
+            Key=doc.s3_key,
+            UploadId=doc.multipart_upload_id,
+            PartNumberMarker=marker,
+        )
+        parts.extend(
+            MultipartPart(partNumber=p["PartNumber"], eTag=p["ETag"], size=p["Size"])
+            for p in resp.get("Parts", [])
+        )
+        if not resp.get("IsTruncated"):
+            return parts
+        marker = resp["NextPartNumberMarker"]
 
-    message_map = {
-        "pending": "File uploaded. Awaiting processing.",
-        "processing": "File is being processed.",
-        "completed": "Processing completed.",
-        "failed": "Processing failed.",
-    }
-    message = message_map.get(doc.status, "Unknown status")
 
-    download_url = None
-    if doc.status == "completed":
-        # give presigned download URL to original file
-        try:
-            download_url = s3_client.generate_presigned_url(
-                ClientMethod="get_object",
-                Params={"Bucket": S3_BUCKET_NAME, "Key": doc.s3_key},
-                ExpiresIn=1800,
-            )
-        except Exception:
-            download_url = None
+@app.post(
+    "/api/v1/uploads/multipart/initiate",
+    response_model=MultipartInitiateResponse,
+    dependencies=UPLOAD_LIMIT,
+)
+def multipart_initiate(
+    payload: MultipartInitiateRequest = Body(...),
+    current_user: User = Depends(get_current_user),
+    db: Session = Depends(get_db),
+):
+    _validate_upload(payload)
+
+    part_size = max(payload.partSize or MULTIPART_PART_SIZE, MULTIPART_MIN_PART_SIZE)
+    # grow parts rather than exceed S3's part count limit
+    min_part_size = -(-payload.fileSize // MULTIPART_MAX_PARTS)
+    part_size = max(part_size, min_part_size)
+    part_count = max(-(-payload.fileSize // part_size), 1)
+
+    doc = _new_document(payload, current_user.user_id)
+    try:
+        resp = s3_client.create_multipart_upload(
+            Bucket=S3_BUCKET_NAME,
+            Key=doc.s3_key,
+            ContentType=payload.fileType,
+        )
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Failed to start multipart upload: {e}")
 
-    resp_obj = StatusResponse(
+    doc.multipart_upload_id = resp["UploadId"]
+    db.add(doc)
+    db.commit()
+
+    return MultipartInitiateResponse(
         fileId=doc.file_id,
-        status=doc.status,
-        message=message,
-        metadata=doc.extracted_metadata,
-        downloadUrl=download_url,
-        lastUpdated=doc.completed_time or doc.upload_time,
-        error=doc.error,
+        uploadId=doc.multipart_upload_id,
+        s3Key=doc.s3_key,
+        partSize=part_size,
+        partCount=part_count,
     )
 
-    # cache for a few seconds to absorb polling load
-    if redis_client:
-        try:
-            payload = (
-                resp_obj.model_dump(mode="json")
-                if hasattr(resp_obj, "model_dump")
-                else resp_obj.dict()
-            )
-            redis_client.set(cache_key, json.dumps(payload), ex=8)
-        except Exception as e:
-            print("[APP] Redis write error:", e)
 
-    return resp_obj
+@app.post(
+    "/api/v1/uploads/multipart/{file_id}/parts",
+    response_model=MultipartPartsResponse,
+    dependencies=UPLOAD_LIMIT,
+)
+def multipart_presign_parts(
+    file_id: str,
+    body: MultipartPartsRequest = Body(...),
+    current_user: User = Depends(get_current_user),
+    db: Session = Depends(get_db),
+):
+    doc = _multipart_doc(db, file_id, body.uploadId, current_user)
 
+    part_numbers = sorted(set(body.partNumbers))
+    if not part_numbers or len(part_numbers) > MULTIPART_PRESIGN_MAX_PARTS:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Request between 1 and {MULTIPART_PRESIGN_MAX_PARTS} parts",
+        )
+    if part_numbers[0] < 1 or part_numbers[-1] > MULTIPART_MAX_PARTS:
+        raise HTTPException(status_code=400, detail="Invalid part number")
+
+    parts = [
+        MultipartPartUrl(
+            partNumber=n,
+            uploadUrl=s3_client.generate_presigned_url(
+                ClientMethod="upload_part",
+                Params={
+                    "Bucket": S3_BUCKET_NAME,
+                    "Key": doc.s3_key,
+                    "UploadId": doc.multipart_upload_id,
+                    "PartNumber": n,
+                },
+                HttpMethod="PUT",
+                ExpiresIn=UPLOAD_URL_EXPIRES_IN,
+            ),
+        )
+        for n in part_numbers
+    ]
+    return MultipartPartsResponse(
+        uploadId=doc.multipart_upload_id, expiresIn=UPLOAD_URL_EXPIRES_IN, parts=parts
+    )
 
-sqs = boto3.client("sqs", region_name=AWS_REGION)
 
+@app.get(
+    "/api/v1/uploads/multipart/{file_id}/parts",
+    response_model=list[MultipartPart],
+    dependencies=UPLOAD_LIMIT,
+)
+def multipart_list_parts(
+    file_id: str,
+    uploadId: str = Query(...),
+    current_user: User = Depends(get_current_user),
+    db: Session = Depends(get_db),
+):
+    """Parts S3 already has, for resuming an interrupted upload."""
+    doc = _multipart_doc(db, file_id, uploadId, current_user)
+    return _list_uploaded_parts(doc)
 
-@app.post("/api/v1/uploads/complete", response_model=UploadCompleteResponse)
-def upload_complete(
-    body: UploadCompleteRequest = Body(...),
+
+@app.post("/api/v1/uploads/multipart/{file_id}/complete", dependencies=UPLOAD_LIMIT)
+def multipart_complete(
+    file_id: str,
+    body: MultipartCompleteRequest = Body(...),
+    current_user: User = Depends(get_current_user),
+    db: Session = Depends(get_db),
+):
+    doc = _multipart_doc(db, file_id, body.uploadId, current_user)
+
+    parts = body.parts if body.parts is not None else _list_uploaded_parts(doc)
+    if not parts:
+        raise HTTPException(status_code=400, detail="No parts uploaded")
+
+    try:
+        s3_client.complete_multipart_upload(
+            Bucket=S3_BUCKET_NAME,
+            Key=doc.s3_key,
+            UploadId=doc.multipart_upload_id,
+            MultipartUpload={
+                "Parts": [
+                    {"PartNumber": p.partNumber, "ETag": p.eTag}
+                    for p in sorted(parts, key=lambda p: p.partNumber)
+                ]
+            },
+        )
+    except Exception as e:
+        # upload stays open so the client can re-send missing parts
+        raise HTTPException(status_code=400, detail=f"Failed to complete upload: {e}")
+
+    doc.multipart_upload_id = None
+    db.commit()
+    return {"message": "Multipart upload assembled", "fileId": doc.file_id}
+
+
+@app.post("/api/v1/uploads/multipart/{file_id}/abort", dependencies=UPLOAD_LIMIT)
+def multipart_abort(
+    file_id: str,
+    body: MultipartAbortRequest = Body(...),
+    current_user: User = Depends(get_current_user),
     db: Session = Depends(get_db),
 ):
-    doc = db.query(Document).filter(Document.file_id == body.fileId).first()
+    doc = _multipart_doc(db, file_id, body.uploadId, current_user)
+    try:
+        s3_client.abort_multipart_upload(
+            Bucket=S3_BUCKET_NAME, Key=doc.s3_key, UploadId=doc.multipart_upload_id
+        )
+    except Exception as e:
+        print("[APP] Multipart abort error:", e)
+
+    db.delete(doc)
+    db.commit()
+    return {"message": "Multipart upload aborted"}
+
+
+def abort_stale_multipart_uploads(older_than_hours: float) -> dict:
+    """
+    Abort multipart uploads under uploads/ started more than
+    `older_than_hours` ago and mark their documents failed. Parts of an
+    unfinished upload are billed until aborted.
+    """
+    cutoff = datetime.utcnow().timestamp() - older_than_hours * 3600
+    aborted = []
+    kwargs = {"Bucket": S3_BUCKET_NAME, "Prefix": "uploads/"}
+    while True:
+        resp = s3_client.list_multipart_uploads(**kwargs)
+        for upload in resp.get("Uploads", []):
+            if upload["Initiated"].timestamp() >= cutoff:
+                continue
+            try:
+                s3_client.abort_multipart_upload(
+                    Bucket=S3_BUCKET_NAME, Key=upload["Key"], UploadId=upload["UploadId"]
+                )
+                aborted.append(upload["UploadId"])
+            except Exception as e:
+                print("[APP] Multipart abort error:", upload["Key"], e)
+        if not resp.get("IsTruncated"):
+            break
+        kwargs["KeyMarker"] = resp["NextKeyMarker"]
+        kwargs["UploadIdMarker"] = resp["NextUploadIdMarker"]
+
+    marked = 0
+    if aborted:
+        db = SessionLocal()
+        try:
+            for start in range(0, len(aborted), 500):
+                marked += (
+                    db.query(Document)
+                    .filter(Document.multipart_upload_id.in_(aborted[start:start + 500]))
+                    .update(
+                        {
+                            Document.status: "failed",
+                            Document.error: "Multipart upload abandoned",
+                            Document.multipart_upload_id: None,
+                        },
+                        synchronize_session=False,
+                    )
+                )
+            db.commit()
+        finally:
+            db.close()
+
+    print(f"[APP] Aborted {len(aborted)} stale multipart uploads, {marked} documents marked failed")
+    return {"aborted": len(aborted), "documentsMarkedFailed": marked}
+
+
+@app.post("/admin/uploads/multipart/cleanup", dependencies=ADMIN_LIMIT)
+def admin_multipart_cleanup(
+    olderThanHours: float = Query(MULTIPART_STALE_HOURS, gt=0),
+    admin: User = Depends(require_admin),
+):
+    return abort_stale_multipart_uploads(olderThanHours)
+
+
+def _status_body(entry: dict) -> dict:
+    """Response body of a cached status entry (drops the cache-only etag)."""
+    return {k: v for k, v in entry.items() if k != "etag"}
+
+
+def _status_entry(doc: Document) -> dict:
+    """Cacheable status payload plus its ETag (same builder as the worker)."""
+    return status_entry(doc, presigned_urls, S3_BUCKET_NAME)
+
+
+def _load_status_entry(db: Session, file_id: str) -> dict | None:
+    """Build the status entry straight from the DB (no cache)."""
+    doc = db.query(Document).filter(Document.file_id == file_id).first()
     if not doc:
+        return None
+    return _status_entry(doc)
+
+
+def _cache_statuses(entries: list[dict], missing: list[str] = ()):
+    status_cache.put_many(entries, missing=missing)
+
+
+def _cache_doc_status(doc: Document):
+    _cache_statuses([_status_entry(doc)])
+
+
+@app.get("/api/v1/uploads/{file_id}/status", response_model=StatusResponse, dependencies=POLL_LIMIT)
+def get_status(
+    file_id: str,
+    if_none_match: str | None = Header(None),
+    db: Session = Depends(get_read_db),
+):
+    def load():
+        entry, from_replica = read_router.run_tracked(
+            db, lambda s: _load_status_entry(s, file_id)
+        )
+        # a lagging replica's row must not replace the worker's fresher entry
+        return Uncached(entry) if from_replica else entry
+
+    # cache hit, negative hit, or one DB load shared by concurrent pollers
+    entry = status_cache.load(file_id, load)
+    if entry is None:
         raise HTTPException(status_code=404, detail="fileId not found")
 
-    # Prepare message
-    message = {
+    etag = entry.get("etag")
+    headers = {"ETag": etag} if etag else None
+    if etag_matches(if_none_match, etag):
+        return Response(status_code=304, headers=headers)
+    # entry is already StatusResponse-shaped JSON: skip model round trip
+    return FastJSONResponse(_status_body(entry), headers=headers)
+
+
+MAX_BATCH_STATUS_IDS = int(os.getenv("STATUS_BATCH_MAX_FILE_IDS", "500"))
+
+
+@app.post(
+    "/api/v1/uploads/status:batch", response_model=BatchStatusResponse, dependencies=POLL_LIMIT
+)
+def get_status_batch(
+    body: BatchStatusRequest = Body(...),
+    db: Session = Depends(get_read_db),
+):
+    """
+    Status for many fileIds in one round trip: one Redis MGET, one
+    `IN (...)` query for the misses and a pipelined cache backfill.
+    Unknown fileIds come back inline with code 404.
+    """
+    file_ids = list(dict.fromkeys(body.fileIds))
+    if not file_ids:
+        raise HTTPException(status_code=400, detail="fileIds is required")
+    if len(file_ids) > MAX_BATCH_STATUS_IDS:
+        raise HTTPException(
+            status_code=400,
+            detail=f"At most {MAX_BATCH_STATUS_IDS} fileIds per request",
+        )
+
+    found: dict[str, dict] = {}
+    cached = status_cache.get_many(file_ids)
+    for fid, entry in cached.items():
+        if entry is not None:
+            found[fid] = entry
+
+    misses = [f for f in file_ids if f not in cached]
+    if misses:
+        docs, from_replica = read_router.run_tracked(
+            db,
+            lambda s: s.query(Document).filter(Document.file_id.in_(misses)).all(),
+            retry_if=lambda docs: len(docs) < len(misses),
+        )
+        fresh = [_status_entry(d) for d in docs]
+        found.update((e["fileId"], e) for e in fresh)
+        if not from_replica:  # replica rows may be older than the cache (see get_status)
+            _cache_statuses(fresh, missing=[f for f in misses if f not in found])
+
+    # BatchStatusResponse shape, built from the cached JSON entries directly
+    return FastJSONResponse(
+        {
+            "results": [
+                {"fileId": fid, "code": 200, "data": _status_body(found[fid]), "detail": None}
+                if fid in found
+                else {"fileId": fid, "code": 404, "data": None, "detail": "fileId not found"}
+                for fid in file_ids
+            ]
+        }
+    )
+
+
+def _read_status_entry(file_id: str) -> dict | None:
+    db = SessionLocal()
+    try:
+        return _load_status_entry(db, file_id)
+    finally:
+        db.close()
+
+
+def _status_snapshot(file_id: str) -> StatusResponse | None:
+    """Fresh DB read for the event stream; also refreshes the status cache."""
+    entry = _read_status_entry(file_id)
+    if entry is None:
+        status_cache.put_missing(file_id)
+        return None
+    _cache_statuses([entry])
+    return StatusResponse(**entry)
+
+
+def _polled_status(file_id: str) -> StatusResponse | None:
+    """Status for a stream that polls: the status cache, the DB on a miss."""
+    entry = status_cache.load(file_id, lambda: _read_status_entry(file_id))
+    return StatusResponse(**entry) if entry is not None else None
+
+
+def _sse(event: str, data: dict) -> str:
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+
+@app.get("/api/v1/uploads/status/stream", dependencies=POLL_LIMIT)
+async def stream_status(
+    fileIds: str = Query(..., description="Comma separated fileIds"),
+):
+    """
+    Server-sent events stream of status transitions for one or many fileIds.
+
+    Sends the current status of every fileId first, then one `status` event
+    per transition. The stream ends once every fileId is completed, failed
+    or unknown (`notfound` event). If Redis pub/sub fails mid-stream the
+    stream keeps going, polling the status cache instead.
+    """
+    file_ids = [f for f in dict.fromkeys(x.strip() for x in fileIds.split(",")) if f]
+    if not file_ids:
+        raise HTTPException(status_code=400, detail="fileIds is required")
+    if len(file_ids) > MAX_STREAM_FILE_IDS:
+        raise HTTPException(
+            status_code=400,
+            detail=f"At most {MAX_STREAM_FILE_IDS} fileIds per stream",
+        )
+
+    async def event_stream():
+        last_status: dict[str, str] = {}
+        pending = set(file_ids)
+
+        async def emit(fid: str, read=_status_snapshot):
+            resp_obj = await run_in_threadpool(read, fid)
+            if resp_obj is None:
+                pending.discard(fid)
+                return _sse("notfound", {"fileId": fid})
+            if resp_obj.status in TERMINAL_STATUSES:
+                pending.discard(fid)
+            if last_status.get(fid) == resp_obj.status:
+                return None
+            last_status[fid] = resp_obj.status
+            return _sse("status", resp_obj.model_dump(mode="json"))
+
+        # subscribe before the snapshot so no transition falls in between
+        async with status_events.subscribe(file_ids) as sub:
+            for fid in file_ids:
+                chunk = await emit(fid)
+                if chunk:
+                    yield chunk
+
+            while pending:
+                # re-checked every round: pub/sub can drop out mid-stream
+                idle_timeout = (
+                    min(STREAM_KEEPALIVE_SECONDS, STREAM_FALLBACK_POLL_SECONDS)
+                    if sub.polling
+                    else STREAM_KEEPALIVE_SECONDS
+                )
+                event = await sub.get(timeout=idle_timeout)
+                if event is None:
+                    if sub.polling:
+                        for fid in list(pending):
+                            chunk = await emit(fid, _polled_status)
+                            if chunk:
+                                yield chunk
+                    yield ": keepalive\n\n"
+                    continue
+
+                fid = event.get("fileId")
+                if fid in pending:
+                    chunk = await emit(fid)
+                    if chunk:
+                        yield chunk
+
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+sqs = LazyClient(lambda: boto3.client("sqs", region_name=AWS_REGION))
+
+# coalesces job messages from concurrent requests into send_message_batch
+sqs_publisher = SqsBatchPublisher(
+    client_factory=lambda: sqs,
+    queue_url_factory=lambda: os.getenv("SQS_QUEUE_URL"),
+    max_latency_ms=float(os.getenv("SQS_BATCH_MAX_LATENCY_MS", "5")),
+)
+
+# JOB_DISPATCH_MODE=outbox: jobs commit with the status change, relay sends them
+outbox_relay = outbox.OutboxRelay(
+    session_factory=SessionLocal,
+    client_factory=lambda: sqs,
+    queue_url_factory=lambda: os.getenv("SQS_QUEUE_URL"),
+)
+
+
+@app.on_event("startup")
+def start_outbox_relay():
+    if outbox.JOB_DISPATCH_MODE == "outbox":
+        outbox_relay.start()
+
+
+@app.on_event("shutdown")
+def stop_outbox_relay():
+    outbox_relay.stop()
+
+
+def _job_message(doc: Document) -> dict:
+    """SQS job body consumed by the worker."""
+    return {
         "fileId": doc.file_id,
         "userId": doc.user_id,
         "fileType": doc.file_type,
@@ -281,139 +1079,363 @@ def upload_complete(
         },
     }
 
+
+# a worker that died mid-job leaves the document in "processing"; retry is
+# allowed again once it has been there this long
+RETRY_STALE_PROCESSING_SECONDS = int(os.getenv("RETRY_STALE_PROCESSING_SECONDS", "900"))
+
+
+def _refuse_if_processing(doc: Document, stale_after: float | None = None):
+    """409 instead of queueing a second job for a document being processed."""
+    if doc.status != "processing":
+        return
+    if stale_after is not None and doc.updated_at is not None:
+        if (datetime.utcnow() - doc.updated_at).total_seconds() >= stale_after:
+            return
+    raise HTTPException(status_code=409, detail="Document is already processing")
+
+
+def _queue_job(db: Session, doc: Document, new_status: str):
+    """Queue the worker job for `doc` and move it to `new_status` (commits)."""
+    if outbox.JOB_DISPATCH_MODE == "outbox":
+        # one commit covers the status change and the job
+        outbox.enqueue(db, _job_message(doc))
+        doc.status = new_status
+        doc.error = None
+        db.commit()
+        outbox_relay.wake()
+        return
+
     # First push to SQS, then flip status
     try:
-        sqs.send_message(
-            QueueUrl=os.getenv("SQS_QUEUE_URL"),
-            MessageBody=json.dumps(message),
-        )
+        sqs_publisher.send(_job_message(doc))
+    except SqsPublishTimeout as e:
+        # the job may still reach the queue: record it as queued, failing the
+        # request would invite a second job. If it never arrives, the
+        # document is retryable after RETRY_STALE_PROCESSING_SECONDS.
+        print(f"[APP] SQS send for {doc.file_id} unconfirmed, assuming queued:", e)
+    doc.status = new_status
+    doc.error = None
+    db.commit()
+
+
+@app.post(
+    "/api/v1/uploads/complete", response_model=UploadCompleteResponse, dependencies=UPLOAD_LIMIT
+)
+def upload_complete(
+    request: Request,
+    body: UploadCompleteRequest = Body(...),
+    db: Session = Depends(get_db),
+    idempotency_key: str | None = Header(None),
+):
+    return idempotency_store.run(
+        "upload_complete",
+        rate_limit.caller_id(request),
+        idempotency_key,
+        body,
+        lambda: _upload_complete(db, body.fileId),
+    )
+
+
+def _upload_complete(db: Session, file_id: str) -> UploadCompleteResponse:
+    doc = db.query(Document).filter(Document.file_id == file_id).first()
+    if not doc:
+        raise HTTPException(status_code=404, detail="fileId not found")
+    if doc.multipart_upload_id:
+        raise HTTPException(status_code=409, detail="Multipart upload not completed")
+    if doc.status == "completed":
+        # deduplicated at request time (or a repeated call): nothing to queue
+        return UploadCompleteResponse(message="Already processed")
+    _refuse_if_processing(doc)
+
+    try:
+        _queue_job(db, doc, "processing")
     except Exception as e:
-        doc.error = f"SQS push failed: {e}"
+        db.rollback()
+        doc.error = f"Job dispatch failed: {e}"
         db.commit()
         raise HTTPException(status_code=500, detail=str(e))
 
-    doc.status = "processing"
-    doc.error = None
-    db.commit()
-
-    # Clear cache for this file if exists
-    if redis_client:
-        try:
-            redis_client.delete(f"status:{doc.file_id}")
-        except Exception:
-            pass
+    _cache_doc_status(doc)  # write-through
+    status_events.publish(doc.file_id, doc.status)
 
     return UploadCompleteResponse(message="Upload processed & job queued successfully")
 
 
-@app.get("/api/v1/uploads/user/{userId}")
+# ======== History listings (keyset pagination) ========
+HISTORY_MAX_LIMIT = 500
+
+# only what the listing emits, never the extracted_metadata blob
+HISTORY_COLUMNS = (
+    Document.file_id,
+    Document.file_name,
+    Document.status,
+    Document.upload_time,
+    Document.completed_time,
+    Document.error,
+    Document.updated_at,
+    Document.document_type,
+)
+
+
+def encode_cursor(upload_time: datetime, file_id: str) -> str:
+    raw = json.dumps([upload_time.isoformat(), file_id]).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> tuple[datetime, str]:
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        upload_time, file_id = json.loads(base64.urlsafe_b64decode(padded))
+        return datetime.fromisoformat(upload_time), file_id
+    except Exception:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+
+def _history_etag(scope: str, rows, next_cursor: str | None) -> str:
+    h = hashlib.sha1(f"{scope}|{next_cursor or ''}".encode())
+    for d in rows:
+        h.update(f"|{d.file_id}:{d.status}:{d.updated_at}".encode())
+    return '"' + h.hexdigest()[:20] + '"'
+
+
+def _history_page(
+    db: Session,
+    user_id: str,
+    limit: int,
+    cursor: str | None,
+    if_none_match: str | None = None,
+) -> Response:
+    """
+    One newest-first page of a user's documents. The cursor for the next
+    page, if any, is returned in the X-Next-Cursor header so the body stays
+    a plain list. The ETag covers (fileId, status, updated_at) of every row,
+    so an unchanged page is answered with 304 before serialization.
+    """
+    query = db.query(*HISTORY_COLUMNS).filter(Document.user_id == user_id)
+    return _document_page(query, user_id, limit, cursor, if_none_match)
+
+
+def _document_page(
+    query, etag_scope: str, limit: int, cursor: str | None, if_none_match: str | None
+) -> Response:
+    """Keyset page of HISTORY_COLUMNS rows from `query` (see _history_page)."""
+    if cursor:
+        after_time, after_id = decode_cursor(cursor)
+        query = query.filter(
+            tuple_(Document.upload_time, Document.file_id) < (after_time, after_id)
+        )
+
+    # one extra row tells us whether there is a next page
+    rows = (
+        query.order_by(Document.upload_time.desc(), Document.file_id.desc())
+        .limit(limit + 1)
+        .all()
+    )
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        last = rows[-1]
+        next_cursor = encode_cursor(last.upload_time, last.file_id)
+
+    etag = _history_etag(etag_scope, rows, next_cursor)
+    headers = {"ETag": etag}
+    if next_cursor:
+        headers["X-Next-Cursor"] = next_cursor
+    if etag_matches(if_none_match, etag):
+        return Response(status_code=304, headers=headers)
+
+    return FastJSONResponse([_history_row(d) for d in rows], headers=headers)
+
+
+def _history_row(d) -> dict:
+    """One listing entry from a HISTORY_COLUMNS row."""
+    return {
+        "fileId": d.file_id,
+        "fileName": d.file_name,
+        "status": d.status,
+        "uploadedAt": d.upload_time.isoformat() if d.upload_time else None,
+        "completedAt": d.completed_time.isoformat() if d.completed_time else None,
+        "error": d.error,
+        "documentType": d.document_type,
+    }
+
+
+@app.get("/api/v1/uploads/user/{userId}", dependencies=POLL_LIMIT)
 def list_user_docs(
+    limit: int = Query(100, ge=1, le=HISTORY_MAX_LIMIT),
+    cursor: str | None = Query(None),
+    if_none_match: str | None = Header(None),
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db),
+    db: Session = Depends(get_read_db),
 ):
-    docs = (
-        db.query(Document)
-        .filter(Document.user_id == current_user.user_id)
-        .order_by(Document.upload_time.desc())
-        .all()
+    return read_router.run(
+        db,
+        lambda s: _history_page(s, current_user.user_id, limit, cursor, if_none_match),
+        retry_if=None,
     )
-    return [
-        {
-            "fileId": d.file_id,
-            "fileName": d.file_name,
-            "status": d.status,
-            "uploadedAt": d.upload_time.isoformat() if d.upload_time else None,
-            "completedAt": d.completed_time.isoformat() if d.completed_time else None,
-            "error": d.error,
-        }
-        for d in docs
-    ]
 
 
-@app.get("/api/v1/uploads/user/{user_id}/history")
+@app.get("/api/v1/uploads/user/{user_id}/history", dependencies=POLL_LIMIT)
 def get_history(
     user_id: str,
-    db: Session = Depends(get_db),
+    limit: int = Query(50, ge=1, le=HISTORY_MAX_LIMIT),
+    cursor: str | None = Query(None),
+    if_none_match: str | None = Header(None),
+    db: Session = Depends(get_read_db),
 ):
-    docs = (
-        db.query(Document)
-        .filter(Document.user_id == user_id)
-        .order_by(Document.upload_time.desc())
-        .limit(50)
-        .all()
+    return read_router.run(
+        db, lambda s: _history_page(s, user_id, limit, cursor, if_none_match), retry_if=None
     )
-    response = []
-    for d in docs:
-        response.append(
-            {
-                "fileId": d.file_id,
-                "fileName": d.file_name,
-                "status": d.status,
-                "uploadedAt": d.upload_time.isoformat() if d.upload_time else None,
-                "completedAt": d.completed_time.isoformat()
-                if d.completed_time
-                else None,
-                "error": d.error,
-            }
+
+
+# ======== Search over extracted metadata ========
+# GET /api/v1/uploads/search returns the caller's documents matching
+#   q             words anywhere in the file name or extracted metadata
+#                 (textPreview, llmMetadata, ...)
+#   documentType  exact match on the indexed document_type column (fast path)
+#   field         "path.to.key=value", exact string match inside the metadata
+# On Postgres, q runs against a generated tsvector column and field filters
+# are JSONB containment, both GIN indexed; the column and indexes are
+# created by `python bootstrap.py` (bootstrap.migrate_search, Postgres 12+).
+# Other databases (sqlite in dev and tests) fall back to LIKE and JSON path
+# lookups. Results page like the history.
+
+SEARCH_MAX_FIELDS = 5
+_REGCONFIG = f"'{SEARCH_TS_CONFIG}'::regconfig"
+
+
+def _parse_field_filters(fields: list[str]) -> list[tuple[list[str], str]]:
+    if len(fields) > SEARCH_MAX_FIELDS:
+        raise HTTPException(400, f"At most {SEARCH_MAX_FIELDS} field filters")
+    parsed = []
+    for f in fields:
+        path, sep, value = f.partition("=")
+        keys = [k for k in path.strip().split(".") if k]
+        if not sep or not keys:
+            raise HTTPException(400, f"Invalid field filter {f!r}, expected path.to.key=value")
+        parsed.append((keys, value))
+    return parsed
+
+
+def _metadata_field_filter(keys: list[str], value: str, dialect: str):
+    if dialect == "postgresql":
+        nested = value
+        for key in reversed(keys):
+            nested = {key: nested}
+        return type_coerce(Document.extracted_metadata, JSONB).contains(nested)
+    return Document.extracted_metadata[tuple(keys)].as_string() == value
+
+
+def _text_filter(q: str, dialect: str):
+    if dialect == "postgresql":
+        return literal_column("search_vector").op("@@")(
+            func.websearch_to_tsquery(literal_column(_REGCONFIG), q)
         )
-    return response
+    haystack = func.lower(
+        func.coalesce(Document.file_name, "")
+        + " "
+        + func.coalesce(cast(Document.extracted_metadata, String), "")
+    )
+    return and_(*[haystack.contains(term.lower(), autoescape=True) for term in q.split()])
+
+
+def _search_page(
+    db: Session,
+    user_id: str,
+    q: str | None,
+    document_type: str | None,
+    fields: list[tuple[list[str], str]],
+    limit: int,
+    cursor: str | None,
+    if_none_match: str | None,
+) -> Response:
+    dialect = db.get_bind().dialect.name
+    query = db.query(*HISTORY_COLUMNS).filter(Document.user_id == user_id)
+    if document_type:
+        query = query.filter(Document.document_type == document_type)
+    if q:
+        query = query.filter(_text_filter(q, dialect))
+    for keys, value in fields:
+        query = query.filter(_metadata_field_filter(keys, value, dialect))
+    scope = json.dumps([user_id, q, document_type, sorted(map(repr, fields))])
+    return _document_page(query, scope, limit, cursor, if_none_match)
+
+
+@app.get("/api/v1/uploads/search", dependencies=POLL_LIMIT)
+def search_documents(
+    q: str | None = Query(None, max_length=200),
+    documentType: str | None = Query(None),
+    field: list[str] = Query([]),
+    limit: int = Query(50, ge=1, le=HISTORY_MAX_LIMIT),
+    cursor: str | None = Query(None),
+    if_none_match: str | None = Header(None),
+    current_user: User = Depends(get_current_user),
+    db: Session = Depends(get_read_db),
+):
+    q = (q or "").strip() or None
+    if not (q or documentType or field):
+        raise HTTPException(400, "Give q, documentType or at least one field filter")
+    fields = _parse_field_filters(field)
+    return read_router.run(
+        db,
+        lambda s: _search_page(
+            s, current_user.user_id, q, documentType, fields, limit, cursor, if_none_match
+        ),
+        retry_if=None,
+    )
 
 
-@app.get("/api/v1/uploads/{file_id}/download")
+@app.get("/api/v1/uploads/{file_id}/download", dependencies=POLL_LIMIT)
 def download(
     file_id: str,
-    db: Session = Depends(get_db),
+    db: Session = Depends(get_read_db),
 ):
-    doc = db.query(Document).filter(Document.file_id == file_id).first()
+    doc = read_router.run(
+        db, lambda s: s.query(Document).filter(Document.file_id == file_id).first()
+    )
     if not doc:
         raise HTTPException(404, "Not found")
 
-    url = s3_client.generate_presigned_url(
-        "get_object",
-        Params={"Bucket": S3_BUCKET_NAME, "Key": doc.s3_key},
-        ExpiresIn=600,
-    )
+    url, _ = presigned_urls.get(S3_BUCKET_NAME, doc.s3_key)
     return {"downloadUrl": url}
 
 
-@app.post("/api/v1/uploads/{file_id}/retry")
+@app.post("/api/v1/uploads/{file_id}/retry", dependencies=UPLOAD_LIMIT)
 def retry(
     file_id: str,
+    request: Request,
     db: Session = Depends(get_db),
+    idempotency_key: str | None = Header(None),
 ):
+    return idempotency_store.run(
+        "retry",
+        rate_limit.caller_id(request),
+        idempotency_key,
+        {"fileId": file_id},
+        lambda: _retry(db, file_id),
+    )
+
+
+def _retry(db: Session, file_id: str) -> dict:
     doc = db.query(Document).filter(Document.file_id == file_id).first()
     if not doc:
         raise HTTPException(404, "Not found")
+    _refuse_if_processing(doc, stale_after=RETRY_STALE_PROCESSING_SECONDS)
 
-    sqs.send_message(
-        QueueUrl=os.getenv("SQS_QUEUE_URL"),
-        MessageBody=json.dumps(
-            {
-                "fileId": doc.file_id,
-                "userId": doc.user_id,
-                "fileType": doc.file_type,
-                "s3Location": {
-                    "bucket": S3_BUCKET_NAME,
-                    "key": doc.s3_key,
-                },
-            }
-        ),
-    )
-
-    doc.status = "pending"
-    doc.error = None
-    db.commit()
+    try:
+        _queue_job(db, doc, "pending")
+    except Exception as e:
+        db.rollback()
+        raise HTTPException(status_code=500, detail=f"Job dispatch failed: {e}")
 
-    if redis_client:
-        try:
-            redis_client.delete(f"status:{doc.file_id}")
-        except Exception:
-            pass
+    _cache_doc_status(doc)  # write-through
+    status_events.publish(doc.file_id, doc.status)
 
     return {"message": "Retry triggered"}
 
 
-@app.delete("/api/v1/uploads/{file_id}")
+@app.delete("/api/v1/uploads/{file_id}", dependencies=UPLOAD_LIMIT)
 def delete_file(
     file_id: str,
     db: Session = Depends(get_db),
@@ -422,26 +1444,96 @@ def delete_file(
     if not doc:
         raise HTTPException(404, "Not found")
 
-    s3_client.delete_object(Bucket=S3_BUCKET_NAME, Key=doc.s3_key)
+    if not _s3_object_shared(db, doc):
+        s3_client.delete_object(Bucket=S3_BUCKET_NAME, Key=doc.s3_key)
+        presigned_urls.invalidate(S3_BUCKET_NAME, doc.s3_key)
     db.delete(doc)
     db.commit()
 
-    if redis_client:
-        try:
-            redis_client.delete(f"status:{file_id}")
-        except Exception:
-            pass
+    status_cache.put_missing(file_id)
 
     return {"message": "Deleted"}
 
 
+# ======== Bulk delete / retention purge (see purge.py) ========
+document_purger = purge.DocumentPurger(
+    session_factory=SessionLocal,
+    model=Document,
+    s3_client_factory=lambda: s3_client,
+    bucket=S3_BUCKET_NAME,
+    status_cache=status_cache,
+    presigned_urls=presigned_urls,
+)
+
+
+class BulkDeleteRequest(BaseModel):
+    fileIds: list[str]
+
+
+@app.post("/api/v1/uploads:bulkDelete", dependencies=UPLOAD_LIMIT)
+def bulk_delete(
+    body: BulkDeleteRequest = Body(...),
+    current_user: User = Depends(get_current_user),
+    db: Session = Depends(get_db),
+):
+    """
+    Delete up to PURGE_CHUNK_SIZE of the caller's documents (admins: anyone's)
+    with one DeleteObjects call. Unknown or foreign fileIds are reported in
+    notFound, objects S3 failed to delete in failed (those rows are kept).
+    """
+    file_ids = list(dict.fromkeys(body.fileIds))
+    if not file_ids:
+        raise HTTPException(status_code=400, detail="fileIds is required")
+    if len(file_ids) > purge.PURGE_CHUNK_SIZE:
+        raise HTTPException(
+            status_code=400, detail=f"At most {purge.PURGE_CHUNK_SIZE} fileIds per request"
+        )
+
+    query = db.query(Document.file_id, Document.s3_key).filter(Document.file_id.in_(file_ids))
+    if current_user.role != "admin":
+        query = query.filter(Document.user_id == current_user.user_id)
+    rows = [tuple(r) for r in query]
+    found = {fid for fid, _ in rows}
+
+    result = document_purger.delete_rows(db, rows) if rows else {"failedFileIds": []}
+    return {
+        "deleted": [f for f in found if f not in result["failedFileIds"]],
+        "failed": result["failedFileIds"],
+        "notFound": [f for f in file_ids if f not in found],
+    }
+
+
+@app.post("/admin/uploads/purge", dependencies=ADMIN_LIMIT)
+def admin_start_purge(
+    olderThanDays: float | None = Query(None, gt=0),
+    dryRun: bool = Query(False),
+    admin: User = Depends(require_admin),
+):
+    """Start a background purge of documents uploaded more than N days ago."""
+    days = olderThanDays or purge.RETENTION_DAYS
+    if days <= 0:
+        raise HTTPException(status_code=400, detail="olderThanDays is required (no RETENTION_DAYS)")
+    return document_purger.start_job(days, dry_run=dryRun)
+
+
+@app.get("/admin/uploads/purge/{job_id}", dependencies=ADMIN_LIMIT)
+def admin_purge_progress(job_id: str, admin: User = Depends(require_admin)):
+    """Progress of a purge started on this replica."""
+    job = document_purger.job(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Purge job not found")
+    return job
+
+
 @app.post("/auth/login", response_model=TokenResponse)
-def login(
+async def login(
     form_data: OAuth2PasswordRequestForm = Depends(),
     db: Session = Depends(get_db),
 ):
-    user = get_user_by_username(db, form_data.username)
-    if not user or not verify_password(form_data.password, user.password_hash):
+    # async so a login burst waits on the Argon2 pool without holding
+    # request threads; only the user lookup borrows one
+    user = await run_in_threadpool(get_user_by_username, db, form_data.username)
+    if not user or not await verify_password_async(form_data.password, user.password_hash):
         raise HTTPException(status_code=400, detail="Incorrect username or password")
 
     access_token = create_access_token(
@@ -461,22 +1553,34 @@ def update_profile(
     current_user: User = Depends(get_current_user),
     db: Session = Depends(get_db),
 ):
+    # current_user may be a cached read-only copy, modify the session's row
+    user = db.query(User).filter(User.user_id == current_user.user_id).first()
+    if not user:
+        raise HTTPException(status_code=404, detail="User not found")
+
     if body.username:
         # Ensure unique
         existing = db.query(User).filter(User.username == body.username).first()
-        if existing and existing.user_id != current_user.user_id:
+        if existing and existing.user_id != user.user_id:
             raise HTTPException(status_code=400, detail="Username already taken")
-        current_user.username = body.username
+        user.username = body.username
 
     if body.password:
-        current_user.password_hash = hash_password(body.password)
+        user.password_hash = hash_password(body.password)
 
     db.commit()
+    user_cache.invalidate(user.user_id)
     return {"message": "Profile updated"}
 
 
-@app.post("/admin/users", response_model=AdminUserResponse)
-def admin_create_user(
+def _add_user(db: Session, user: User):
+    db.add(user)
+    db.commit()
+    db.refresh(user)
+
+
+@app.post("/admin/users", response_model=AdminUserResponse, dependencies=ADMIN_LIMIT)
+async def admin_create_user(
     body: AdminCreateUserRequest,
     admin: User = Depends(require_admin),
     db: Session = Depends(get_db),
@@ -484,17 +1588,15 @@ def admin_create_user(
     if body.role not in ["admin", "system"]:
         raise HTTPException(status_code=400, detail="Invalid role")
 
-    if get_user_by_username(db, body.username):
+    if await run_in_threadpool(get_user_by_username, db, body.username):
         raise HTTPException(status_code=400, detail="Username already exists")
 
     user = User(
         username=body.username,
-        password_hash=hash_password(body.password),
+        password_hash=await hash_password_async(body.password),
         role=body.role,
     )
-    db.add(user)
-    db.commit()
-    db.refresh(user)
+    await run_in_threadpool(_add_user, db, user)
 
     return AdminUserResponse(
         userId=user.user_id,
@@ -505,12 +1607,14 @@ def admin_create_user(
     )
 
 
-@app.get("/admin/users", response_model=list[AdminUserResponse])
+@app.get("/admin/users", response_model=list[AdminUserResponse], dependencies=ADMIN_LIMIT)
 def admin_list_users(
     admin: User = Depends(require_admin),
-    db: Session = Depends(get_db),
+    db: Session = Depends(get_read_db),
 ):
-    users = db.query(User).order_by(User.created_at.desc()).all()
+    users = read_router.run(
+        db, lambda s: s.query(User).order_by(User.created_at.desc()).all(), retry_if=None
+    )
     return [
         AdminUserResponse(
             userId=u.user_id,
@@ -523,7 +1627,7 @@ def admin_list_users(
     ]
 
 
-@app.put("/admin/users/{user_id}")
+@app.put("/admin/users/{user_id}", dependencies=ADMIN_LIMIT)
 def admin_update_user(
     user_id: str,
     body: AdminUpdateUserRequest,
@@ -549,10 +1653,11 @@ def admin_update_user(
         user.role = body.role
 
     db.commit()
+    user_cache.invalidate(user_id)
     return {"message": "User updated"}
 
 
-@app.delete("/admin/users/{user_id}")
+@app.delete("/admin/users/{user_id}", dependencies=ADMIN_LIMIT)
 def admin_delete_user(
     user_id: str,
     admin: User = Depends(require_admin),
@@ -564,4 +1669,29 @@ def admin_delete_user(
 
     db.delete(user)
     db.commit()
+    user_cache.invalidate(user_id)
     return {"message": "User deleted"}
+
+
+@app.get("/admin/metrics", dependencies=ADMIN_LIMIT)
+def admin_metrics(admin: User = Depends(require_admin)):
+    """Process-local counters (password hashing pool, ...) as JSON."""
+    return metrics.snapshot()
+
+
+@app.get("/metrics", include_in_schema=False)
+def prometheus_metrics():
+    """Prometheus scrape endpoint (this process only)."""
+    return PlainTextResponse(
+        metrics.render_prometheus(),
+        media_type="text/plain; version=0.0.4; charset=utf-8",
+    )
+
+
+# ======== Async I/O mode ========
+# Imported last: async_routes reuses the models/helpers defined above.
+if BACKEND_IO_MODE == "async":
+    import async_routes
+
+    async_routes.mount(app)
+    print("[APP] Running hot routes in async I/O mode")
@@ -0,0 +1,109 @@
+import asyncio
+import os
+from contextlib import AsyncExitStack
+
+import redis.asyncio as aioredis
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+
+from config import AWS_REGION, DATABASE_URL
+
+# ======== Async execution mode (BACKEND_IO_MODE=async) ========
+# Only imported when the async mode is selected, so the sync deployment
+# doesn't need asyncpg / aiobotocore installed.
+
+
+def to_async_url(url: str) -> str:
+    """Map a sync DATABASE_URL onto its async driver."""
+    if url.startswith("postgresql+psycopg2://"):
+        return "postgresql+asyncpg://" + url[len("postgresql+psycopg2://"):]
+    if url.startswith("postgresql://"):
+        return "postgresql+asyncpg://" + url[len("postgresql://"):]
+    if url.startswith("sqlite://"):
+        return "sqlite+aiosqlite://" + url[len("sqlite://"):]
+    return url
+
+
+ASYNC_DATABASE_URL = os.getenv("ASYNC_DATABASE_URL") or to_async_url(DATABASE_URL)
+
+_pool_kwargs = {}
+if not ASYNC_DATABASE_URL.startswith("sqlite"):
+    _pool_kwargs = dict(
+        pool_size=int(os.getenv("DB_POOL_SIZE", "20")),
+        max_overflow=int(os.getenv("DB_MAX_OVERFLOW", "30")),
+        pool_timeout=int(os.getenv("DB_POOL_TIMEOUT", "30")),
+    )
+
+async_engine = create_async_engine(ASYNC_DATABASE_URL, pool_pre_ping=True, **_pool_kwargs)
+AsyncSessionLocal = async_sessionmaker(
+    async_engine, class_=AsyncSession, expire_on_commit=False
+)
+
+
+def pool_exhausted() -> bool:
+    """Whether every connection the async engine may open is checked out."""
+    if not _pool_kwargs:
+        return False
+    limit = _pool_kwargs["pool_size"] + _pool_kwargs["max_overflow"]
+    return async_engine.pool.checkedout() >= limit
+
+
+async def get_async_db():
+    async with AsyncSessionLocal() as db:
+        yield db
+
+
+# ---- Optional async Redis ----
+REDIS_HOST = os.getenv("REDIS_HOST")
+REDIS_PORT = int(os.getenv("REDIS_PORT", "6379"))
+async_redis_client: aioredis.Redis | None = None
+if REDIS_HOST:
+    # no ping here: connects on first use, and errors on use are handled
+    # per call like the sync path
+    async_redis_client = aioredis.Redis(
+        host=REDIS_HOST,
+        port=REDIS_PORT,
+        decode_responses=True,
+    )
+
+
+# ---- Async SQS (aiobotocore) ----
+class AsyncSQSClient:
+    """Long-lived aiobotocore SQS client, opened on first use."""
+
+    def __init__(self, region_name: str):
+        self.region_name = region_name
+        self._client = None
+        self._stack: AsyncExitStack | None = None
+        self._lock = asyncio.Lock()
+
+    async def _get_client(self):
+        if self._client is None:
+            async with self._lock:
+                if self._client is None:
+                    from aiobotocore.session import get_session
+
+                    self._stack = AsyncExitStack()
+                    self._client = await self._stack.enter_async_context(
+                        get_session().create_client("sqs", region_name=self.region_name)
+                    )
+        return self._client
+
+    async def send_message(self, **kwargs):
+        client = await self._get_client()
+        return await client.send_message(**kwargs)
+
+    async def close(self):
+        if self._stack is not None:
+            await self._stack.aclose()
+        self._client = None
+        self._stack = None
+
+
+async_sqs = AsyncSQSClient(AWS_REGION)
+
+
+async def close_async_clients():
+    await async_sqs.close()
+    if async_redis_client is not None:
+        await async_redis_client.aclose()
+    await async_engine.dispose()
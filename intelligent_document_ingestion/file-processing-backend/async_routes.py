@@ -0,0 +1,276 @@
+import json
+import os
+
+from fastapi import APIRouter, Body, Depends, FastAPI, Header, HTTPException, Request, Response
+from fastapi.concurrency import run_in_threadpool
+from fastapi.routing import APIRoute
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+import async_io
+import idempotency
+import outbox
+import rate_limit
+from helper import etag_matches
+from responses import FastJSONResponse
+from sqs_publisher import SEND_SECONDS as SQS_SEND_SECONDS
+from status_cache import AsyncStatusCache
+from async_io import get_async_db, close_async_clients
+from app import (
+    RETRY_STALE_PROCESSING_SECONDS,
+    UPLOAD_URL_EXPIRES_IN,
+    Document,
+    StatusResponse,
+    UploadCompleteRequest,
+    UploadCompleteResponse,
+    UploadRequest,
+    UploadResponse,
+    _complete_from_duplicate,
+    _deduplicated_response,
+    _duplicates_select,
+    _job_message,
+    _new_document,
+    _newest_by_hash,
+    _presign_upload,
+    _refuse_if_processing,
+    _status_body,
+    _status_entry,
+    _validate_upload,
+    outbox_relay,
+    status_events,
+)
+from user import (
+    User,
+    credentials_exception,
+    decode_access_token,
+    oauth2_scheme,
+    remember_user,
+    user_from_claims,
+)
+
+# ======== Async variants of the hot routes ========
+# Same paths and payloads as the sync routes in app.py; `mount` swaps them in
+# when BACKEND_IO_MODE=async so both modes can be benchmarked side by side.
+router = APIRouter()
+
+# module-level so tests can swap in fakes, like `app.sqs`
+sqs = async_io.async_sqs
+status_cache = AsyncStatusCache(async_io.async_redis_client)
+idempotency_store = idempotency.AsyncIdempotencyStore(async_io.async_redis_client)
+
+# same buckets as the sync routes, checked without blocking the event loop
+rate_limit.async_limiter.redis_client = async_io.async_redis_client
+POLL_LIMIT = [Depends(rate_limit.async_rate_limit("poll", async_io.pool_exhausted))]
+UPLOAD_LIMIT = [Depends(rate_limit.async_rate_limit("upload", async_io.pool_exhausted))]
+
+
+async def get_current_user_async(
+    token: str = Depends(oauth2_scheme),
+    db: AsyncSession = Depends(get_async_db),
+) -> User:
+    token_data = decode_access_token(token)
+
+    user = user_from_claims(token_data)
+    if user is not None:
+        return user
+
+    result = await db.execute(select(User).where(User.user_id == token_data.user_id))
+    user = result.scalar_one_or_none()
+    if user is None:
+        raise credentials_exception()
+    return remember_user(user)
+
+
+async def _get_document(db: AsyncSession, file_id: str) -> Document | None:
+    result = await db.execute(select(Document).where(Document.file_id == file_id))
+    return result.scalar_one_or_none()
+
+
+async def _queue_job(db: AsyncSession, doc: Document, new_status: str):
+    """Async twin of app._queue_job."""
+    if outbox.JOB_DISPATCH_MODE == "outbox":
+        outbox.enqueue(db, _job_message(doc))
+    else:
+        with SQS_SEND_SECONDS.labels("send_message").time():
+            await sqs.send_message(
+                QueueUrl=os.getenv("SQS_QUEUE_URL"),
+                MessageBody=json.dumps(_job_message(doc)),
+            )
+    doc.status = new_status
+    doc.error = None
+    await db.commit()
+    if outbox.JOB_DISPATCH_MODE == "outbox":
+        outbox_relay.wake()
+
+
+async def _status_entry_async(doc: Document) -> dict:
+    # a completed document's entry carries its download URL, i.e. a sync
+    # presign-cache Redis read (and a signing on a miss): off the event loop
+    return await run_in_threadpool(_status_entry, doc)
+
+
+async def _write_through(doc: Document):
+    await status_cache.put(await _status_entry_async(doc))
+
+
+@router.post(
+    "/api/v1/uploads/request", response_model=UploadResponse, dependencies=UPLOAD_LIMIT
+)
+async def request_upload(
+    payload: UploadRequest = Body(...),
+    current_user: User = Depends(get_current_user_async),
+    db: AsyncSession = Depends(get_async_db),
+    idempotency_key: str | None = Header(None),
+):
+    return await idempotency_store.run(
+        "request_upload",
+        current_user.user_id,
+        idempotency_key,
+        payload,
+        lambda: _request_upload(db, payload, current_user.user_id),
+        ttl=UPLOAD_URL_EXPIRES_IN,
+    )
+
+
+async def _request_upload(db: AsyncSession, payload: UploadRequest, user_id: str):
+    _validate_upload(payload)
+
+    doc = _new_document(payload, user_id)
+    source = None
+    if doc.content_sha256:
+        rows = await db.execute(_duplicates_select(doc.user_id, [doc.content_sha256]))
+        source = _newest_by_hash(rows.scalars()).get(doc.content_sha256)
+    if source is not None:
+        _complete_from_duplicate(doc, source)
+    db.add(doc)
+    await db.commit()
+
+    if source is not None:
+        await _write_through(doc)
+        return _deduplicated_response(doc)
+
+    # presigning is local SigV4 signing, no network round trip
+    try:
+        return _presign_upload(doc)
+    except Exception as e:
+        await db.delete(doc)
+        await db.commit()
+        raise HTTPException(
+            status_code=500, detail=f"Failed to create presigned URL: {e}"
+        )
+
+
+@router.get(
+    "/api/v1/uploads/{file_id}/status", response_model=StatusResponse, dependencies=POLL_LIMIT
+)
+async def get_status(
+    file_id: str,
+    if_none_match: str | None = Header(None),
+    db: AsyncSession = Depends(get_async_db),
+):
+    async def load():
+        doc = await _get_document(db, file_id)
+        return await _status_entry_async(doc) if doc else None
+
+    entry = await status_cache.load(file_id, load)
+    if entry is None:
+        raise HTTPException(status_code=404, detail="fileId not found")
+
+    etag = entry.get("etag")
+    headers = {"ETag": etag} if etag else None
+    if etag_matches(if_none_match, etag):
+        return Response(status_code=304, headers=headers)
+    return FastJSONResponse(_status_body(entry), headers=headers)
+
+
+@router.post(
+    "/api/v1/uploads/complete", response_model=UploadCompleteResponse, dependencies=UPLOAD_LIMIT
+)
+async def upload_complete(
+    request: Request,
+    body: UploadCompleteRequest = Body(...),
+    db: AsyncSession = Depends(get_async_db),
+    idempotency_key: str | None = Header(None),
+):
+    return await idempotency_store.run(
+        "upload_complete",
+        rate_limit.caller_id(request),
+        idempotency_key,
+        body,
+        lambda: _upload_complete(db, body.fileId),
+    )
+
+
+async def _upload_complete(db: AsyncSession, file_id: str):
+    doc = await _get_document(db, file_id)
+    if not doc:
+        raise HTTPException(status_code=404, detail="fileId not found")
+    if doc.multipart_upload_id:
+        raise HTTPException(status_code=409, detail="Multipart upload not completed")
+    if doc.status == "completed":
+        return UploadCompleteResponse(message="Already processed")
+    _refuse_if_processing(doc)
+
+    try:
+        await _queue_job(db, doc, "processing")
+    except Exception as e:
+        await db.rollback()
+        doc.error = f"Job dispatch failed: {e}"
+        await db.commit()
+        raise HTTPException(status_code=500, detail=str(e))
+
+    await _write_through(doc)
+    await status_events.publish_async(doc.file_id, doc.status)
+
+    return UploadCompleteResponse(message="Upload processed & job queued successfully")
+
+
+@router.post("/api/v1/uploads/{file_id}/retry", dependencies=UPLOAD_LIMIT)
+async def retry(
+    file_id: str,
+    request: Request,
+    db: AsyncSession = Depends(get_async_db),
+    idempotency_key: str | None = Header(None),
+):
+    return await idempotency_store.run(
+        "retry",
+        rate_limit.caller_id(request),
+        idempotency_key,
+        {"fileId": file_id},
+        lambda: _retry(db, file_id),
+    )
+
+
+async def _retry(db: AsyncSession, file_id: str):
+    doc = await _get_document(db, file_id)
+    if not doc:
+        raise HTTPException(404, "Not found")
+    _refuse_if_processing(doc, stale_after=RETRY_STALE_PROCESSING_SECONDS)
+
+    try:
+        await _queue_job(db, doc, "pending")
+    except Exception as e:
+        await db.rollback()
+        raise HTTPException(status_code=500, detail=f"Job dispatch failed: {e}")
+
+    await _write_through(doc)
+    await status_events.publish_async(doc.file_id, doc.status)
+
+    return {"message": "Retry triggered"}
+
+
+def mount(app: FastAPI):
+    """Replace the sync handlers for the routes defined here."""
+    replaced = {
+        (route.path, method) for route in router.routes for method in route.methods
+    }
+    app.router.routes[:] = [
+        r
+        for r in app.router.routes
+        if not (
+            isinstance(r, APIRoute)
+            and any((r.path, m) in replaced for m in r.methods)
+        )
+    ]
+    app.include_router(router)
+    app.on_event("shutdown")(close_async_clients)
@@ -0,0 +1,184 @@
+import os
+
+from sqlalchemy import inspect, text
+from sqlalchemy.exc import IntegrityError
+
+import passwords
+from config import SEARCH_TS_CONFIG, Base, SessionLocal, engine
+
+# ======== Schema bootstrap / migrations ========
+# Importing the app has no side effects: tables, late-added columns and
+# indexes are created here, either from the app's startup hook
+# (AUTO_INIT_DB=true, the default, fine for dev and single replicas) or once
+# per deploy with `python bootstrap.py` before the replicas start
+# (AUTO_INIT_DB=false). Every step is idempotent.
+# Migrations that rewrite or scan the documents table (migrate_search) only
+# run from `python bootstrap.py`, never on replica startup.
+
+AUTO_INIT_DB = os.getenv("AUTO_INIT_DB", "true").lower() == "true"
+SEED_ADMIN = os.getenv("SEED_ADMIN", "true").lower() == "true"
+# how long a migration DDL waits for its table lock before failing, instead
+# of queueing every request behind it
+MIGRATION_LOCK_TIMEOUT = os.getenv("MIGRATION_LOCK_TIMEOUT", "10s")
+BACKFILL_BATCH_SIZE = int(os.getenv("BACKFILL_BATCH_SIZE", "5000"))
+
+
+def _add_missing_columns(conn) -> list[str]:
+    """ALTER TABLE ... ADD COLUMN for nullable model columns the table lacks."""
+    inspector = inspect(conn)
+    added = []
+    for table in Base.metadata.sorted_tables:
+        if not inspector.has_table(table.name):
+            continue
+        existing = {c["name"] for c in inspector.get_columns(table.name)}
+        for column in table.columns:
+            if column.name in existing:
+                continue
+            if not column.nullable:
+                print(f"[APP] Cannot add NOT NULL column {table.name}.{column.name}, skipping")
+                continue
+            col_type = column.type.compile(dialect=conn.dialect)
+            conn.execute(
+                text(f'ALTER TABLE {table.name} ADD COLUMN {column.name} {col_type}')
+            )
+            added.append(f"{table.name}.{column.name}")
+    return added
+
+
+def init_db(bind=engine):
+    """Create tables, then bring existing ones up to the models."""
+    Base.metadata.create_all(bind=bind)
+    with bind.begin() as conn:
+        added = _add_missing_columns(conn)
+    # create_all only creates indexes together with their table
+    for table in Base.metadata.sorted_tables:
+        for index in table.indexes:
+            index.create(bind=bind, checkfirst=True)
+    if added:
+        print("[APP] Added columns:", ", ".join(added))
+
+
+# ---- Search (Postgres only, see the search section of app.py) ----
+_REGCONFIG = f"'{SEARCH_TS_CONFIG}'::regconfig"
+
+# each rewrites the table once under ACCESS EXCLUSIVE, then is a no-op
+SEARCH_COLUMN_DDL = [
+    # json -> jsonb
+    """DO $$ BEGIN
+        IF (SELECT data_type FROM information_schema.columns
+            WHERE table_name = 'documents' AND column_name = 'extracted_metadata') = 'json' THEN
+            ALTER TABLE documents ALTER COLUMN extracted_metadata TYPE jsonb
+                USING extracted_metadata::jsonb;
+        END IF;
+    END $$""",
+    # kept current by Postgres on every write, including the worker's
+    f"""ALTER TABLE documents ADD COLUMN IF NOT EXISTS search_vector tsvector
+        GENERATED ALWAYS AS (
+            to_tsvector({_REGCONFIG}, coalesce(file_name, ''))
+            || jsonb_to_tsvector({_REGCONFIG}, coalesce(extracted_metadata, '{{}}'::jsonb), '["string"]')
+        ) STORED""",
+]
+SEARCH_INDEXES = {
+    "ix_documents_search_vector": "USING GIN (search_vector)",
+    "ix_documents_metadata_gin": "USING GIN (extracted_metadata jsonb_path_ops)",
+}
+# documents completed before document_type existed, one keyset batch per
+# transaction so no long row locks; rows already set are never touched again
+BACKFILL_DOCUMENT_TYPE = """
+    WITH batch AS (
+        SELECT file_id FROM documents
+        WHERE file_id > :after
+          AND document_type IS NULL
+          AND extracted_metadata ? 'documentType'
+        ORDER BY file_id
+        LIMIT :batch_size
+    )
+    UPDATE documents d SET document_type = d.extracted_metadata->>'documentType'
+    FROM batch WHERE d.file_id = batch.file_id
+    RETURNING d.file_id
+"""
+
+
+def _create_index_concurrently(bind, name: str, definition: str):
+    with bind.connect().execution_options(isolation_level="AUTOCOMMIT") as conn:
+        # an interrupted CONCURRENTLY build leaves an invalid index behind,
+        # which IF NOT EXISTS would then keep
+        invalid = conn.execute(
+            text(
+                "SELECT NOT i.indisvalid FROM pg_index i "
+                "JOIN pg_class c ON c.oid = i.indexrelid WHERE c.relname = :name"
+            ),
+            {"name": name},
+        ).scalar()
+        if invalid:
+            conn.execute(text(f"DROP INDEX CONCURRENTLY IF EXISTS {name}"))
+        conn.execute(text(f"CREATE INDEX CONCURRENTLY IF NOT EXISTS {name} ON documents {definition}"))
+
+
+def backfill_document_type(bind=engine, batch_size: int = BACKFILL_BATCH_SIZE) -> int:
+    total, after = 0, ""
+    while True:
+        with bind.begin() as conn:
+            ids = conn.execute(
+                text(BACKFILL_DOCUMENT_TYPE), {"after": after, "batch_size": batch_size}
+            ).scalars().all()
+        if not ids:
+            return total
+        total += len(ids)
+        after = max(ids)
+
+
+def search_schema_ready(bind=engine) -> bool:
+    if bind.dialect.name != "postgresql":
+        return True
+    return any(c["name"] == "search_vector" for c in inspect(bind).get_columns("documents"))
+
+
+def migrate_search(bind=engine):
+    """jsonb metadata, the search_vector column, GIN indexes, document_type backfill."""
+    if bind.dialect.name != "postgresql":
+        return
+    with bind.begin() as conn:
+        conn.execute(text("SELECT set_config('lock_timeout', :t, true)"), {"t": MIGRATION_LOCK_TIMEOUT})
+        for statement in SEARCH_COLUMN_DDL:
+            conn.execute(text(statement))
+    for name, definition in SEARCH_INDEXES.items():
+        _create_index_concurrently(bind, name, definition)
+    backfilled = backfill_document_type(bind)
+    if backfilled:
+        print(f"[APP] Backfilled document_type on {backfilled} documents")
+
+
+def seed_admin():
+    """Default admin (admin / admin@123) when there are no users at all."""
+    from user import User
+
+    db = SessionLocal()
+    try:
+        if db.query(User.user_id).first() is not None:
+            return
+        db.add(User(username="admin", password_hash=passwords.hash_password("admin@123"), role="admin"))
+        db.commit()
+        print("🚀 Default admin created: username='admin' password='admin@123'")
+    except IntegrityError:
+        # another replica seeded it first
+        db.rollback()
+    finally:
+        db.close()
+
+
+def bootstrap(seed: bool = SEED_ADMIN, migrate: bool = False):
+    init_db()
+    if migrate:
+        migrate_search()
+    elif not search_schema_ready():
+        print("[APP] Search column/indexes missing: run `python bootstrap.py` once")
+    if seed:
+        seed_admin()
+
+
+if __name__ == "__main__":
+    import app  # noqa: F401  registers every model on Base.metadata
+
+    bootstrap(migrate=True)
+    print("[APP] Database ready")
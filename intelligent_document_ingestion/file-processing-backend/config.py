@@ -1,4 +1,5 @@
 import os
+import threading
 from sqlalchemy import create_engine
 from sqlalchemy.orm import sessionmaker, declarative_base
 from dotenv import load_dotenv
@@ -14,26 +15,78 @@ DATABASE_URL = os.getenv(
 S3_BUCKET_NAME = os.getenv("S3_BUCKET_NAME", "your-bucket-name")
 AWS_REGION = os.getenv("AWS_REGION", "ap-south-1")
 
+# "sync" (threadpool routes) or "async" (async engine, redis.asyncio, async SQS)
+BACKEND_IO_MODE = os.getenv("BACKEND_IO_MODE", "sync").lower()
+
 if not S3_BUCKET_NAME:
     raise RuntimeError("S3_BUCKET_NAME env var is required")
 
+# Postgres text search configuration of the search_vector column (bootstrap.py)
+# and of the queries against it (app.py)
+SEARCH_TS_CONFIG = os.getenv("SEARCH_TS_CONFIG", "simple")
+if not SEARCH_TS_CONFIG.isidentifier():
+    raise RuntimeError("SEARCH_TS_CONFIG must be a text search configuration name")
+
 # ---- Pooled engine for high concurrency ----
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "20"))        # base pool
+DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", "30"))  # burst capacity
 engine = create_engine(
     DATABASE_URL,
     pool_pre_ping=True,
-    pool_size=int(os.getenv("DB_POOL_SIZE", "20")),        # base pool
-    max_overflow=int(os.getenv("DB_MAX_OVERFLOW", "30")),  # burst capacity
+    pool_size=DB_POOL_SIZE,
+    max_overflow=DB_MAX_OVERFLOW,
     pool_timeout=int(os.getenv("DB_POOL_TIMEOUT", "30")),
 )
 
 SessionLocal = sessionmaker(bind=engine)
+
+# ---- Optional read replica (read-only routes, see replicas.py) ----
+DATABASE_REPLICA_URL = os.getenv("DATABASE_REPLICA_URL")
+DB_REPLICA_POOL_SIZE = int(os.getenv("DB_REPLICA_POOL_SIZE", str(DB_POOL_SIZE)))
+DB_REPLICA_MAX_OVERFLOW = int(os.getenv("DB_REPLICA_MAX_OVERFLOW", str(DB_MAX_OVERFLOW)))
+replica_engine = None
+ReplicaSessionLocal = None
+if DATABASE_REPLICA_URL:
+    replica_engine = create_engine(
+        DATABASE_REPLICA_URL,
+        pool_pre_ping=True,
+        pool_size=DB_REPLICA_POOL_SIZE,
+        max_overflow=DB_REPLICA_MAX_OVERFLOW,
+        pool_timeout=int(os.getenv("DB_POOL_TIMEOUT", "30")),
+    )
+    ReplicaSessionLocal = sessionmaker(bind=replica_engine)
 Base = declarative_base()
 
-s3_client = boto3.client(
-    "s3",
-    region_name=AWS_REGION,
-    config=boto3.session.Config(
-        signature_version="s3v4",
-        s3={"addressing_style": "virtual", "use_arn_region": True},
-    ),
+class LazyClient:
+    """
+    Builds the wrapped client on first attribute access, so importing the
+    app doesn't load botocore's service models or resolve credentials.
+    Attributes set on the proxy (test doubles) shadow the real client's.
+    """
+
+    def __init__(self, factory):
+        self._factory = factory
+        self._client = None
+        self._lock = threading.Lock()
+
+    def _get(self):
+        if self._client is None:
+            with self._lock:
+                if self._client is None:
+                    self._client = self._factory()
+        return self._client
+
+    def __getattr__(self, name):
+        return getattr(self._get(), name)
+
+
+s3_client = LazyClient(
+    lambda: boto3.client(
+        "s3",
+        region_name=AWS_REGION,
+        config=boto3.session.Config(
+            signature_version="s3v4",
+            s3={"addressing_style": "virtual", "use_arn_region": True},
+        ),
+    )
 )
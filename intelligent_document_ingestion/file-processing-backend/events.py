@@ -0,0 +1,176 @@
+import asyncio
+import json
+import threading
+
+import redis.asyncio as aioredis
+
+# ======== Status events (push delivery for the SSE endpoint) ========
+# The worker imports status_channel to publish on the same channel names.
+STATUS_CHANNEL_PREFIX = "status-events:"
+TERMINAL_STATUSES = {"completed", "failed"}
+
+
+def status_channel(file_id: str) -> str:
+    return f"{STATUS_CHANNEL_PREFIX}{file_id}"
+
+
+class StatusSubscription:
+    """One subscriber's view of the bus, used as an async context manager."""
+
+    def __init__(self, bus: "StatusEventBus", file_ids: list[str]):
+        self.bus = bus
+        self.file_ids = file_ids
+        self._queue: asyncio.Queue | None = None
+        self._loop: asyncio.AbstractEventLoop | None = None
+        self._pubsub = None
+
+    async def __aenter__(self):
+        if self.bus.redis_client is not None:
+            try:
+                self._pubsub = self.bus.async_redis().pubsub()
+                await self._pubsub.subscribe(
+                    *[status_channel(f) for f in self.file_ids]
+                )
+                return self
+            except Exception as e:
+                print("[EVENTS] Redis subscribe error, using local bus:", e)
+                self._pubsub = None
+
+        self._use_local_bus()
+        return self
+
+    def _use_local_bus(self):
+        self._loop = asyncio.get_running_loop()
+        self._queue = asyncio.Queue()
+        self.bus._register(self.file_ids, self._loop, self._queue)
+
+    async def _close_pubsub(self):
+        pubsub, self._pubsub = self._pubsub, None
+        try:
+            await pubsub.unsubscribe()
+            await pubsub.aclose()
+        except Exception:
+            pass
+
+    @property
+    def polling(self) -> bool:
+        """
+        True when the worker's transitions don't reach this subscription
+        (no Redis, or pub/sub failed): the caller has to poll for them.
+        """
+        return self._pubsub is None
+
+    async def __aexit__(self, *exc):
+        if self._pubsub is not None:
+            await self._close_pubsub()
+        if self._queue is not None:
+            self.bus._unregister(self.file_ids, self._loop, self._queue)
+
+    async def get(self, timeout: float) -> dict | None:
+        """Next event, or None if nothing arrived within `timeout` seconds."""
+        if self._pubsub is not None:
+            try:
+                msg = await self._pubsub.get_message(
+                    ignore_subscribe_messages=True, timeout=timeout
+                )
+            except Exception as e:
+                # connection dropped mid-stream: carry on without pub/sub
+                print("[EVENTS] Redis pub/sub error, falling back to polling:", e)
+                await self._close_pubsub()
+                self._use_local_bus()
+                return None
+            if not msg:
+                return None
+            try:
+                return json.loads(msg["data"])
+            except (TypeError, ValueError):
+                return None
+
+        try:
+            return await asyncio.wait_for(self._queue.get(), timeout=timeout)
+        except asyncio.TimeoutError:
+            return None
+
+
+class StatusEventBus:
+    """
+    Fan-out of document status transitions.
+
+    With Redis configured, events go through Redis pub/sub so transitions
+    published by the worker reach every backend replica. Without Redis we
+    fall back to an in-process bus, which only sees transitions made by
+    this process (upload complete, retry).
+    """
+
+    def __init__(self, redis_client=None, redis_host=None, redis_port=6379):
+        self.redis_client = redis_client
+        self.redis_host = redis_host
+        self.redis_port = redis_port
+        self._async_redis = None
+        self._lock = threading.Lock()
+        self._local: dict[str, set] = {}
+
+    @property
+    def uses_redis(self) -> bool:
+        return self.redis_client is not None
+
+    def async_redis(self):
+        if self._async_redis is None:
+            self._async_redis = aioredis.Redis(
+                host=self.redis_host,
+                port=self.redis_port,
+                decode_responses=True,
+            )
+        return self._async_redis
+
+    def publish(self, file_id: str, status: str, **extra):
+        """Publish a transition. Safe to call from any thread."""
+        event = {"fileId": file_id, "status": status, **extra}
+        if self.redis_client is not None:
+            try:
+                self.redis_client.publish(status_channel(file_id), json.dumps(event))
+                return
+            except Exception as e:
+                print("[EVENTS] Redis publish error:", e)
+        self._publish_local(event)
+
+    async def publish_async(self, file_id: str, status: str, **extra):
+        """Same as `publish`, for async routes (no blocking Redis call)."""
+        event = {"fileId": file_id, "status": status, **extra}
+        if self.redis_client is not None:
+            try:
+                await self.async_redis().publish(
+                    status_channel(file_id), json.dumps(event)
+                )
+                return
+            except Exception as e:
+                print("[EVENTS] Redis publish error:", e)
+        self._publish_local(event)
+
+    def subscribe(self, file_ids: list[str]) -> StatusSubscription:
+        return StatusSubscription(self, file_ids)
+
+    # ---- in-process bus ----
+    def _register(self, file_ids, loop, queue):
+        with self._lock:
+            for fid in file_ids:
+                self._local.setdefault(fid, set()).add((loop, queue))
+
+    def _unregister(self, file_ids, loop, queue):
+        with self._lock:
+            for fid in file_ids:
+                subs = self._local.get(fid)
+                if subs:
+                    subs.discard((loop, queue))
+                    if not subs:
+                        del self._local[fid]
+
+    def _publish_local(self, event: dict):
+        with self._lock:
+            subs = list(self._local.get(event["fileId"], ()))
+        for loop, queue in subs:
+            try:
+                loop.call_soon_threadsafe(queue.put_nowait, event)
+            except RuntimeError:
+                # subscriber's loop already closed
+                pass
@@ -1,5 +1,10 @@
 from datetime import datetime
+
+from fastapi import Depends
+from sqlalchemy.orm import Session
+
 from config import SessionLocal
+from replicas import read_router
 # ======== Helper ========
 def get_db():
     db = SessionLocal()
@@ -9,6 +14,27 @@ def get_db():
         db.close()
 
 
+def get_read_db(db: Session = Depends(get_db)):
+    """Session for read-only routes: the replica's when usable, else `db`."""
+    read_db = read_router.session(db)
+    if read_db is db:
+        yield db
+        return
+    try:
+        yield read_db
+    finally:
+        read_db.close()
+
+
 def build_s3_key(user_id: str, file_id: str, extension: str) -> str:
     now = datetime.utcnow()
-    return f"uploads/{user_id}/{now.year}/{now.month:02}/{now.day:02}/{file_id}.{extension}"
\ No newline at end of file
+    return f"uploads/{user_id}/{now.year}/{now.month:02}/{now.day:02}/{file_id}.{extension}"
+
+def etag_matches(if_none_match: str | None, etag: str | None) -> bool:
+    """If-None-Match check (weak comparison, as RFC 9110 asks for GET)."""
+    if not if_none_match or not etag:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    tags = [t.strip().removeprefix("W/") for t in if_none_match.split(",")]
+    return etag.removeprefix("W/") in tags
@@ -0,0 +1,241 @@
+import hashlib
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+
+from fastapi import HTTPException
+from fastapi.encoders import jsonable_encoder
+
+import metrics
+from metrics import REDIS_ERRORS
+from responses import FastJSONResponse
+
+# ======== Idempotency keys ========
+# Mutating routes accept an `Idempotency-Key` header. The first request with a
+# key claims it (SET NX, held for IDEMPOTENCY_LOCK_SECONDS); once it succeeds
+# its response body is stored for IDEMPOTENCY_TTL_SECONDS and every repeat of
+# that key is answered from the store with `Idempotent-Replayed: true`,
+# without touching the DB, S3 or SQS. A repeat that arrives while the first is
+# still running gets 409; reusing a key for a different payload gets 422.
+# Failed requests release the key so the client can retry them. Routes whose
+# response goes stale sooner (request_upload returns a presigned URL) pass a
+# shorter `ttl` so a replay never hands out an expired URL.
+# Keys are scoped per route and caller. Without Redis (or while it errors)
+# each process keeps its own records, which still absorbs a client's retries
+# against the same replica.
+
+IDEMPOTENCY_TTL_SECONDS = int(os.getenv("IDEMPOTENCY_TTL_SECONDS", "86400"))
+IDEMPOTENCY_LOCK_SECONDS = int(os.getenv("IDEMPOTENCY_LOCK_SECONDS", "60"))
+IDEMPOTENCY_LOCAL_MAX = int(os.getenv("IDEMPOTENCY_LOCAL_MAX", "10000"))
+MAX_KEY_LENGTH = 255
+
+OUTCOMES = metrics.counter(
+    "idempotency_requests_total",
+    "Requests carrying an Idempotency-Key by outcome (new, replayed, in_progress, mismatch)",
+    ("route", "outcome"),
+)
+
+
+def fingerprint(data) -> str:
+    raw = json.dumps(jsonable_encoder(data), sort_keys=True, separators=(",", ":"))
+    return hashlib.sha256(raw.encode()).hexdigest()
+
+
+def record_key(route: str, scope: str, key: str) -> str:
+    if len(key) > MAX_KEY_LENGTH:
+        raise HTTPException(status_code=400, detail="Idempotency-Key is too long")
+    return f"idempotency:{route}:{scope}:{key}"
+
+
+def _pending(fp: str) -> str:
+    return json.dumps({"state": "in_progress", "fingerprint": fp})
+
+
+def _done(fp: str, body) -> str:
+    return json.dumps({"state": "done", "fingerprint": fp, "body": body})
+
+
+def _replay(route: str, raw: str, fp: str) -> FastJSONResponse:
+    """Response for a key that is already claimed, or raise 409/422."""
+    record = json.loads(raw)
+    if record["fingerprint"] != fp:
+        OUTCOMES.labels(route, "mismatch").inc()
+        raise HTTPException(
+            status_code=422, detail="Idempotency-Key was used with a different request"
+        )
+    if record["state"] != "done":
+        OUTCOMES.labels(route, "in_progress").inc()
+        raise HTTPException(
+            status_code=409,
+            detail="A request with this Idempotency-Key is still in progress",
+            headers={"Retry-After": "1"},
+        )
+    OUTCOMES.labels(route, "replayed").inc()
+    return FastJSONResponse(record["body"], headers={"Idempotent-Replayed": "true"})
+
+
+class _LocalRecords:
+    """In-process stand-in for the Redis records (bounded, with expiry)."""
+
+    def __init__(self, max_entries: int = IDEMPOTENCY_LOCAL_MAX):
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._records: OrderedDict[str, tuple[str, float]] = OrderedDict()
+
+    def claim(self, key: str, value: str, ttl: int) -> str | None:
+        """Store `value` unless a live record exists; returns that record."""
+        now = time.monotonic()
+        with self._lock:
+            entry = self._records.get(key)
+            if entry and entry[1] > now:
+                return entry[0]
+            self._records[key] = (value, now + ttl)
+            self._records.move_to_end(key)
+            while len(self._records) > self.max_entries:
+                self._records.popitem(last=False)
+        return None
+
+    def set(self, key: str, value: str, ttl: int):
+        with self._lock:
+            self._records[key] = (value, time.monotonic() + ttl)
+            self._records.move_to_end(key)
+            while len(self._records) > self.max_entries:
+                self._records.popitem(last=False)
+
+    def delete(self, key: str):
+        with self._lock:
+            self._records.pop(key, None)
+
+
+class IdempotencyStore:
+    def __init__(
+        self,
+        redis_client=None,
+        ttl: int = IDEMPOTENCY_TTL_SECONDS,
+        lock_seconds: int = IDEMPOTENCY_LOCK_SECONDS,
+    ):
+        self.redis_client = redis_client
+        self.ttl = ttl
+        self.lock_seconds = lock_seconds
+        self.local = _LocalRecords()
+
+    def _claim(self, key: str, value: str) -> str | None:
+        if self.redis_client:
+            try:
+                # a record can expire between SET NX and GET; claim again then
+                for _ in range(2):
+                    if self.redis_client.set(key, value, nx=True, ex=self.lock_seconds):
+                        return None
+                    existing = self.redis_client.get(key)
+                    if existing is not None:
+                        return existing
+                return None
+            except Exception as e:
+                REDIS_ERRORS.labels("idempotency", "claim").inc()
+                print("[APP] Redis idempotency error, using local records:", e)
+        return self.local.claim(key, value, self.lock_seconds)
+
+    def _set(self, key: str, value: str, ttl: int):
+        if self.redis_client:
+            try:
+                self.redis_client.set(key, value, ex=ttl)
+                return
+            except Exception as e:
+                REDIS_ERRORS.labels("idempotency", "set").inc()
+                print("[APP] Redis idempotency write error:", e)
+        self.local.set(key, value, ttl)
+
+    def _release(self, key: str):
+        self.local.delete(key)
+        if self.redis_client:
+            try:
+                self.redis_client.delete(key)
+            except Exception:
+                REDIS_ERRORS.labels("idempotency", "delete").inc()
+
+    def run(
+        self, route: str, scope: str, idempotency_key: str | None, request_data, handler,
+        ttl: int | None = None,
+    ):
+        """
+        `handler()` once per (route, scope, idempotency_key); repeats get the
+        stored body for `ttl` seconds (default self.ttl). Without a key the
+        handler simply runs.
+        """
+        if not idempotency_key:
+            return handler()
+        key = record_key(route, scope, idempotency_key)
+        fp = fingerprint(request_data)
+        existing = self._claim(key, _pending(fp))
+        if existing is not None:
+            return _replay(route, existing, fp)
+
+        OUTCOMES.labels(route, "new").inc()
+        try:
+            result = handler()
+        except BaseException:
+            self._release(key)
+            raise
+        self._set(key, _done(fp, jsonable_encoder(result)), ttl or self.ttl)
+        return result
+
+
+class AsyncIdempotencyStore(IdempotencyStore):
+    """Same contract on redis.asyncio, for BACKEND_IO_MODE=async."""
+
+    async def _claim(self, key: str, value: str) -> str | None:
+        if self.redis_client:
+            try:
+                for _ in range(2):
+                    if await self.redis_client.set(key, value, nx=True, ex=self.lock_seconds):
+                        return None
+                    existing = await self.redis_client.get(key)
+                    if existing is not None:
+                        return existing
+                return None
+            except Exception as e:
+                REDIS_ERRORS.labels("idempotency", "claim").inc()
+                print("[APP] Redis idempotency error, using local records:", e)
+        return self.local.claim(key, value, self.lock_seconds)
+
+    async def _set(self, key: str, value: str, ttl: int):
+        if self.redis_client:
+            try:
+                await self.redis_client.set(key, value, ex=ttl)
+                return
+            except Exception as e:
+                REDIS_ERRORS.labels("idempotency", "set").inc()
+                print("[APP] Redis idempotency write error:", e)
+        self.local.set(key, value, ttl)
+
+    async def _release(self, key: str):
+        self.local.delete(key)
+        if self.redis_client:
+            try:
+                await self.redis_client.delete(key)
+            except Exception:
+                REDIS_ERRORS.labels("idempotency", "delete").inc()
+
+    async def run(
+        self, route: str, scope: str, idempotency_key: str | None, request_data, handler,
+        ttl: int | None = None,
+    ):
+        """Async `run`: `handler()` returns an awaitable."""
+        if not idempotency_key:
+            return await handler()
+        key = record_key(route, scope, idempotency_key)
+        fp = fingerprint(request_data)
+        existing = await self._claim(key, _pending(fp))
+        if existing is not None:
+            return _replay(route, existing, fp)
+
+        OUTCOMES.labels(route, "new").inc()
+        try:
+            result = await handler()
+        except BaseException:
+            await self._release(key)
+            raise
+        await self._set(key, _done(fp, jsonable_encoder(result)), ttl or self.ttl)
+        return result
@@ -0,0 +1,284 @@
+import bisect
+import math
+import threading
+import time
+
+# ======== Minimal in-process metrics registry ========
+# Counters, gauges and histograms with optional labels. Cheap enough to call
+# on the request path (one lock per update).
+
+DEFAULT_BUCKETS = (
+    0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0,
+)
+
+
+class _CounterChild:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.value = 0.0
+
+    def inc(self, amount: float = 1.0):
+        with self._lock:
+            self.value += amount
+
+
+class _GaugeChild:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.value = 0.0
+        self._fn = None
+
+    def set(self, value: float):
+        self.value = value
+
+    def inc(self, amount: float = 1.0):
+        with self._lock:
+            self.value += amount
+
+    def dec(self, amount: float = 1.0):
+        with self._lock:
+            self.value -= amount
+
+    def set_function(self, fn):
+        """Read the value from `fn()` at collection time."""
+        self._fn = fn
+
+    def get(self) -> float:
+        if self._fn is not None:
+            try:
+                return float(self._fn())
+            except Exception:
+                return float("nan")
+        return self.value
+
+
+class _HistogramChild:
+    def __init__(self, buckets):
+        self._lock = threading.Lock()
+        self.buckets = buckets
+        self.counts = [0] * len(buckets)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float):
+        i = bisect.bisect_left(self.buckets, value)  # first bound >= value
+        with self._lock:
+            self.sum += value
+            self.count += 1
+            if i < len(self.counts):
+                self.counts[i] += 1
+
+    def time(self):
+        return _Timer(self)
+
+
+class _Timer:
+    def __init__(self, child):
+        self.child = child
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.child.observe(time.perf_counter() - self.start)
+
+
+class _Metric:
+    kind = ""
+
+    def __init__(self, name: str, documentation: str, labelnames=(), **kwargs):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._kwargs = kwargs
+        self._lock = threading.Lock()
+        self._children: dict[tuple, object] = {}
+        if not self.labelnames:
+            self._default = self._new_child()
+            self._children[()] = self._default
+
+    def _new_child(self):
+        raise NotImplementedError
+
+    def labels(self, *values, **kwvalues):
+        if kwvalues:
+            values = tuple(str(kwvalues[n]) for n in self.labelnames)
+        else:
+            values = tuple(str(v) for v in values)
+        child = self._children.get(values)
+        if child is None:
+            with self._lock:
+                child = self._children.setdefault(values, self._new_child())
+        return child
+
+    def children(self):
+        """[(labels dict, child)] for collection."""
+        return [
+            (dict(zip(self.labelnames, key)), child)
+            for key, child in list(self._children.items())
+        ]
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def _new_child(self):
+        return _CounterChild()
+
+    def inc(self, amount: float = 1.0):
+        self._default.inc(amount)
+
+
+class Gauge(_Metric):
+    kind = "gauge"
+
+    def _new_child(self):
+        return _GaugeChild()
+
+    def set(self, value: float):
+        self._default.set(value)
+
+    def inc(self, amount: float = 1.0):
+        self._default.inc(amount)
+
+    def dec(self, amount: float = 1.0):
+        self._default.dec(amount)
+
+    def set_function(self, fn):
+        self._default.set_function(fn)
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def _new_child(self):
+        return _HistogramChild(self._kwargs.get("buckets") or DEFAULT_BUCKETS)
+
+    def observe(self, value: float):
+        self._default.observe(value)
+
+    def time(self):
+        return self._default.time()
+
+
+REGISTRY: dict[str, _Metric] = {}
+_registry_lock = threading.Lock()
+
+
+def _get_or_create(cls, name, documentation, labelnames=(), **kwargs):
+    with _registry_lock:
+        metric = REGISTRY.get(name)
+        if metric is None:
+            metric = cls(name, documentation, labelnames, **kwargs)
+            REGISTRY[name] = metric
+        return metric
+
+
+def counter(name: str, documentation: str, labelnames=()) -> Counter:
+    return _get_or_create(Counter, name, documentation, labelnames)
+
+
+def gauge(name: str, documentation: str, labelnames=()) -> Gauge:
+    return _get_or_create(Gauge, name, documentation, labelnames)
+
+
+def histogram(name: str, documentation: str, labelnames=(), buckets=None) -> Histogram:
+    return _get_or_create(Histogram, name, documentation, labelnames, buckets=buckets)
+
+
+# ======== Metrics shared across modules ========
+# Declared once here so every component reports into the same series.
+
+REDIS_ERRORS = counter(
+    "redis_errors_total", "Redis calls that raised, by component and op", ("component", "op")
+)
+
+_collectors = []
+
+
+def register_collector(fn):
+    """
+    `fn()` returns [(name, kind, documentation, [(labels dict, value)])],
+    evaluated at scrape time. For values that only exist as live state
+    (in-flight requests per route) and shouldn't cost anything per request.
+    """
+    _collectors.append(fn)
+
+
+def snapshot() -> dict:
+    """JSON-friendly view of every metric."""
+    out = {}
+    for name, metric in list(REGISTRY.items()):
+        series = []
+        for labels, child in metric.children():
+            if metric.kind == "counter":
+                series.append({"labels": labels, "value": child.value})
+            elif metric.kind == "gauge":
+                series.append({"labels": labels, "value": child.get()})
+            else:
+                series.append(
+                    {
+                        "labels": labels,
+                        "count": child.count,
+                        "sum": child.sum,
+                        "avg": child.sum / child.count if child.count else None,
+                    }
+                )
+        out[name] = {"type": metric.kind, "help": metric.documentation, "series": series}
+    return out
+
+
+def _format_value(value: float) -> str:
+    if math.isnan(value):
+        return "NaN"
+    if math.isinf(value):
+        return "+Inf" if value > 0 else "-Inf"
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(labels: dict, extra: dict | None = None) -> str:
+    items = {**labels, **(extra or {})}
+    if not items:
+        return ""
+    return "{" + ",".join(f'{k}="{_escape(str(v))}"' for k, v in items.items()) + "}"
+
+
+def render_prometheus() -> str:
+    """Text exposition format (version 0.0.4) of this process's metrics."""
+    lines = []
+    for name, metric in sorted(REGISTRY.items()):
+        lines.append(f"# HELP {name} {metric.documentation}")
+        lines.append(f"# TYPE {name} {metric.kind}")
+        for labels, child in metric.children():
+            if metric.kind == "counter":
+                lines.append(f"{name}{_format_labels(labels)} {_format_value(child.value)}")
+            elif metric.kind == "gauge":
+                lines.append(f"{name}{_format_labels(labels)} {_format_value(child.get())}")
+            else:
+                with child._lock:
+                    counts = list(child.counts)
+                    total, count = child.sum, child.count
+                cumulative = 0
+                for bound, n in zip(child.buckets, counts):
+                    cumulative += n
+                    lines.append(
+                        f"{name}_bucket{_format_labels(labels, {'le': _format_value(bound)})} {cumulative}"
+                    )
+                lines.append(f"{name}_bucket{_format_labels(labels, {'le': '+Inf'})} {count}")
+                lines.append(f"{name}_sum{_format_labels(labels)} {_format_value(total)}")
+                lines.append(f"{name}_count{_format_labels(labels)} {count}")
+
+    for collect in _collectors:
+        for name, kind, documentation, series in collect():
+            lines.append(f"# HELP {name} {documentation}")
+            lines.append(f"# TYPE {name} {kind}")
+            for labels, value in series:
+                lines.append(f"{name}{_format_labels(labels)} {_format_value(value)}")
+    return "\n".join(lines) + "\n"
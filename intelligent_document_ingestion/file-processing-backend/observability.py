@@ -0,0 +1,87 @@
+import time
+
+import metrics
+
+# ======== Request metrics ========
+# MetricsMiddleware records one latency observation per request, labelled
+# with the route template (not the raw path, which would carry fileIds).
+# The route is only known after routing, so in-flight requests are kept as
+# live scopes and grouped by route when /metrics is scraped; the request
+# path itself only pays for a dict insert/delete and one histogram observe.
+# Values are per process: with several uvicorn/gunicorn workers each one
+# exposes its own series.
+
+REQUEST_SECONDS = metrics.histogram(
+    "http_request_duration_seconds",
+    "Request latency by route template",
+    ("method", "route", "status"),
+)
+
+_active: dict[int, dict] = {}
+
+
+def _route_of(scope: dict) -> str:
+    route = scope.get("route")
+    return getattr(route, "path", None) or "unmatched"
+
+
+def _collect_in_flight():
+    counts: dict[tuple, int] = {}
+    for scope in list(_active.values()):
+        key = (scope.get("method", ""), _route_of(scope))
+        counts[key] = counts.get(key, 0) + 1
+    return [
+        (
+            "http_requests_in_flight",
+            "gauge",
+            "Requests currently being handled, by route template",
+            [({"method": m, "route": r}, n) for (m, r), n in sorted(counts.items())],
+        )
+    ]
+
+
+metrics.register_collector(_collect_in_flight)
+
+
+class MetricsMiddleware:
+    """Pure ASGI; add it last so it is outermost and times the whole stack."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        start = time.perf_counter()
+        status_code = 500
+        key = id(scope)
+        _active[key] = scope
+
+        async def send_wrapper(message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            _active.pop(key, None)
+            REQUEST_SECONDS.labels(scope["method"], _route_of(scope), status_code).observe(
+                time.perf_counter() - start
+            )
+
+
+def instrument_engine(engine, name: str = "primary"):
+    """Connection pool gauges for a SQLAlchemy engine (read at scrape time)."""
+    pool = engine.pool
+    for metric_name, doc, fn in (
+        ("db_pool_checked_out", "Connections currently checked out", "checkedout"),
+        ("db_pool_overflow", "Connections opened beyond pool_size", "overflow"),
+        ("db_pool_size", "Configured pool_size", "size"),
+    ):
+        if hasattr(pool, fn):
+            gauge = metrics.gauge(metric_name, doc, ("engine",))
+            gauge.labels(name).set_function(getattr(pool, fn))
@@ -0,0 +1,189 @@
+import json
+import os
+import threading
+from datetime import datetime, timedelta
+
+from sqlalchemy import Column, DateTime, Index, Integer, Text
+
+import metrics
+from config import Base
+from sqs_publisher import SEND_SECONDS
+
+# ======== Transactional outbox for worker jobs ========
+# Routes write the job message into `outbox` in the same transaction as the
+# document's status change, so either both happen or neither does, and the
+# request only pays for one DB commit. OutboxRelay drains the table to SQS in
+# batches; rows are claimed with FOR UPDATE SKIP LOCKED so every backend
+# replica can relay in parallel without sending the same row twice.
+
+# "direct" (send to SQS inside the request) or "outbox"
+JOB_DISPATCH_MODE = os.getenv("JOB_DISPATCH_MODE", "direct").lower()
+OUTBOX_BATCH_SIZE = int(os.getenv("OUTBOX_BATCH_SIZE", "100"))
+OUTBOX_POLL_SECONDS = float(os.getenv("OUTBOX_POLL_SECONDS", "1"))
+OUTBOX_MAX_BACKOFF_SECONDS = 300
+SQS_MAX_BATCH = 10
+
+RELAYED = metrics.counter(
+    "outbox_relayed_total", "Outbox rows handed to SQS by outcome", ("outcome",)
+)
+RELAY_BATCH_SIZE = metrics.histogram(
+    "outbox_relay_batch_size",
+    "Rows claimed per relay pass",
+    buckets=(1, 5, 10, 25, 50, 100, 250, 500),
+)
+RELAY_LAG_SECONDS = metrics.histogram(
+    "outbox_relay_lag_seconds", "Time from outbox insert to SQS accept"
+)
+
+
+class OutboxEvent(Base):
+    __tablename__ = "outbox"
+
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    payload = Column(Text, nullable=False)  # SQS message body
+    created_at = Column(DateTime, default=datetime.utcnow)
+    available_at = Column(DateTime, default=datetime.utcnow)  # pushed back on failure
+    attempts = Column(Integer, default=0)
+    last_error = Column(Text, nullable=True)
+
+
+Index("ix_outbox_available_at", OutboxEvent.available_at, OutboxEvent.id)
+
+
+def enqueue(db, message: dict | str) -> OutboxEvent:
+    """Add a job to the caller's transaction; it is sent after the commit."""
+    body = message if isinstance(message, str) else json.dumps(message)
+    event = OutboxEvent(payload=body)
+    db.add(event)
+    return event
+
+
+class OutboxRelay:
+    """
+    Background thread that moves outbox rows to SQS.
+
+    `wake()` after committing new rows makes this replica relay right away;
+    otherwise the table is polled every `poll_interval` seconds.
+    """
+
+    def __init__(
+        self,
+        session_factory,
+        client_factory,
+        queue_url_factory,
+        batch_size: int = OUTBOX_BATCH_SIZE,
+        poll_interval: float = OUTBOX_POLL_SECONDS,
+    ):
+        self.session_factory = session_factory
+        self.client_factory = client_factory
+        self.queue_url_factory = queue_url_factory
+        self.batch_size = batch_size
+        self.poll_interval = poll_interval
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._thread: threading.Thread | None = None
+
+    def start(self):
+        if self._thread is None:
+            self._stop.clear()
+            self._thread = threading.Thread(
+                target=self._run, name="outbox-relay", daemon=True
+            )
+            self._thread.start()
+            print("[APP] Outbox relay started")
+
+    def stop(self):
+        self._stop.set()
+        self._wake.set()
+        if self._thread is not None:
+            self._thread.join(timeout=5)
+            self._thread = None
+
+    def wake(self):
+        self._wake.set()
+
+    def _run(self):
+        while not self._stop.is_set():
+            self._wake.clear()
+            try:
+                sent = self.drain_once()
+            except Exception as e:  # keep relaying after DB/SQS hiccups
+                print("[APP] Outbox relay error:", e)
+                sent = 0
+            if sent < self.batch_size:
+                # caught up: sleep until woken or the next poll
+                self._wake.wait(self.poll_interval)
+
+    def drain_once(self) -> int:
+        """Claim one batch of due rows and send it. Returns rows sent."""
+        db = self.session_factory()
+        try:
+            now = datetime.utcnow()
+            rows = (
+                db.query(OutboxEvent)
+                .filter(OutboxEvent.available_at <= now)
+                .order_by(OutboxEvent.id)
+                .limit(self.batch_size)
+                .with_for_update(skip_locked=True)
+                .all()
+            )
+            if not rows:
+                db.rollback()
+                return 0
+            RELAY_BATCH_SIZE.observe(len(rows))
+
+            sent_ids = []
+            for i in range(0, len(rows), SQS_MAX_BATCH):
+                sent_ids += self._send_chunk(rows[i : i + SQS_MAX_BATCH])
+
+            if sent_ids:
+                db.query(OutboxEvent).filter(OutboxEvent.id.in_(sent_ids)).delete(
+                    synchronize_session=False
+                )
+            db.commit()
+            return len(sent_ids)
+        except Exception:
+            db.rollback()
+            raise
+        finally:
+            db.close()
+
+    def _send_chunk(self, rows: list[OutboxEvent]) -> list[int]:
+        by_id = {str(row.id): row for row in rows}
+        try:
+            with SEND_SECONDS.labels("send_message_batch").time():
+                resp = self.client_factory().send_message_batch(
+                    QueueUrl=self.queue_url_factory(),
+                    Entries=[
+                        {"Id": key, "MessageBody": row.payload}
+                        for key, row in by_id.items()
+                    ],
+                )
+        except Exception as e:
+            print("[APP] Outbox send_message_batch failed:", e)
+            for row in rows:
+                self._defer(row, str(e))
+            return []
+
+        sent = []
+        now = datetime.utcnow()
+        for ok in resp.get("Successful", []):
+            row = by_id.pop(ok["Id"])
+            RELAYED.labels("sent").inc()
+            RELAY_LAG_SECONDS.observe((now - row.created_at).total_seconds())
+            sent.append(row.id)
+        for failed in resp.get("Failed", []):
+            row = by_id.pop(failed["Id"])
+            self._defer(row, f"{failed.get('Code')}: {failed.get('Message')}")
+        for row in by_id.values():
+            self._defer(row, "missing from batch response")
+        return sent
+
+    def _defer(self, row: OutboxEvent, reason: str):
+        # exponential backoff; the row stays until SQS accepts it
+        row.attempts = (row.attempts or 0) + 1
+        row.last_error = reason
+        delay = min(2 ** row.attempts, OUTBOX_MAX_BACKOFF_SECONDS)
+        row.available_at = datetime.utcnow() + timedelta(seconds=delay)
+        RELAYED.labels("deferred").inc()
+        print(f"[APP] Outbox row {row.id} deferred {delay}s: {reason}")
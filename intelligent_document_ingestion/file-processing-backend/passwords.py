@@ -0,0 +1,208 @@
+import asyncio
+import multiprocessing
+import os
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor, TimeoutError as FutureTimeout
+
+from passlib.context import CryptContext
+
+import metrics
+
+# ======== Bounded Argon2 executor ========
+# Argon2 is deliberately slow and memory hungry. Running it inline in the
+# request threads lets a login storm starve the threadpool that also serves
+# uploads and status polls, so hashing goes to a small dedicated process
+# pool. At most PASSWORD_HASH_MAX_PENDING jobs may be running or queued;
+# beyond that callers get PasswordHashingBusy right away (-> 503). A job
+# not done within PASSWORD_HASH_TIMEOUT raises PasswordHashingTimeout
+# instead (also 503, counted separately: slow hashing is not a full queue).
+# Async callers (login) await the job without holding a thread. Sync callers
+# park their request thread on it, so at most PASSWORD_HASH_MAX_BLOCKING of
+# them may wait at once - keep that well below the AnyIO threadpool (40).
+# A job's slot is freed when the job ends, not when its caller times out: a
+# job already running in a worker cannot be cancelled, so it still occupies
+# that process until it finishes.
+# Keep this module light: it is what the pool's child processes import.
+
+PASSWORD_HASH_WORKERS = int(
+    os.getenv("PASSWORD_HASH_WORKERS", str(min(4, os.cpu_count() or 1)))
+)  # 0 = hash inline in the calling thread
+PASSWORD_HASH_MAX_PENDING = int(os.getenv("PASSWORD_HASH_MAX_PENDING", "32"))
+PASSWORD_HASH_MAX_BLOCKING = int(os.getenv("PASSWORD_HASH_MAX_BLOCKING", "4"))
+PASSWORD_HASH_TIMEOUT = float(os.getenv("PASSWORD_HASH_TIMEOUT", "10"))
+
+_pwd_context = CryptContext(schemes=["argon2"], deprecated="auto")
+
+HASH_SECONDS = metrics.histogram(
+    "password_hash_seconds", "Argon2 hash/verify time in the worker", ("op",)
+)
+QUEUE_WAIT_SECONDS = metrics.histogram(
+    "password_hash_queue_wait_seconds", "Time a hash job waited for a worker", ("op",)
+)
+REJECTED = metrics.counter(
+    "password_hash_rejected_total", "Hash jobs rejected because the queue was full", ("op",)
+)
+TIMEOUTS = metrics.counter(
+    "password_hash_timeouts_total",
+    "Hash jobs whose caller gave up after PASSWORD_HASH_TIMEOUT",
+    ("op",),
+)
+PENDING = metrics.gauge("password_hash_pending", "Hash jobs running or queued")
+
+
+class PasswordHashingBusy(Exception):
+    """The hashing queue is full; the caller should shed the request."""
+
+
+class PasswordHashingTimeout(Exception):
+    """The job did not finish within PASSWORD_HASH_TIMEOUT."""
+
+
+def _timed(op: str, *args):
+    # runs in the child process; wall clock so the parent can compute queue wait
+    started = time.time()
+    if op == "hash":
+        result = _pwd_context.hash(*args)
+    else:
+        result = _pwd_context.verify(*args)
+    return result, started, time.time()
+
+
+def _noop():
+    return None
+
+
+_pool: ProcessPoolExecutor | None = None
+_pool_lock = threading.Lock()
+_slots = threading.BoundedSemaphore(max(PASSWORD_HASH_MAX_PENDING, 1))
+_blocking_slots = threading.BoundedSemaphore(max(PASSWORD_HASH_MAX_BLOCKING, 1))
+
+
+def _get_pool() -> ProcessPoolExecutor:
+    global _pool
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                # spawn: forking a process that already runs request threads
+                # can copy held locks into the child
+                _pool = ProcessPoolExecutor(
+                    max_workers=PASSWORD_HASH_WORKERS,
+                    mp_context=multiprocessing.get_context("spawn"),
+                )
+    return _pool
+
+
+def warm_up():
+    """Start the worker processes now instead of on the first login."""
+    if PASSWORD_HASH_WORKERS > 0:
+        pool = _get_pool()
+        for f in [pool.submit(_noop) for _ in range(PASSWORD_HASH_WORKERS)]:
+            f.result()
+
+
+def shutdown():
+    global _pool
+    if _pool is not None:
+        _pool.shutdown(wait=False, cancel_futures=True)
+        _pool = None
+
+
+def _reject(op: str):
+    REJECTED.labels(op).inc()
+    raise PasswordHashingBusy(op)
+
+
+def _timed_out(op: str):
+    TIMEOUTS.labels(op).inc()
+    raise PasswordHashingTimeout(op)
+
+
+def _observe(op: str, submitted: float, started: float, finished: float):
+    QUEUE_WAIT_SECONDS.labels(op).observe(max(started - submitted, 0.0))
+    HASH_SECONDS.labels(op).observe(finished - started)
+
+
+def _job_done(op: str, submitted: float, slots, future):
+    PENDING.dec()
+    slots.release()
+    if not future.cancelled() and future.exception() is None:
+        _observe(op, submitted, *future.result()[1:])
+
+
+def _submit(op: str, *args):
+    """Queue one job on the pool; its slot is released by the job itself."""
+    slots = _slots
+    if not slots.acquire(blocking=False):
+        _reject(op)
+    PENDING.inc()
+    submitted = time.time()
+    try:
+        future = _get_pool().submit(_timed, op, *args)
+    except BaseException:
+        PENDING.dec()
+        slots.release()
+        raise
+    future.add_done_callback(lambda f: _job_done(op, submitted, slots, f))
+    return future
+
+
+def _run_inline(op: str, *args):
+    if not _slots.acquire(blocking=False):
+        _reject(op)
+    PENDING.inc()
+    submitted = time.time()
+    try:
+        result, started, finished = _timed(op, *args)
+    finally:
+        PENDING.dec()
+        _slots.release()
+    _observe(op, submitted, started, finished)
+    return result
+
+
+def _run(op: str, *args):
+    """Blocking call, for sync routes and scripts."""
+    if PASSWORD_HASH_WORKERS <= 0:
+        return _run_inline(op, *args)
+    if not _blocking_slots.acquire(blocking=False):
+        _reject(op)
+    try:
+        future = _submit(op, *args)
+        try:
+            return future.result(timeout=PASSWORD_HASH_TIMEOUT)[0]
+        except FutureTimeout:
+            future.cancel()  # only takes effect if it has not started yet
+            _timed_out(op)
+    finally:
+        _blocking_slots.release()
+
+
+async def _run_async(op: str, *args):
+    """Awaitable call: no thread is held while the job queues or runs."""
+    if PASSWORD_HASH_WORKERS <= 0:
+        return await asyncio.to_thread(_run_inline, op, *args)
+    future = _submit(op, *args)
+    try:
+        # on timeout (or a dropped request) wait_for cancels the wrapper,
+        # which cancels the job only if it is still queued
+        result = await asyncio.wait_for(asyncio.wrap_future(future), PASSWORD_HASH_TIMEOUT)
+    except asyncio.TimeoutError:
+        _timed_out(op)
+    return result[0]
+
+
+def hash_password(password: str) -> str:
+    return _run("hash", password)
+
+
+def verify_password(plain_password: str, hashed_password: str) -> bool:
+    return _run("verify", plain_password, hashed_password)
+
+
+async def hash_password_async(password: str) -> str:
+    return await _run_async("hash", password)
+
+
+async def verify_password_async(plain_password: str, hashed_password: str) -> bool:
+    return await _run_async("verify", plain_password, hashed_password)
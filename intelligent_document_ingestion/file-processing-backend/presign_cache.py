@@ -0,0 +1,138 @@
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+
+import metrics
+from metrics import REDIS_ERRORS
+
+# ======== Presigned download URL cache ========
+# SigV4 signing is pure CPU, and status polling re-signs the same key over and
+# over. Signed URLs are cached per (bucket, key, method) in process (LRU) and,
+# when Redis is configured, shared across replicas under presign:*. An entry
+# is handed out until PRESIGN_SAFETY_MARGIN seconds before it expires, so a
+# client always gets at least that much time to use the URL.
+
+PRESIGN_EXPIRES_IN = int(os.getenv("PRESIGN_EXPIRES_IN", "1800"))
+PRESIGN_SAFETY_MARGIN = int(os.getenv("PRESIGN_SAFETY_MARGIN", "300"))
+PRESIGN_CACHE_SIZE = int(os.getenv("PRESIGN_CACHE_SIZE", "10000"))
+CACHED_METHODS = ("get_object",)
+
+LOOKUPS = metrics.counter(
+    "presign_cache_lookups_total",
+    "Presigned URL lookups by result (local_hit, redis_hit, signed)",
+    ("result",),
+)
+SIGN_SECONDS = metrics.histogram(
+    "s3_presign_seconds", "Time spent in generate_presigned_url", ("method",)
+)
+
+
+class PresignedUrlCache:
+    """
+    `signer(ClientMethod=..., Params=..., ExpiresIn=...)` is the S3 client's
+    generate_presigned_url, passed as a callable so tests can swap the client.
+    """
+
+    def __init__(
+        self,
+        signer,
+        redis_client=None,
+        expires_in: int = PRESIGN_EXPIRES_IN,
+        safety_margin: int = PRESIGN_SAFETY_MARGIN,
+        max_entries: int = PRESIGN_CACHE_SIZE,
+    ):
+        self.signer = signer
+        self.redis_client = redis_client
+        self.expires_in = expires_in
+        self.safety_margin = min(safety_margin, expires_in // 2)
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._entries: OrderedDict[tuple, tuple[str, float]] = OrderedDict()
+
+    @staticmethod
+    def _redis_key(bucket: str, key: str, method: str) -> str:
+        return f"presign:{method}:{bucket}/{key}"
+
+    def _usable(self, expires_at: float, now: float) -> bool:
+        return expires_at - now > self.safety_margin
+
+    def get(self, bucket: str, key: str, method: str = "get_object") -> tuple[str, float]:
+        """(url, expires_at epoch seconds) for the object, signing on a miss."""
+        cache_key = (bucket, key, method)
+        now = time.time()
+
+        with self._lock:
+            entry = self._entries.get(cache_key)
+            if entry and self._usable(entry[1], now):
+                self._entries.move_to_end(cache_key)
+                LOOKUPS.labels("local_hit").inc()
+                return entry
+
+        if self.redis_client:
+            try:
+                raw = self.redis_client.get(self._redis_key(bucket, key, method))
+                if raw:
+                    data = json.loads(raw)
+                    entry = (data["url"], float(data["expiresAt"]))
+                    if self._usable(entry[1], now):
+                        self._remember(cache_key, entry)
+                        LOOKUPS.labels("redis_hit").inc()
+                        return entry
+            except Exception as e:
+                REDIS_ERRORS.labels("presign_cache", "get").inc()
+                print("[APP] Redis read error:", e)
+
+        with SIGN_SECONDS.labels(method).time():
+            url = self.signer(
+                ClientMethod=method,
+                Params={"Bucket": bucket, "Key": key},
+                ExpiresIn=self.expires_in,
+            )
+        entry = (url, now + self.expires_in)
+        LOOKUPS.labels("signed").inc()
+        self._remember(cache_key, entry)
+
+        if self.redis_client:
+            try:
+                self.redis_client.set(
+                    self._redis_key(bucket, key, method),
+                    json.dumps({"url": url, "expiresAt": entry[1]}),
+                    ex=self.expires_in - self.safety_margin,
+                )
+            except Exception as e:
+                REDIS_ERRORS.labels("presign_cache", "set").inc()
+                print("[APP] Redis write error:", e)
+        return entry
+
+    def _remember(self, cache_key: tuple, entry: tuple[str, float]):
+        with self._lock:
+            self._entries[cache_key] = entry
+            self._entries.move_to_end(cache_key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, bucket: str, key: str):
+        """Forget every cached URL for the object (call when it is deleted)."""
+        self.invalidate_many(bucket, [key])
+
+    def invalidate_many(self, bucket: str, keys: list[str]):
+        """invalidate() for many objects, one Redis DEL."""
+        if not keys:
+            return
+        with self._lock:
+            for key in keys:
+                for method in CACHED_METHODS:
+                    self._entries.pop((bucket, key, method), None)
+        if self.redis_client:
+            try:
+                self.redis_client.delete(
+                    *[self._redis_key(bucket, k, m) for k in keys for m in CACHED_METHODS]
+                )
+            except Exception:
+                REDIS_ERRORS.labels("presign_cache", "delete").inc()
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
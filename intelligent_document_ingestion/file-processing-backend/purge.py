@@ -0,0 +1,230 @@
+import os
+import threading
+import time
+import uuid
+from datetime import datetime, timedelta
+
+import metrics
+
+# ======== Bulk delete / retention purge ========
+# Documents are removed in chunks of up to PURGE_CHUNK_SIZE (S3 accepts 1000
+# keys per DeleteObjects): one SELECT, one DeleteObjects, one DELETE ... IN
+# and one pipelined Redis write per chunk. S3 goes first, so an interrupted
+# run leaves rows whose object may already be gone; running it again picks
+# them up (deleting a missing key is not an error). Rows whose object could
+# not be deleted are kept for the next run. S3 objects still referenced by a
+# document outside the chunk (deduplicated uploads) are left in place.
+
+PURGE_CHUNK_SIZE = min(int(os.getenv("PURGE_CHUNK_SIZE", "1000")), 1000)
+RETENTION_DAYS = float(os.getenv("RETENTION_DAYS", "0"))  # 0 = no retention purge
+PURGE_JOBS_KEPT = 20
+
+PURGED = metrics.counter(
+    "purge_documents_total", "Documents handled by bulk delete/purge by outcome", ("outcome",)
+)
+S3_DELETE_SECONDS = metrics.histogram(
+    "s3_delete_objects_seconds", "DeleteObjects call latency (one chunk)"
+)
+
+
+class DocumentPurger:
+    """
+    `model` is the Document class; `s3_client_factory()` returns the S3
+    client; the caches are the app's StatusCache and PresignedUrlCache.
+    """
+
+    def __init__(
+        self,
+        session_factory,
+        model,
+        s3_client_factory,
+        bucket: str,
+        status_cache=None,
+        presigned_urls=None,
+        chunk_size: int = PURGE_CHUNK_SIZE,
+    ):
+        self.session_factory = session_factory
+        self.model = model
+        self.s3_client_factory = s3_client_factory
+        self.bucket = bucket
+        self.status_cache = status_cache
+        self.presigned_urls = presigned_urls
+        self.chunk_size = chunk_size
+        self._jobs: dict[str, dict] = {}
+        self._jobs_lock = threading.Lock()
+
+    # ---- one chunk ----
+    def _delete_objects(self, keys: list[str]) -> set[str]:
+        """DeleteObjects for `keys`; returns the keys S3 reported errors for."""
+        if not keys:
+            return set()
+        with S3_DELETE_SECONDS.time():
+            resp = self.s3_client_factory().delete_objects(
+                Bucket=self.bucket,
+                Delete={"Objects": [{"Key": k} for k in keys], "Quiet": True},
+            )
+        failed = set()
+        for err in resp.get("Errors", []):
+            print("[APP] S3 delete error:", err.get("Key"), err.get("Code"), err.get("Message"))
+            failed.add(err.get("Key"))
+        return failed
+
+    def delete_rows(self, db, rows) -> dict:
+        """Delete (file_id, s3_key) rows: S3 objects, DB rows, cache entries."""
+        Document = self.model
+        ids = [r[0] for r in rows]
+        keys = {r[1] for r in rows if r[1]}
+
+        shared = set()
+        if keys:
+            shared = {
+                k
+                for (k,) in db.query(Document.s3_key)
+                .filter(Document.s3_key.in_(keys), Document.file_id.notin_(ids))
+                .distinct()
+            }
+        to_delete = sorted(keys - shared)
+        try:
+            failed_keys = self._delete_objects(to_delete)
+        except Exception as e:
+            print("[APP] S3 DeleteObjects failed:", e)
+            failed_keys = set(to_delete)
+
+        done = [fid for fid, key in rows if key not in failed_keys]
+        if done:
+            db.query(Document).filter(Document.file_id.in_(done)).delete(
+                synchronize_session=False
+            )
+            db.commit()
+        if self.status_cache is not None:
+            self.status_cache.put_many([], missing=done)
+        if self.presigned_urls is not None:
+            self.presigned_urls.invalidate_many(
+                self.bucket, [k for k in to_delete if k not in failed_keys]
+            )
+
+        PURGED.labels("deleted").inc(len(done))
+        PURGED.labels("failed").inc(len(rows) - len(done))
+        return {
+            "deleted": len(done),
+            "failed": len(rows) - len(done),
+            "s3Deleted": len(to_delete) - len(failed_keys),
+            "s3Shared": len(shared),
+            "failedFileIds": [fid for fid, key in rows if key in failed_keys],
+        }
+
+    # ---- many chunks ----
+    def purge(
+        self,
+        criteria,
+        dry_run: bool = False,
+        progress=None,
+        should_stop=None,
+        start_after: str | None = None,
+    ) -> dict:
+        """
+        Delete every document matching `criteria` (SQLAlchemy filter
+        expressions), chunk by chunk in file_id order. `progress(dict)` is
+        called after each chunk; `should_stop()` ends the run between chunks.
+        `start_after` resumes after a reported lastFileId.
+        """
+        Document = self.model
+        state = {
+            "matched": 0,
+            "deleted": 0,
+            "failed": 0,
+            "s3Deleted": 0,
+            "s3Shared": 0,
+            "chunks": 0,
+            "lastFileId": start_after,
+            "dryRun": dry_run,
+            "done": False,
+        }
+        db = self.session_factory()
+        try:
+            while not (should_stop and should_stop()):
+                query = db.query(Document.file_id, Document.s3_key).filter(*criteria)
+                if state["lastFileId"] is not None:
+                    # keyset: rows kept after a failure aren't selected again
+                    query = query.filter(Document.file_id > state["lastFileId"])
+                rows = [tuple(r) for r in query.order_by(Document.file_id).limit(self.chunk_size)]
+                if not rows:
+                    state["done"] = True
+                    break
+
+                state["matched"] += len(rows)
+                state["chunks"] += 1
+                state["lastFileId"] = rows[-1][0]
+                if not dry_run:
+                    result = self.delete_rows(db, rows)
+                    for k in ("deleted", "failed", "s3Deleted", "s3Shared"):
+                        state[k] += result[k]
+                if progress:
+                    progress(dict(state))
+        finally:
+            db.close()
+        return state
+
+    def purge_older_than(self, days: float, **kwargs) -> dict:
+        cutoff = datetime.utcnow() - timedelta(days=days)
+        return self.purge([self.model.upload_time < cutoff], **kwargs)
+
+    # ---- background jobs (admin endpoint) ----
+    def start_job(self, days: float, dry_run: bool = False) -> dict:
+        job = {
+            "jobId": str(uuid.uuid4()),
+            "olderThanDays": days,
+            "state": "running",
+            "startedAt": datetime.utcnow().isoformat(),
+            "progress": {},
+            "error": None,
+        }
+
+        def report(progress):
+            job["progress"] = progress
+            print(f"[APP] Purge {job['jobId']}: {progress['matched']} matched, "
+                  f"{progress['deleted']} deleted, {progress['failed']} failed")
+
+        def run():
+            started = time.perf_counter()
+            try:
+                job["progress"] = self.purge_older_than(days, dry_run=dry_run, progress=report)
+                job["state"] = "completed"
+            except Exception as e:
+                job["state"] = "failed"
+                job["error"] = str(e)
+                print("[APP] Purge failed:", e)
+            job["seconds"] = round(time.perf_counter() - started, 3)
+
+        with self._jobs_lock:
+            self._jobs[job["jobId"]] = job
+            while len(self._jobs) > PURGE_JOBS_KEPT:
+                self._jobs.pop(next(iter(self._jobs)))
+        threading.Thread(target=run, name="document-purge", daemon=True).start()
+        return job
+
+    def job(self, job_id: str) -> dict | None:
+        return self._jobs.get(job_id)
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Purge documents older than a given age")
+    parser.add_argument("--older-than-days", type=float, default=RETENTION_DAYS)
+    parser.add_argument("--dry-run", action="store_true")
+    parser.add_argument("--start-after", help="resume after this fileId (lastFileId of a run)")
+    args = parser.parse_args()
+    if args.older_than_days <= 0:
+        parser.error("set --older-than-days or RETENTION_DAYS")
+
+    import app
+
+    def show(p):
+        print(f"[APP] chunk {p['chunks']}: {p['matched']} matched, {p['deleted']} deleted, "
+              f"{p['failed']} failed, last fileId {p['lastFileId']}")
+
+    summary = app.document_purger.purge_older_than(
+        args.older_than_days, dry_run=args.dry_run, progress=show, start_after=args.start_after
+    )
+    print("[APP] Purge finished:", summary)
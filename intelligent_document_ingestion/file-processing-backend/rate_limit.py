@@ -0,0 +1,305 @@
+import ipaddress
+import math
+import os
+import threading
+import time
+from collections import OrderedDict
+
+from fastapi import HTTPException, Request
+
+import metrics
+from metrics import REDIS_ERRORS
+from config import (
+    DB_MAX_OVERFLOW,
+    DB_POOL_SIZE,
+    DB_REPLICA_MAX_OVERFLOW,
+    DB_REPLICA_POOL_SIZE,
+    engine,
+    replica_engine,
+)
+from replicas import read_router
+from user import decode_access_token
+
+# ======== Rate limiting / load shedding ========
+# Token bucket per (route class, caller). The caller is the JWT subject when
+# the request carries a valid bearer token, else the client address (status
+# polls and downloads don't require a login). Behind the ALB the peer address
+# is the load balancer's, so when the peer is in RATE_LIMIT_TRUSTED_PROXIES
+# the client address is taken from X-Forwarded-For instead: the right-most
+# entry that isn't itself a trusted proxy (entries left of it are whatever
+# the client sent). Untrusted peers' X-Forwarded-For is ignored. Buckets live in Redis, updated
+# atomically by a Lua script using Redis' clock, so every replica shares
+# them. After a Redis error each process uses its own buckets for
+# RATE_LIMIT_REDIS_RETRY_SECONDS before one request tries Redis again, so an
+# outage costs one timeout per interval rather than one per request.
+# Requests over the limit get 429 with Retry-After.
+# Classes in RATE_LIMIT_SHED_CLASSES are additionally answered with 503 right
+# away while every connection of the pool they read from (the replica's
+# while reads go there, else the primary's) is checked out, instead of
+# queueing for DB_POOL_TIMEOUT seconds.
+# `rate_limit` is the sync dependency; `async_rate_limit` is the one for the
+# BACKEND_IO_MODE=async routes, on redis.asyncio.
+
+RATE_LIMIT_ENABLED = os.getenv("RATE_LIMIT_ENABLED", "true").lower() == "true"
+# class -> (tokens per second, burst)
+RATE_LIMITS = {
+    "poll": (
+        float(os.getenv("RATE_LIMIT_POLL_PER_SECOND", "20")),
+        float(os.getenv("RATE_LIMIT_POLL_BURST", "100")),
+    ),
+    "upload": (
+        float(os.getenv("RATE_LIMIT_UPLOAD_PER_SECOND", "5")),
+        float(os.getenv("RATE_LIMIT_UPLOAD_BURST", "50")),
+    ),
+    "admin": (
+        float(os.getenv("RATE_LIMIT_ADMIN_PER_SECOND", "10")),
+        float(os.getenv("RATE_LIMIT_ADMIN_BURST", "50")),
+    ),
+}
+RATE_LIMIT_SHED_CLASSES = {
+    c.strip() for c in os.getenv("RATE_LIMIT_SHED_CLASSES", "poll").split(",") if c.strip()
+}
+RATE_LIMIT_REDIS_RETRY_SECONDS = float(os.getenv("RATE_LIMIT_REDIS_RETRY_SECONDS", "5"))
+# comma separated addresses / CIDRs, e.g. the VPC subnets of the ALB
+TRUSTED_PROXIES = [
+    ipaddress.ip_network(p.strip(), strict=False)
+    for p in os.getenv("RATE_LIMIT_TRUSTED_PROXIES", "").split(",")
+    if p.strip()
+]
+LOCAL_BUCKETS_MAX = 100_000
+
+DECISIONS = metrics.counter(
+    "rate_limit_decisions_total",
+    "Rate limiter decisions by route class, decision (allowed, limited, shed) and store",
+    ("route_class", "decision", "store"),
+)
+
+# KEYS[1] bucket; ARGV rate, burst, cost -> {allowed, retry_after_seconds}
+TOKEN_BUCKET_LUA = """
+local rate = tonumber(ARGV[1])
+local burst = tonumber(ARGV[2])
+local cost = tonumber(ARGV[3])
+local t = redis.call('TIME')
+local now = tonumber(t[1]) + tonumber(t[2]) / 1000000
+local state = redis.call('HMGET', KEYS[1], 'tokens', 'ts')
+local tokens = tonumber(state[1]) or burst
+local ts = tonumber(state[2]) or now
+tokens = math.min(burst, tokens + math.max(0, now - ts) * rate)
+local allowed = 0
+local retry_after = 0
+if tokens >= cost then
+  tokens = tokens - cost
+  allowed = 1
+else
+  retry_after = (cost - tokens) / rate
+end
+redis.call('HSET', KEYS[1], 'tokens', tokens, 'ts', now)
+redis.call('PEXPIRE', KEYS[1], math.ceil(burst / rate * 1000) + 1000)
+return {allowed, tostring(retry_after)}
+"""
+
+
+class TokenBucketLimiter:
+    def __init__(self, redis_client=None, limits=None, redis_retry=RATE_LIMIT_REDIS_RETRY_SECONDS):
+        self.redis_client = redis_client
+        self.limits = limits or RATE_LIMITS
+        self.redis_retry = redis_retry
+        self._script = None
+        self._lock = threading.Lock()
+        self._local: OrderedDict[str, tuple[float, float]] = OrderedDict()
+        self._redis_down = False
+        self._redis_down_until = 0.0
+
+    # ---- Redis breaker ----
+    def _redis_usable(self) -> bool:
+        if self.redis_client is None:
+            return False
+        if not self._redis_down:
+            return True
+        with self._lock:
+            now = time.monotonic()
+            if now < self._redis_down_until:
+                return False
+            # this request probes Redis, the others stay local meanwhile
+            self._redis_down_until = now + self.redis_retry
+            return True
+
+    def _redis_failed(self, error):
+        REDIS_ERRORS.labels("rate_limit", "eval").inc()
+        with self._lock:
+            self._redis_down_until = time.monotonic() + self.redis_retry
+            if self._redis_down:
+                return
+            self._redis_down = True
+        print(f"[APP] Redis rate limit error, using local buckets "
+              f"(retry every {self.redis_retry:.0f}s):", error)
+
+    def _redis_ok(self):
+        if self._redis_down:
+            self._redis_down = False
+            print("[APP] Redis rate limiting restored")
+
+    # ---- buckets ----
+    def _script_for_client(self):
+        if self._script is None or self._script.registered_client is not self.redis_client:
+            self._script = self.redis_client.register_script(TOKEN_BUCKET_LUA)
+        return self._script
+
+    def _redis_take(self, key: str, rate: float, burst: float) -> tuple[bool, float]:
+        allowed, retry_after = self._script_for_client()(keys=[key], args=[rate, burst, 1])
+        return bool(int(allowed)), float(retry_after)
+
+    def _local_take(self, key: str, rate: float, burst: float) -> tuple[bool, float]:
+        now = time.monotonic()
+        with self._lock:
+            tokens, ts = self._local.pop(key, (burst, now))
+            tokens = min(burst, tokens + (now - ts) * rate)
+            if tokens >= 1:
+                allowed, retry_after, tokens = True, 0.0, tokens - 1
+            else:
+                allowed, retry_after = False, (1 - tokens) / rate
+            self._local[key] = (tokens, now)
+            while len(self._local) > LOCAL_BUCKETS_MAX:
+                self._local.popitem(last=False)
+        return allowed, retry_after
+
+    def take(self, route_class: str, caller: str) -> tuple[bool, float, str]:
+        """(allowed, retry_after seconds, store) for one request of `caller`."""
+        rate, burst = self.limits[route_class]
+        key = f"ratelimit:{route_class}:{caller}"
+        if self._redis_usable():
+            try:
+                result = self._redis_take(key, rate, burst)
+                self._redis_ok()
+                return (*result, "redis")
+            except Exception as e:
+                self._redis_failed(e)
+        return (*self._local_take(key, rate, burst), "local")
+
+
+class AsyncTokenBucketLimiter(TokenBucketLimiter):
+    """Same buckets and breaker on redis.asyncio, for BACKEND_IO_MODE=async."""
+
+    async def _redis_take(self, key: str, rate: float, burst: float) -> tuple[bool, float]:
+        allowed, retry_after = await self._script_for_client()(keys=[key], args=[rate, burst, 1])
+        return bool(int(allowed)), float(retry_after)
+
+    async def take(self, route_class: str, caller: str) -> tuple[bool, float, str]:
+        rate, burst = self.limits[route_class]
+        key = f"ratelimit:{route_class}:{caller}"
+        if self._redis_usable():
+            try:
+                result = await self._redis_take(key, rate, burst)
+                self._redis_ok()
+                return (*result, "redis")
+            except Exception as e:
+                self._redis_failed(e)
+        return (*self._local_take(key, rate, burst), "local")
+
+
+limiter = TokenBucketLimiter()
+# async_routes points this at async_io.async_redis_client
+async_limiter = AsyncTokenBucketLimiter()
+
+
+def caller_id(request: Request) -> str:
+    """"user:<sub>" for a valid bearer token, else "ip:<client address>"."""
+    auth = request.headers.get("authorization", "")
+    scheme, _, token = auth.partition(" ")
+    if scheme.lower() == "bearer" and token:
+        try:
+            return "user:" + decode_access_token(token).user_id
+        except HTTPException:
+            pass  # get_current_user answers the bad token
+    return "ip:" + client_address(request)
+
+
+def _trusted_proxy(address: str) -> bool:
+    try:
+        ip = ipaddress.ip_address(address.strip())
+    except ValueError:
+        return False
+    return any(ip in net for net in TRUSTED_PROXIES)
+
+
+def client_address(request: Request) -> str:
+    """The caller's address, looking through trusted proxies (see above)."""
+    peer = request.client.host if request.client else "unknown"
+    if not _trusted_proxy(peer):
+        return peer
+    hops = [
+        h.strip()
+        for h in request.headers.get("x-forwarded-for", "").split(",")
+        if h.strip()
+    ]
+    for hop in reversed(hops):
+        if not _trusted_proxy(hop):
+            return hop
+    return hops[0] if hops else peer
+
+
+def _pool_exhausted(engine, limit: int) -> bool:
+    checkedout = getattr(engine.pool, "checkedout", None)
+    return checkedout is not None and checkedout() >= limit
+
+
+def _read_pool_exhausted() -> bool:
+    """Whether the pool read-only routes will take a connection from is full."""
+    if replica_engine is not None and read_router.available():
+        return _pool_exhausted(replica_engine, DB_REPLICA_POOL_SIZE + DB_REPLICA_MAX_OVERFLOW)
+    return _pool_exhausted(engine, DB_POOL_SIZE + DB_MAX_OVERFLOW)
+
+
+def _sheds(route_class: str) -> bool:
+    if route_class not in RATE_LIMITS:
+        raise ValueError(f"unknown rate limit class {route_class!r}")
+    return route_class in RATE_LIMIT_SHED_CLASSES
+
+
+def _shed(route_class: str):
+    DECISIONS.labels(route_class, "shed", "local").inc()
+    raise HTTPException(
+        status_code=503, detail="Server busy, retry shortly", headers={"Retry-After": "1"}
+    )
+
+
+def _decide(route_class: str, allowed: bool, retry_after: float, store: str):
+    if not allowed:
+        DECISIONS.labels(route_class, "limited", store).inc()
+        raise HTTPException(
+            status_code=429,
+            detail="Too many requests",
+            headers={"Retry-After": str(max(1, math.ceil(retry_after)))},
+        )
+    DECISIONS.labels(route_class, "allowed", store).inc()
+
+
+def rate_limit(route_class: str):
+    """Route dependency: `dependencies=[Depends(rate_limit("poll"))]`."""
+    shed = _sheds(route_class)
+
+    def check(request: Request):
+        if not RATE_LIMIT_ENABLED:
+            return
+        if shed and _read_pool_exhausted():
+            _shed(route_class)
+        _decide(route_class, *limiter.take(route_class, caller_id(request)))
+
+    return check
+
+
+def async_rate_limit(route_class: str, pool_exhausted=lambda: False):
+    """
+    Async twin of `rate_limit`. `pool_exhausted()` tells whether the pool
+    the route reads from is full (the async engine's, in async mode).
+    """
+    shed = _sheds(route_class)
+
+    async def check(request: Request):
+        if not RATE_LIMIT_ENABLED:
+            return
+        if shed and pool_exhausted():
+            _shed(route_class)
+        _decide(route_class, *await async_limiter.take(route_class, caller_id(request)))
+
+    return check
@@ -0,0 +1,136 @@
+import os
+import threading
+import time
+
+from sqlalchemy import text
+from sqlalchemy.exc import DBAPIError
+
+import metrics
+from config import ReplicaSessionLocal, replica_engine
+
+# ======== Read replica routing ========
+# Read-only routes take their session from helper.get_read_db. With
+# DATABASE_REPLICA_URL set that is a replica session, unless the replica
+# failed recently (REPLICA_RETRY_SECONDS) or its replay lag, checked at most
+# every REPLICA_CHECK_INTERVAL_SECONDS, is above REPLICA_MAX_LAG_SECONDS.
+# `run` repeats a query on the primary when the replica errors, or has not
+# replayed a row that was written moments ago (read-your-writes for polls
+# right after an upload).
+
+REPLICA_MAX_LAG_SECONDS = float(os.getenv("REPLICA_MAX_LAG_SECONDS", "5"))
+REPLICA_CHECK_INTERVAL_SECONDS = float(os.getenv("REPLICA_CHECK_INTERVAL_SECONDS", "2"))
+REPLICA_RETRY_SECONDS = float(os.getenv("REPLICA_RETRY_SECONDS", "30"))
+# Postgres streaming replica; 0 when it has replayed everything it received.
+# Override for other setups, or set it empty to skip the lag check.
+REPLICA_LAG_SQL = os.getenv(
+    "REPLICA_LAG_SQL",
+    "SELECT CASE WHEN pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0 "
+    "ELSE COALESCE(EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp()), 0) END",
+)
+
+READS = metrics.counter(
+    "db_read_sessions_total", "Read-only route sessions by target (replica, primary)", ("target",)
+)
+FALLBACKS = metrics.counter(
+    "db_replica_fallbacks_total",
+    "Replica reads repeated on the primary, by reason (error, not_found)",
+    ("reason",),
+)
+LAG = metrics.gauge("db_replica_lag_seconds", "Replica replay lag at the last check")
+
+
+class ReplicaRouter:
+    """Picks the session for read-only routes; without a replica it's always the primary's."""
+
+    def __init__(
+        self,
+        session_factory=None,
+        engine=None,
+        max_lag: float = REPLICA_MAX_LAG_SECONDS,
+        check_interval: float = REPLICA_CHECK_INTERVAL_SECONDS,
+        retry_after: float = REPLICA_RETRY_SECONDS,
+        lag_sql: str | None = REPLICA_LAG_SQL,
+    ):
+        self.session_factory = session_factory
+        self.engine = engine
+        self.max_lag = max_lag
+        self.check_interval = check_interval
+        self.retry_after = retry_after
+        self.lag_sql = lag_sql
+        self._lock = threading.Lock()
+        self._checked_at = float("-inf")
+        self._fresh = True
+        self._down_until = 0.0
+
+    def _lag(self) -> float:
+        if not self.lag_sql or self.engine is None or self.engine.dialect.name != "postgresql":
+            return 0.0
+        with self.engine.connect() as conn:
+            return float(conn.execute(text(self.lag_sql)).scalar() or 0)
+
+    def available(self) -> bool:
+        if self.session_factory is None:
+            return False
+        now = time.monotonic()
+        if now < self._down_until:
+            return False
+        # one thread re-checks the lag, the others go with the last result
+        if now - self._checked_at < self.check_interval or not self._lock.acquire(blocking=False):
+            return self._fresh
+        try:
+            self._checked_at = now
+            lag = self._lag()
+            LAG.set(lag)
+            fresh = lag <= self.max_lag
+            if fresh != self._fresh:
+                print(f"[APP] Read replica lag {lag:.1f}s, reading from "
+                      f"{'replica' if fresh else 'primary'}")
+            self._fresh = fresh
+            return fresh
+        except Exception as e:
+            self.mark_failed(e)
+            return False
+        finally:
+            self._lock.release()
+
+    def mark_failed(self, error):
+        self._down_until = time.monotonic() + self.retry_after
+        print(f"[APP] Read replica unavailable, using primary for {self.retry_after:.0f}s:", error)
+
+    def session(self, primary):
+        """A replica session (remembering `primary` for fallbacks), or `primary` itself."""
+        if not self.available():
+            READS.labels("primary").inc()
+            return primary
+        db = self.session_factory()
+        db.info["primary"] = primary
+        READS.labels("replica").inc()
+        return db
+
+    def run(self, db, query, retry_if=lambda result: result is None):
+        """
+        `query(db)`. On a replica session it's repeated on the primary when
+        the replica raises a DB error or `retry_if(result)` holds (by default:
+        nothing found, e.g. a row the replica hasn't replayed yet).
+        """
+        return self.run_tracked(db, query, retry_if)[0]
+
+    def run_tracked(self, db, query, retry_if=lambda result: result is None):
+        """`run`, plus whether the result came from the replica (and may lag)."""
+        primary = db.info.get("primary")
+        if primary is None:
+            return query(db), False
+        try:
+            result = query(db)
+        except DBAPIError as e:
+            db.rollback()
+            self.mark_failed(e)
+            FALLBACKS.labels("error").inc()
+            return query(primary), False
+        if retry_if is not None and retry_if(result):
+            FALLBACKS.labels("not_found").inc()
+            return query(primary), False
+        return result, True
+
+
+read_router = ReplicaRouter(ReplicaSessionLocal, replica_engine)
@@ -0,0 +1,192 @@
+import json
+import queue
+import threading
+import time
+from concurrent.futures import Future, TimeoutError as FutureTimeout
+
+import metrics
+
+# ======== Micro-batching SQS publisher ========
+# Request threads hand their job message to `send`; a single background
+# thread coalesces whatever arrives within a few milliseconds into
+# send_message_batch calls (max 10 entries, the SQS limit) and reports each
+# entry's outcome back to the thread waiting on it.
+#
+# A `send` that times out has two outcomes. If its entry was still waiting
+# in the publisher, it is cancelled and never goes out: SqsPublishError, not
+# sent. If it was already in a send_message_batch call (or waiting for a
+# retry), SQS may have it or get it later: SqsPublishTimeout, and the
+# caller must treat the message as possibly sent, never as not sent.
+
+SQS_MAX_BATCH = 10
+
+BATCH_SIZE = metrics.histogram(
+    "sqs_publish_batch_size",
+    "Entries per send_message_batch call",
+    buckets=tuple(range(1, SQS_MAX_BATCH + 1)),
+)
+FLUSH_WAIT_SECONDS = metrics.histogram(
+    "sqs_publish_flush_wait_seconds",
+    "Time an entry waited in the publisher before its batch was sent",
+)
+SEND_SECONDS = metrics.histogram(
+    "sqs_send_seconds", "SQS send call latency", ("api",)
+)
+ENTRIES = metrics.counter(
+    "sqs_publish_entries_total", "Published entries by outcome", ("outcome",)
+)
+
+
+class SqsPublishError(Exception):
+    pass
+
+
+class SqsPublishTimeout(SqsPublishError):
+    """`send` timed out after the message was handed to SQS: it may still arrive."""
+
+
+class _Entry:
+    __slots__ = ("body", "future", "enqueued_at", "attempts")
+
+    def __init__(self, body: str):
+        self.body = body
+        self.future: Future = Future()
+        self.enqueued_at = time.perf_counter()
+        self.attempts = 0
+
+
+class SqsBatchPublisher:
+    """
+    `client_factory` and `queue_url_factory` are called per batch, so the
+    client can be swapped (tests) and the queue URL read from the env.
+    """
+
+    def __init__(
+        self,
+        client_factory,
+        queue_url_factory,
+        max_batch: int = SQS_MAX_BATCH,
+        max_latency_ms: float = 5,
+        max_attempts: int = 3,
+    ):
+        self.client_factory = client_factory
+        self.queue_url_factory = queue_url_factory
+        self.max_batch = min(max_batch, SQS_MAX_BATCH)
+        self.max_latency = max_latency_ms / 1000
+        self.max_attempts = max_attempts
+        self._queue: queue.Queue[_Entry] = queue.Queue()
+        self._retry: list[_Entry] = []
+        self._thread: threading.Thread | None = None
+        self._lock = threading.Lock()
+
+    def publish(self, message: dict | str) -> Future:
+        """Queue one message; the future resolves to its SQS MessageId."""
+        body = message if isinstance(message, str) else json.dumps(message)
+        entry = _Entry(body)
+        self._ensure_started()
+        self._queue.put(entry)
+        return entry.future
+
+    def send(self, message: dict | str, timeout: float = 10) -> str:
+        """
+        Blocking publish. Raises SqsPublishError when the message was not
+        sent, SqsPublishTimeout when it may have been (see above).
+        """
+        future = self.publish(message)
+        try:
+            return future.result(timeout=timeout)
+        except FutureTimeout:
+            if future.cancel():  # still queued: the publisher will skip it
+                ENTRIES.labels("cancelled").inc()
+                raise SqsPublishError(f"not sent within {timeout}s")
+            raise SqsPublishTimeout(f"no answer from SQS within {timeout}s")
+
+    def _ensure_started(self):
+        if self._thread is None:
+            with self._lock:
+                if self._thread is None:
+                    self._thread = threading.Thread(
+                        target=self._run, name="sqs-publisher", daemon=True
+                    )
+                    self._thread.start()
+
+    # ---- background thread ----
+    def _next_batch(self) -> list[_Entry]:
+        batch, self._retry = self._retry[: self.max_batch], self._retry[self.max_batch:]
+        if not batch:
+            batch.append(self._queue.get())
+        deadline = time.perf_counter() + self.max_latency
+        while len(batch) < self.max_batch:
+            remaining = deadline - time.perf_counter()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(self._queue.get(timeout=remaining))
+            except queue.Empty:
+                break
+        return batch
+
+    def _run(self):
+        while True:
+            batch = self._next_batch()
+            try:
+                self._flush(batch)
+            except Exception as e:  # never let the publisher thread die
+                print("[SQS] Publisher error:", e)
+                for entry in batch:
+                    if not entry.future.done():
+                        entry.future.set_exception(SqsPublishError(str(e)))
+            if self._retry:
+                time.sleep(0.05)  # brief backoff before re-sending failures
+
+    def _flush(self, batch: list[_Entry]):
+        # claim first attempts; a sender that timed out has cancelled its entry
+        batch = [
+            e for e in batch if e.attempts or e.future.set_running_or_notify_cancel()
+        ]
+        if not batch:
+            return
+        now = time.perf_counter()
+        for entry in batch:
+            if entry.attempts == 0:
+                FLUSH_WAIT_SECONDS.observe(now - entry.enqueued_at)
+            entry.attempts += 1
+        BATCH_SIZE.observe(len(batch))
+
+        by_id = {str(i): entry for i, entry in enumerate(batch)}
+        start = time.perf_counter()
+        try:
+            resp = self.client_factory().send_message_batch(
+                QueueUrl=self.queue_url_factory(),
+                Entries=[{"Id": i, "MessageBody": e.body} for i, e in by_id.items()],
+            )
+        except Exception as e:
+            SEND_SECONDS.labels("send_message_batch").observe(time.perf_counter() - start)
+            print("[SQS] send_message_batch failed:", e)
+            for entry in batch:
+                self._retry_or_fail(entry, str(e), retryable=True)
+            return
+        SEND_SECONDS.labels("send_message_batch").observe(time.perf_counter() - start)
+
+        for ok in resp.get("Successful", []):
+            entry = by_id.pop(ok["Id"])
+            ENTRIES.labels("ok").inc()
+            entry.future.set_result(ok["MessageId"])
+        for failed in resp.get("Failed", []):
+            entry = by_id.pop(failed["Id"])
+            self._retry_or_fail(
+                entry,
+                f"{failed.get('Code')}: {failed.get('Message')}",
+                retryable=not failed.get("SenderFault", False),
+            )
+        # entries SQS didn't mention at all: treat as retryable failures
+        for entry in by_id.values():
+            self._retry_or_fail(entry, "missing from batch response", retryable=True)
+
+    def _retry_or_fail(self, entry: _Entry, reason: str, retryable: bool):
+        if retryable and entry.attempts < self.max_attempts:
+            ENTRIES.labels("retried").inc()
+            self._retry.append(entry)
+        else:
+            ENTRIES.labels("failed").inc()
+            entry.future.set_exception(SqsPublishError(reason))
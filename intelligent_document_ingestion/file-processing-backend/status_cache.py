@@ -0,0 +1,357 @@
+import asyncio
+import hashlib
+import json
+import os
+import threading
+from datetime import datetime
+
+import metrics
+from metrics import REDIS_ERRORS
+from presign_cache import PRESIGN_SAFETY_MARGIN
+
+# ======== Status cache (Redis) ========
+# `status:{fileId}` holds the JSON StatusResponse. Entries are written through
+# on every transition (backend routes and the worker), so pollers rarely miss.
+# Misses are coalesced per fileId within a process (single flight) and
+# unknown fileIds are remembered briefly as a negative entry.
+# The worker writes the same keys: it imports this module (and presign_cache)
+# and builds its entries with `status_entry`, like the routes do.
+
+STATUS_KEY_PREFIX = "status:"
+MISSING_MARKER = "__missing__"
+
+STATUS_CACHE_TTL = int(os.getenv("STATUS_CACHE_TTL", "8"))  # pending / processing
+# completed / failed rarely change again; entries carrying a download URL are
+# additionally capped so they expire before the URL's safety margin
+STATUS_CACHE_FINAL_TTL = int(os.getenv("STATUS_CACHE_FINAL_TTL", "900"))
+STATUS_CACHE_NEGATIVE_TTL = int(os.getenv("STATUS_CACHE_NEGATIVE_TTL", "2"))
+FINAL_STATUSES = {"completed", "failed"}
+
+STATUS_MESSAGES = {
+    "pending": "File uploaded. Awaiting processing.",
+    "processing": "File is being processed.",
+    "completed": "Processing completed.",
+    "failed": "Processing failed.",
+}
+
+LOOKUPS = metrics.counter(
+    "status_cache_lookups_total",
+    "Status cache lookups by result (hit, negative_hit, miss)",
+    ("result",),
+)
+COALESCED = metrics.counter(
+    "status_cache_coalesced_total",
+    "Cache misses served by another request's in-flight DB load",
+)
+HIT_RATIO = metrics.gauge(
+    "status_cache_hit_ratio", "Share of status lookups answered from the cache"
+)
+
+
+def _hit_ratio() -> float:
+    hits = sum(
+        child.value
+        for labels, child in LOOKUPS.children()
+        if labels["result"] != "miss"
+    )
+    total = sum(child.value for _, child in LOOKUPS.children())
+    return hits / total if total else 0.0
+
+
+HIT_RATIO.set_function(_hit_ratio)
+
+# returned by `get` when Redis has nothing for the fileId
+MISS = object()
+
+
+def status_key(file_id: str) -> str:
+    return f"{STATUS_KEY_PREFIX}{file_id}"
+
+
+def status_etag(file_id: str, version, status: str, url_expires_at=None) -> str:
+    """
+    ETag of one status entry. `version` is the row's updated_at, so it moves
+    with every committed change; the URL expiry makes a re-signed download
+    link count as a change too.
+    """
+    raw = f"{file_id}|{version}|{status}|{url_expires_at or ''}"
+    return '"' + hashlib.sha1(raw.encode()).hexdigest()[:20] + '"'
+
+
+def _isoformat(value: datetime | None) -> str | None:
+    return value.isoformat() if value else None
+
+
+def status_entry(doc, presigned_urls=None, bucket: str | None = None) -> dict:
+    """
+    Cache entry of a Document row: the StatusResponse payload plus its ETag.
+    A completed document gets its download URL from `presigned_urls` (a
+    PresignedUrlCache), so the URL lifetime is PRESIGN_EXPIRES_IN wherever
+    the entry is built; a signing error leaves the URL out.
+    """
+    download_url = None
+    download_url_expires_at = None
+    if doc.status == "completed" and presigned_urls is not None:
+        try:
+            download_url, expires_at = presigned_urls.get(bucket, doc.s3_key)
+            download_url_expires_at = datetime.utcfromtimestamp(expires_at).isoformat()
+        except Exception:
+            download_url = None
+
+    last_updated = doc.completed_time or doc.upload_time
+    return {
+        "fileId": doc.file_id,
+        "status": doc.status,
+        "message": STATUS_MESSAGES.get(doc.status, "Unknown status"),
+        "metadata": doc.extracted_metadata,
+        "downloadUrl": download_url,
+        "downloadUrlExpiresAt": download_url_expires_at,
+        "lastUpdated": _isoformat(last_updated),
+        "error": doc.error,
+        "etag": status_etag(
+            doc.file_id,
+            doc.updated_at or last_updated,
+            doc.status,
+            download_url_expires_at,
+        ),
+    }
+
+
+def ttl_for(payload: dict) -> int:
+    ttl = STATUS_CACHE_FINAL_TTL if payload.get("status") in FINAL_STATUSES else STATUS_CACHE_TTL
+    url_expires_at = payload.get("downloadUrlExpiresAt")
+    if url_expires_at:
+        remaining = (
+            datetime.fromisoformat(url_expires_at) - datetime.utcnow()
+        ).total_seconds() - PRESIGN_SAFETY_MARGIN
+        ttl = min(ttl, max(int(remaining), 1))
+    return ttl
+
+
+def decode(raw):
+    """Redis value -> payload dict, None (known missing) or MISS."""
+    if raw is None:
+        return MISS
+    if raw == MISSING_MARKER:
+        return None
+    return json.loads(raw)
+
+
+def record(result):
+    if result is MISS:
+        LOOKUPS.labels("miss").inc()
+    elif result is None:
+        LOOKUPS.labels("negative_hit").inc()
+    else:
+        LOOKUPS.labels("hit").inc()
+
+
+class Uncached:
+    """
+    Loader result to hand back without caching it, e.g. a row read from a
+    replica: it may be older than the entry the worker just wrote through.
+    """
+
+    __slots__ = ("value",)
+
+    def __init__(self, value):
+        self.value = value
+
+
+def _unwrap(result):
+    if isinstance(result, Uncached):
+        return result.value, False
+    return result, True
+
+
+class _Flight:
+    __slots__ = ("done", "result", "error")
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error: BaseException | None = None
+
+
+class StatusCache:
+    """Sync access for the threadpool routes; every Redis error is a miss."""
+
+    def __init__(self, redis_client=None):
+        self.redis_client = redis_client
+        self._lock = threading.Lock()
+        self._flights: dict[str, _Flight] = {}
+
+    def get(self, file_id: str):
+        result = MISS
+        if self.redis_client:
+            try:
+                result = decode(self.redis_client.get(status_key(file_id)))
+            except Exception as e:
+                REDIS_ERRORS.labels("status_cache", "get").inc()
+                print("[APP] Redis read error:", e)
+        record(result)
+        return result
+
+    def get_many(self, file_ids: list[str]) -> dict:
+        """{fileId: payload or None} for the fileIds the cache knows about."""
+        found = {}
+        if self.redis_client and file_ids:
+            try:
+                raws = self.redis_client.mget([status_key(f) for f in file_ids])
+                for fid, raw in zip(file_ids, raws):
+                    value = decode(raw)
+                    if value is not MISS:
+                        found[fid] = value
+            except Exception as e:
+                REDIS_ERRORS.labels("status_cache", "mget").inc()
+                print("[APP] Redis read error:", e)
+        for fid in file_ids:
+            record(found.get(fid, MISS))
+        return found
+
+    def put_many(self, payloads: list[dict], missing: list[str] = ()):
+        if not self.redis_client or not (payloads or missing):
+            return
+        try:
+            pipe = self.redis_client.pipeline(transaction=False)
+            for payload in payloads:
+                pipe.set(
+                    status_key(payload["fileId"]), json.dumps(payload), ex=ttl_for(payload)
+                )
+            for fid in missing:
+                pipe.set(status_key(fid), MISSING_MARKER, ex=STATUS_CACHE_NEGATIVE_TTL)
+            pipe.execute()
+        except Exception as e:
+            REDIS_ERRORS.labels("status_cache", "set").inc()
+            print("[APP] Redis write error:", e)
+
+    def put(self, payload: dict):
+        self.put_many([payload])
+
+    def put_missing(self, file_id: str):
+        self.put_many([], missing=[file_id])
+
+    def invalidate(self, file_id: str):
+        if self.redis_client:
+            try:
+                self.redis_client.delete(status_key(file_id))
+            except Exception:
+                REDIS_ERRORS.labels("status_cache", "delete").inc()
+
+    def load(self, file_id: str, loader):
+        """
+        Cached payload for `file_id`, else `loader()` (payload dict or None)
+        run once per fileId across concurrent callers, and its result cached
+        unless the loader wrapped it in Uncached.
+        """
+        cached = self.get(file_id)
+        if cached is not MISS:
+            return cached
+
+        with self._lock:
+            flight = self._flights.get(file_id)
+            leader = flight is None
+            if leader:
+                flight = self._flights[file_id] = _Flight()
+
+        if not leader:
+            COALESCED.inc()
+            flight.done.wait()
+            if flight.error is not None:
+                raise flight.error
+            return flight.result
+
+        try:
+            flight.result, cache = _unwrap(loader())
+            if not cache:
+                pass
+            elif flight.result is None:
+                self.put_missing(file_id)
+            else:
+                self.put(flight.result)
+            return flight.result
+        except BaseException as e:
+            flight.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._flights[file_id]
+            flight.done.set()
+
+
+class _LeaderCancelled(Exception):
+    """Set on a flight whose leader was cancelled; followers retry the load."""
+
+
+class AsyncStatusCache:
+    """Same contract as StatusCache on redis.asyncio, for BACKEND_IO_MODE=async."""
+
+    def __init__(self, redis_client=None):
+        self.redis_client = redis_client
+        self._flights: dict[str, asyncio.Future] = {}
+
+    async def get(self, file_id: str):
+        result = MISS
+        if self.redis_client:
+            try:
+                result = decode(await self.redis_client.get(status_key(file_id)))
+            except Exception as e:
+                REDIS_ERRORS.labels("status_cache", "get").inc()
+                print("[APP] Redis read error:", e)
+        record(result)
+        return result
+
+    async def _set(self, file_id: str, value: str, ttl: int):
+        if self.redis_client:
+            try:
+                await self.redis_client.set(status_key(file_id), value, ex=ttl)
+            except Exception as e:
+                REDIS_ERRORS.labels("status_cache", "set").inc()
+                print("[APP] Redis write error:", e)
+
+    async def put(self, payload: dict):
+        await self._set(payload["fileId"], json.dumps(payload), ttl_for(payload))
+
+    async def invalidate(self, file_id: str):
+        if self.redis_client:
+            try:
+                await self.redis_client.delete(status_key(file_id))
+            except Exception:
+                REDIS_ERRORS.labels("status_cache", "delete").inc()
+
+    async def load(self, file_id: str, loader):
+        cached = await self.get(file_id)
+        if cached is not MISS:
+            return cached
+
+        flight = self._flights.get(file_id)
+        if flight is not None:
+            COALESCED.inc()
+            try:
+                return await asyncio.shield(flight)
+            except _LeaderCancelled:
+                # the leading request went away (client disconnect): its
+                # followers still want the entry, so one of them loads it
+                return await self.load(file_id, loader)
+
+        flight = self._flights[file_id] = asyncio.get_running_loop().create_future()
+        try:
+            result, cache = _unwrap(await loader())
+            if not cache:
+                pass
+            elif result is None:
+                await self._set(file_id, MISSING_MARKER, STATUS_CACHE_NEGATIVE_TTL)
+            else:
+                await self.put(result)
+            flight.set_result(result)
+            return result
+        except asyncio.CancelledError:
+            flight.set_exception(_LeaderCancelled())
+            flight.exception()
+            raise
+        except BaseException as e:
+            flight.set_exception(e)
+            flight.exception()  # mark retrieved when nobody else was waiting
+            raise
+        finally:
+            del self._flights[file_id]
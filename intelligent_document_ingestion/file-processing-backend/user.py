@@ -1,6 +1,5 @@
 from sqlalchemy import Boolean
 import uuid
-from passlib.context import CryptContext
 from jose import jwt, JWTError
 from datetime import timedelta
 from fastapi.security import OAuth2PasswordRequestForm, OAuth2PasswordBearer
@@ -8,8 +7,12 @@ from fastapi import Depends, status
 from datetime import datetime
 from sqlalchemy import Column, String, DateTime
 import os
-from config import Base, engine, SessionLocal
+import threading
+import time
+from collections import OrderedDict
+from config import Base, SessionLocal
 from helper import get_db
+import passwords
 from pydantic import BaseModel
 from fastapi import HTTPException
 
@@ -18,7 +21,15 @@ SECRET_KEY = os.getenv("SECRET_KEY", "change-me-in-prod")
 ALGORITHM = "HS256"
 ACCESS_TOKEN_EXPIRE_MINUTES = 60
 
-pwd_context = CryptContext(schemes=["argon2"], deprecated="auto")
+# === Authenticated-user resolution ===
+# "db": query users on every request (old behaviour)
+# "cache": TTL + LRU cache of resolved users, invalidated on user changes
+# "claims": trust the signed sub/role, never touch the DB (a deleted or
+#           demoted user keeps access until the token expires)
+AUTH_USER_MODE = os.getenv("AUTH_USER_MODE", "cache").lower()
+AUTH_USER_CACHE_TTL = float(os.getenv("AUTH_USER_CACHE_TTL", "30"))
+AUTH_USER_CACHE_SIZE = int(os.getenv("AUTH_USER_CACHE_SIZE", "10000"))
+USER_INVALIDATION_CHANNEL = "auth:user-invalidate"
 
 class User(Base):
     __tablename__ = "users"
@@ -31,11 +42,45 @@ class User(Base):
     updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
 
 
+def _hashing_unavailable(e: Exception) -> HTTPException:
+    detail = (
+        "Password check timed out, retry shortly"
+        if isinstance(e, passwords.PasswordHashingTimeout)
+        else "Too many concurrent logins, retry shortly"
+    )
+    return HTTPException(
+        status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+        detail=detail,
+        headers={"Retry-After": "1"},
+    )
+
+
+_HASHING_ERRORS = (passwords.PasswordHashingBusy, passwords.PasswordHashingTimeout)
+
+
 def hash_password(password: str) -> str:
-    return pwd_context.hash(password)
+    try:
+        return passwords.hash_password(password)
+    except _HASHING_ERRORS as e:
+        raise _hashing_unavailable(e)
 
 def verify_password(plain_password: str, hashed_password: str) -> bool:
-    return pwd_context.verify(plain_password, hashed_password)
+    try:
+        return passwords.verify_password(plain_password, hashed_password)
+    except _HASHING_ERRORS as e:
+        raise _hashing_unavailable(e)
+
+async def hash_password_async(password: str) -> str:
+    try:
+        return await passwords.hash_password_async(password)
+    except _HASHING_ERRORS as e:
+        raise _hashing_unavailable(e)
+
+async def verify_password_async(plain_password: str, hashed_password: str) -> bool:
+    try:
+        return await passwords.verify_password_async(plain_password, hashed_password)
+    except _HASHING_ERRORS as e:
+        raise _hashing_unavailable(e)
 
 
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/auth/login")
@@ -54,29 +99,144 @@ class TokenData(BaseModel):
     user_id: str
     role: str
 
-def get_current_user(
-    token: str = Depends(oauth2_scheme),
-    db=Depends(get_db),
-) -> User:
-    credentials_exception = HTTPException(
+def credentials_exception() -> HTTPException:
+    return HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
         detail="Could not validate credentials",
         headers={"WWW-Authenticate": "Bearer"},
     )
+
+
+def decode_access_token(token: str) -> TokenData:
+    """Validate the JWT and return its claims, or raise 401."""
     try:
         payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
         user_id: str = payload.get("sub")
         role: str = payload.get("role")
         if user_id is None or role is None:
-            raise credentials_exception
-        token_data = TokenData(user_id=user_id, role=role)
+            raise credentials_exception()
+        return TokenData(user_id=user_id, role=role)
     except JWTError:
-        raise credentials_exception
+        raise credentials_exception()
+
+
+class UserCache:
+    """
+    TTL + LRU cache of resolved users keyed by user_id.
+
+    Holds detached copies (no password hash), so cached users are read-only:
+    routes that modify the user must load it from their own session.
+    Invalidations are broadcast over Redis pub/sub when `attach_redis` was
+    called, so every replica drops its copy.
+    """
+
+    def __init__(self, ttl: float, maxsize: int):
+        self.ttl = ttl
+        self.maxsize = maxsize
+        self._entries: OrderedDict[str, tuple[float, User]] = OrderedDict()
+        self._lock = threading.Lock()
+        self._redis = None
+
+    def get(self, user_id: str) -> User | None:
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(user_id)
+            if entry is None:
+                return None
+            expires_at, user = entry
+            if expires_at <= now:
+                del self._entries[user_id]
+                return None
+            self._entries.move_to_end(user_id)
+            return user
+
+    def put(self, user: User) -> User:
+        snapshot = User(
+            user_id=user.user_id,
+            username=user.username,
+            role=user.role,
+            created_at=user.created_at,
+            updated_at=user.updated_at,
+        )
+        with self._lock:
+            self._entries[user.user_id] = (time.monotonic() + self.ttl, snapshot)
+            self._entries.move_to_end(user.user_id)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+        return snapshot
+
+    def discard(self, user_id: str):
+        with self._lock:
+            self._entries.pop(user_id, None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def invalidate(self, user_id: str):
+        """Drop a user here and on every other replica."""
+        self.discard(user_id)
+        if self._redis is not None:
+            try:
+                self._redis.publish(USER_INVALIDATION_CHANNEL, user_id)
+            except Exception as e:
+                print("[AUTH] Redis invalidation publish error:", e)
+
+    def attach_redis(self, redis_client):
+        """Publish invalidations and listen for other replicas' ones."""
+        self._redis = redis_client
+        threading.Thread(
+            target=self._listen, name="user-cache-invalidation", daemon=True
+        ).start()
+
+    def _listen(self):
+        while True:
+            try:
+                pubsub = self._redis.pubsub(ignore_subscribe_messages=True)
+                pubsub.subscribe(USER_INVALIDATION_CHANNEL)
+                for msg in pubsub.listen():
+                    if msg.get("type") == "message":
+                        self.discard(msg["data"])
+            except Exception as e:
+                print("[AUTH] Redis invalidation listener error:", e)
+                # entries may have missed an invalidation, TTL bounds that,
+                # but start clean anyway
+                self.clear()
+                time.sleep(5)
+
+
+user_cache = UserCache(AUTH_USER_CACHE_TTL, AUTH_USER_CACHE_SIZE)
+
+
+def user_from_claims(token_data: TokenData) -> User | None:
+    """Resolve without the DB when the mode allows it (claims or cache hit)."""
+    if AUTH_USER_MODE == "claims":
+        return User(user_id=token_data.user_id, role=token_data.role)
+    if AUTH_USER_MODE == "cache":
+        return user_cache.get(token_data.user_id)
+    return None
+
+
+def remember_user(user: User) -> User:
+    if AUTH_USER_MODE == "cache":
+        return user_cache.put(user)
+    return user
+
+
+def get_current_user(
+    token: str = Depends(oauth2_scheme),
+    db=Depends(get_db),
+) -> User:
+    token_data = decode_access_token(token)
+
+    user = user_from_claims(token_data)
+    if user is not None:
+        return user
 
     user = db.query(User).filter(User.user_id == token_data.user_id).first()
     if user is None:
-        raise credentials_exception
-    return user
+        raise credentials_exception()
+    return remember_user(user)
 
 def require_admin(current_user: User = Depends(get_current_user)) -> User:
     if current_user.role != "admin":
@@ -114,24 +274,3 @@ class AdminUpdateUserRequest(BaseModel):
     username: str | None = None
     password: str | None = None
     role: str | None = None  # "admin" or "system"
-
-
-Base.metadata.create_all(bind=engine)
-
-
-
-def seed_admin():
-    db = SessionLocal()
-    existing = db.query(User).first()
-    if not existing:
-        admin = User(
-            username="admin",
-            password_hash=pwd_context.hash("admin@123"),
-            role="admin"
-        )
-        db.add(admin)
-        db.commit()
-        print("🚀 Default admin created: username='admin' password='admin@123'")
-    db.close()
-
-seed_admin()
\ No newline at end of file
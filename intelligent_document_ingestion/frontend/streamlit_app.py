@@ -1,11 +1,17 @@
 import streamlit as st
 import requests
+import hashlib
 import time
 import json
 from datetime import datetime
 import os
+from concurrent.futures import ThreadPoolExecutor
 
 BACKEND_URL = os.getenv("BACKEND_URL", "http://localhost:8000")
+# files above this go through S3 multipart upload (parallel, per-part retry)
+MULTIPART_THRESHOLD = int(os.getenv("MULTIPART_THRESHOLD", str(32 * 1024 * 1024)))
+MULTIPART_CONCURRENCY = int(os.getenv("MULTIPART_CONCURRENCY", "4"))
+PART_RETRIES = 3
 
 st.set_page_config(page_title="Dashboard", page_icon="📄", layout="wide")
 
@@ -27,6 +33,60 @@ if st.button("🚪 Logout", type="secondary"):
     st.session_state.clear()
     st.switch_page("pages/Login.py")
 
+# ----------------- Status updates -----------------
+def stream_status(file_id):
+    """Yield status dicts pushed by the backend (server-sent events)."""
+    with requests.get(
+        f"{BACKEND_URL}/api/v1/uploads/status/stream",
+        params={"fileIds": file_id},
+        headers={**headers, "Accept": "text/event-stream"},
+        stream=True,
+        timeout=(5, 60),
+    ) as r:
+        if r.status_code != 200:
+            raise RuntimeError(f"stream unavailable: {r.status_code}")
+        event = None
+        for line in r.iter_lines(decode_unicode=True):
+            if line.startswith("event:"):
+                event = line[len("event:"):].strip()
+            elif line.startswith("data:") and event == "status":
+                yield json.loads(line[len("data:"):].strip())
+
+
+def poll_status(file_id):
+    """Fallback: poll the status endpoint with backoff."""
+    poll_interval = 2
+    max_interval = 8
+    etag = None
+    while True:
+        time.sleep(poll_interval)
+        r = requests.get(
+            f"{BACKEND_URL}/api/v1/uploads/{file_id}/status",
+            headers={**headers, **({"If-None-Match": etag} if etag else {})},
+        )
+        if r.status_code == 401:
+            st.warning("Session expired. Login again.")
+            st.session_state.clear()
+            st.switch_page("pages/Login.py")
+        if r.status_code != 304:  # 304: unchanged, nothing to re-render
+            etag = r.headers.get("ETag")
+            yield r.json()
+        if poll_interval < max_interval:
+            poll_interval += 1  # backoff to reduce load
+
+
+def status_updates(file_id):
+    """Push first; drop back to polling if the stream breaks."""
+    try:
+        for data in stream_status(file_id):
+            yield data
+            if data["status"] in ("completed", "failed"):
+                return
+    except Exception as e:
+        print("[FRONTEND] status stream failed, polling instead:", e)
+    yield from poll_status(file_id)
+
+
 # ----------------- Upload File -----------------
 st.subheader("📤 Upload New Document")
 
@@ -37,10 +97,106 @@ uploaded_file = st.file_uploader(
 
 userId = st.session_state["user_id"]
 
+def check_response(res):
+    if res.status_code == 401:
+        st.warning("Session expired. Please login again.")
+        st.session_state.clear()
+        st.switch_page("pages/Login.py")
+
+    if res.status_code != 200:
+        st.error(res.json())
+        st.stop()
+    return res.json()
+
+
+def upload_single(uploaded_file, payload):
+    """One presigned PUT with the whole file, skipped for content already processed."""
+    payload = {**payload, "sha256": hashlib.sha256(uploaded_file.getvalue()).hexdigest()}
+    data = check_response(
+        requests.post(
+            f"{BACKEND_URL}/api/v1/uploads/request",
+            json=payload,
+            headers=headers,
+        )
+    )
+    if not data.get("uploadRequired", True):
+        st.info("♻️ Same file as an earlier upload, reusing its results")
+        return data["fileId"], True
+    with st.spinner("⏫ Uploading to S3..."):
+        upload_res = requests.put(
+            data["uploadUrl"],
+            data=uploaded_file.getvalue(),
+        )
+    return data["fileId"], upload_res.status_code in [200, 204]
+
+
+def upload_multipart(uploaded_file, payload):
+    """Parallel part uploads; a failed part is retried on its own."""
+    init = check_response(
+        requests.post(
+            f"{BACKEND_URL}/api/v1/uploads/multipart/initiate",
+            json=payload,
+            headers=headers,
+        )
+    )
+    file_id, upload_id = init["fileId"], init["uploadId"]
+    part_size, part_count = init["partSize"], init["partCount"]
+    base = f"{BACKEND_URL}/api/v1/uploads/multipart/{file_id}"
+    buf = uploaded_file.getbuffer()
+
+    def presign(part_numbers):
+        # also called from the upload threads, so no st.* calls in here
+        r = requests.post(
+            f"{base}/parts",
+            json={"uploadId": upload_id, "partNumbers": part_numbers},
+            headers=headers,
+        )
+        r.raise_for_status()
+        return {p["partNumber"]: p["uploadUrl"] for p in r.json()["parts"]}
+
+    urls = {}
+    all_parts = list(range(1, part_count + 1))
+    for i in range(0, part_count, 1000):
+        urls.update(presign(all_parts[i:i + 1000]))
+
+    def put_part(n):
+        chunk = buf[(n - 1) * part_size:n * part_size].tobytes()
+        url = urls[n]
+        for attempt in range(PART_RETRIES):
+            try:
+                r = requests.put(url, data=chunk, timeout=300)
+                if r.status_code in [200, 204]:
+                    return {"partNumber": n, "eTag": r.headers["ETag"]}
+            except requests.RequestException as e:
+                print(f"[FRONTEND] part {n} attempt {attempt + 1} failed:", e)
+            try:
+                url = presign([n])[n]  # URL may have expired
+            except requests.RequestException as e:
+                print(f"[FRONTEND] re-presign of part {n} failed:", e)
+        return None
+
+    progress = st.progress(0, text="⏫ Uploading parts to S3...")
+    parts = []
+    with ThreadPoolExecutor(max_workers=MULTIPART_CONCURRENCY) as pool:
+        for done, part in enumerate(pool.map(put_part, all_parts), start=1):
+            parts.append(part)
+            progress.progress(done / part_count, text=f"⏫ Uploaded part {done}/{part_count}")
+
+    if None in parts:
+        requests.post(f"{base}/abort", json={"uploadId": upload_id}, headers=headers)
+        return file_id, False
+
+    r = requests.post(
+        f"{base}/complete",
+        json={"uploadId": upload_id, "parts": parts},
+        headers=headers,
+    )
+    return file_id, r.status_code == 200
+
+
 if uploaded_file:
     if st.button("Start Upload 🚀", use_container_width=True):
-        file_bytes = uploaded_file.getvalue()
-        file_size = len(file_bytes)
+        file_size = uploaded_file.size
 
         payload = {
             "userId": userId,
@@ -48,39 +204,22 @@ if uploaded_file:
             "fileSize": file_size,
             "fileType": uploaded_file.type,
         }
-        res = requests.post(
-            f"{BACKEND_URL}/api/v1/uploads/request",
-            json=payload,
-            headers=headers,
-        )
-
-        if res.status_code == 401:
-            st.warning("Session expired. Please login again.")
-            st.session_state.clear()
-            st.switch_page("pages/Login.py")
-
-        if res.status_code != 200:
-            st.error(res.json())
-            st.stop()
-
-        data = res.json()
-        fileId = data["fileId"]
+        if file_size > MULTIPART_THRESHOLD:
+            fileId, uploaded = upload_multipart(uploaded_file, payload)
+        else:
+            fileId, uploaded = upload_single(uploaded_file, payload)
 
-        # Upload to S3
-        with st.spinner("⏫ Uploading to S3..."):
-            upload_res = requests.put(
-                data["uploadUrl"],
-                data=file_bytes,
-            )
-        if upload_res.status_code not in [200, 204]:
+        if not uploaded:
             st.error("❌ Upload failed")
             st.stop()
 
         st.success("Upload completed, queuing job...")
+        # a no-op for deduplicated uploads, which are already completed;
+        # the key makes a re-sent completion queue the job only once
         requests.post(
             f"{BACKEND_URL}/api/v1/uploads/complete",
             json={"fileId": fileId},
-            headers=headers,
+            headers={**headers, "Idempotency-Key": f"complete-{fileId}"},
         )
 
         # For very large files, avoid tight polling
@@ -91,25 +230,11 @@ if uploaded_file:
             )
             st.stop()
 
-        # Polling progress (adaptive interval)
         progress = st.progress(0)
         status_text = st.empty()
         pct = 0
-        poll_interval = 2
-        max_interval = 8
-
-        while True:
-            time.sleep(poll_interval)
-            r = requests.get(
-                f"{BACKEND_URL}/api/v1/uploads/{fileId}/status",
-                headers=headers,
-            )
-            if r.status_code == 401:
-                st.warning("Session expired. Login again.")
-                st.session_state.clear()
-                st.switch_page("pages/Login.py")
 
-            data = r.json()
+        for data in status_updates(fileId):
             status = data["status"]
 
             status_text.write(f"📌 Status: {status} — {data['message']}")
@@ -118,13 +243,6 @@ if uploaded_file:
                 # slow ramp-up for long-running jobs
                 pct = min(pct + 5, 90)
                 progress.progress(pct)
-                if poll_interval < max_interval:
-                    poll_interval += 1  # backoff to reduce load
-
-            if status == "pending":
-                # queued but not yet picked — also back off
-                if poll_interval < max_interval:
-                    poll_interval += 1
 
             if status == "failed":
                 progress.progress(100)
@@ -144,17 +262,50 @@ if uploaded_file:
 
 # ----------------- Document History -----------------
 st.subheader("📜 Upload History")
-res = requests.get(
-    f"{BACKEND_URL}/api/v1/uploads/user/{userId}",
-    headers=headers,
-)
-
-if res.status_code == 401:
-    st.warning("Session expired. Login again.")
-    st.session_state.clear()
-    st.switch_page("pages/Login.py")
-
-history = res.json()
+HISTORY_PAGE_SIZE = 50
+history_pages = st.session_state.get("history_pages", 1)
+# cursor -> (etag, rows, next cursor); revalidated with If-None-Match on rerun
+history_cache = st.session_state.setdefault("history_cache", {})
+history = []
+next_cursor = None
+
+# server-side search across all of the user's documents
+search_col, type_col = st.columns([3, 1])
+search_q = search_col.text_input("🔎 Search my documents", key="doc_search").strip()
+search_type = type_col.text_input("Document type", key="doc_search_type").strip()
+if search_q or search_type:
+    list_url = f"{BACKEND_URL}/api/v1/uploads/search"
+    list_params = {k: v for k, v in (("q", search_q), ("documentType", search_type)) if v}
+else:
+    list_url = f"{BACKEND_URL}/api/v1/uploads/user/{userId}"
+    list_params = {}
+cache_scope = json.dumps(list_params, sort_keys=True)
+
+for _ in range(history_pages):
+    params = {**list_params, "limit": HISTORY_PAGE_SIZE}
+    if next_cursor:
+        params["cursor"] = next_cursor
+    cached = history_cache.get((cache_scope, next_cursor))
+    page_headers = dict(headers)
+    if cached:
+        page_headers["If-None-Match"] = cached[0]
+    res = requests.get(list_url, params=params, headers=page_headers)
+
+    if res.status_code == 401:
+        st.warning("Session expired. Login again.")
+        st.session_state.clear()
+        st.switch_page("pages/Login.py")
+
+    if res.status_code == 304 and cached:
+        page = cached
+    else:
+        page = (res.headers.get("ETag"), res.json(), res.headers.get("X-Next-Cursor"))
+        history_cache[(cache_scope, next_cursor)] = page
+
+    history.extend(page[1])
+    next_cursor = page[2]
+    if not next_cursor:
+        break
 
 # ---------- Header row ----------
 with st.container():
@@ -215,6 +366,10 @@ for item in history:
                 st.success("Deleted")
                 st.rerun()
 
+if next_cursor and st.button("Load more", key="history_more"):
+    st.session_state["history_pages"] = history_pages + 1
+    st.rerun()
+
 # ---------- Metadata Viewer Panel ----------
 if "view_metadata_fileId" in st.session_state:
     fileId = st.session_state["view_metadata_fileId"]
@@ -60,6 +60,7 @@ resource "aws_ecs_task_definition" "backend" {
         # ⭐ New — Auto injection from ElastiCache
         { name = "REDIS_HOST",      value = aws_elasticache_cluster.redis.cache_nodes[0].address },
         { name = "REDIS_PORT",      value = "6379" },
+        { name = "JOB_DISPATCH_MODE", value = "outbox" },
       ]
       logConfiguration = {
         logDriver = "awslogs"
@@ -132,7 +133,10 @@ resource "aws_ecs_task_definition" "worker" {
         { name = "S3_BUCKET_NAME", value = var.s3_bucket_name },
         { name = "SQS_QUEUE_URL", value = var.sqs_queue_url },
         { name = "AWS_REGION", value = var.aws_region },
-        { name = "SECRET_KEY", value = var.secret_key }
+        { name = "SECRET_KEY", value = var.secret_key },
+        # status push (pub/sub) + cache invalidation towards the backend
+        { name = "REDIS_HOST", value = aws_elasticache_cluster.redis.cache_nodes[0].address },
+        { name = "REDIS_PORT", value = "6379" }
       ]
       logConfiguration = {
         logDriver = "awslogs"
@@ -42,7 +42,10 @@ resource "aws_iam_role_policy" "ecs_task_policy" {
         Action = [
           "s3:GetObject",
           "s3:PutObject",
-          "s3:ListBucket"
+          "s3:ListBucket",
+          "s3:AbortMultipartUpload",
+          "s3:ListMultipartUploadParts",
+          "s3:ListBucketMultipartUploads"
         ],
         Resource = [
           "arn:aws:s3:::${var.s3_bucket_name}",
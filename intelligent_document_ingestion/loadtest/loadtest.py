@@ -1,5 +1,5 @@
 from locust import HttpUser, task, between
-import requests, time, uuid, os
+import requests, time, uuid, os, json
 
 USERNAME = "admin"
 PASSWORD = "admin@123"
@@ -64,26 +64,27 @@ class IdoUser(HttpUser):
             headers=self.headers
         )
 
-        # step 4 → poll status with backoff (exactly like UI)
-        poll_interval = 2
-        while True:
-            time.sleep(poll_interval)
-            st = self.client.get(
-                f"/api/v1/uploads/{file_id}/status",
-                headers=self.headers
-            )
-            print(f"Status Poll Response: {st.status_code} {st.text}")
+        # step 4 → wait for the pushed status (exactly like UI)
+        with self.client.get(
+            "/api/v1/uploads/status/stream",
+            params={"fileIds": file_id},
+            headers={**self.headers, "Accept": "text/event-stream"},
+            stream=True,
+            name="/api/v1/uploads/status/stream",
+        ) as st:
             if st.status_code != 200:
-                print("STATUS ERROR:", st.status_code, st.text)
+                print("STATUS STREAM ERROR:", st.status_code, st.text)
                 self.environment.runner.quit()
-                
-            status = st.json()["status"]
 
-            if status in ["completed", "failed"]:
-                break
-
-            if poll_interval < 8:
-                poll_interval += 1
+            event = None
+            for line in st.iter_lines(decode_unicode=True):
+                if line.startswith("event:"):
+                    event = line[len("event:"):].strip()
+                elif line.startswith("data:") and event == "status":
+                    status = json.loads(line[len("data:"):].strip())["status"]
+                    print(f"Status Event: {file_id} {status}")
+                    if status in ["completed", "failed"]:
+                        break
 
 
 #locust -f loadtest.py --host http://43.205.235.186:8000 --users 10 --spawn-rate 10 --run-time 10 --stop-timeout 30 --csv loadtest --html loadtest.html
\ No newline at end of file
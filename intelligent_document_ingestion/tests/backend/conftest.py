@@ -0,0 +1,161 @@
+# tests/backend/conftest.py
+import uuid
+from datetime import datetime, timedelta
+
+import pytest
+
+from file_processing_backend import app as app_mod
+from file_processing_backend.app import Document
+
+
+@pytest.fixture
+def make_document(db_session):
+    """
+    Factory for committed Document rows. Keyword arguments override the
+    column defaults; without a user_id each row gets a fresh owner, since
+    committed rows outlive the test.
+    """
+    def make(status="pending", updated_minutes_ago=0, **columns):
+        file_id = columns.setdefault("file_id", str(uuid.uuid4()))
+        columns.setdefault("user_id", f"u-{uuid.uuid4()}")
+        columns.setdefault("file_name", "a.pdf")
+        columns.setdefault("file_type", "application/pdf")
+        columns.setdefault("file_size", 10)
+        columns.setdefault("s3_key", f"uploads/{file_id}.pdf")
+        columns.setdefault("upload_time", datetime.utcnow())
+        doc = Document(status=status, **columns)
+        db_session.add(doc)
+        db_session.commit()
+        if updated_minutes_ago:
+            db_session.query(Document).filter_by(file_id=doc.file_id).update(
+                {"updated_at": datetime.utcnow() - timedelta(minutes=updated_minutes_ago)},
+                synchronize_session=False,
+            )
+            db_session.commit()
+        return doc
+
+    return make
+
+
+class FakeSQS:
+    def __init__(self):
+        self.messages = []
+
+    def send_message(self, QueueUrl, MessageBody):
+        self.messages.append({"QueueUrl": QueueUrl, "Body": MessageBody})
+        return {"MessageId": "msg-1"}
+
+    def send_message_batch(self, QueueUrl, Entries):
+        for e in Entries:
+            self.messages.append({"QueueUrl": QueueUrl, "Body": e["MessageBody"]})
+        return {
+            "Successful": [{"Id": e["Id"], "MessageId": "msg-1"} for e in Entries],
+            "Failed": [],
+        }
+
+
+@pytest.fixture
+def fake_sqs(monkeypatch):
+    """Replaces the backend's SQS client; sent bodies land in `.messages`."""
+    sqs = FakeSQS()
+    monkeypatch.setattr(app_mod, "sqs", sqs)
+    return sqs
+
+
+class FakeS3:
+    def __init__(self):
+        self.uploads = {}  # upload_id -> {"key", "parts", "initiated"}
+        self.completed = []
+        self.aborted = []
+        self.calls = []  # keys per delete_objects call
+        self.fail_keys = set()
+
+    def create_multipart_upload(self, Bucket, Key, ContentType):
+        upload_id = f"up-{len(self.uploads) + 1}"
+        self.uploads[upload_id] = {"key": Key, "parts": {}, "initiated": datetime.utcnow()}
+        return {"UploadId": upload_id}
+
+    def generate_presigned_url(self, ClientMethod, Params, ExpiresIn, HttpMethod=None):
+        return f"https://fake/{ClientMethod}/{Params.get('PartNumber', '')}"
+
+    def list_parts(self, Bucket, Key, UploadId, PartNumberMarker=0):
+        parts = self.uploads[UploadId]["parts"]
+        return {
+            "Parts": [
+                {"PartNumber": n, "ETag": etag, "Size": 5}
+                for n, etag in sorted(parts.items())
+                if n > PartNumberMarker
+            ],
+            "IsTruncated": False,
+        }
+
+    def complete_multipart_upload(self, Bucket, Key, UploadId, MultipartUpload):
+        self.completed.append((UploadId, MultipartUpload["Parts"]))
+
+    def abort_multipart_upload(self, Bucket, Key, UploadId):
+        self.aborted.append(UploadId)
+
+    def list_multipart_uploads(self, Bucket, Prefix, **kwargs):
+        return {
+            "Uploads": [
+                {"Key": u["key"], "UploadId": uid, "Initiated": u["initiated"]}
+                for uid, u in self.uploads.items()
+                if uid not in self.aborted
+            ],
+            "IsTruncated": False,
+        }
+
+    def delete_objects(self, Bucket, Delete):
+        keys = [o["Key"] for o in Delete["Objects"]]
+        assert len(keys) <= 1000
+        self.calls.append(keys)
+        return {
+            "Errors": [
+                {"Key": k, "Code": "AccessDenied", "Message": "no"}
+                for k in keys
+                if k in self.fail_keys
+            ]
+        }
+
+
+@pytest.fixture
+def fake_s3(monkeypatch):
+    """Replaces the backend's S3 client with an in-memory FakeS3."""
+    s3 = FakeS3()
+    monkeypatch.setattr(app_mod, "s3_client", s3)
+    return s3
+
+
+class FakeRedis:
+    """Just the string commands the caches use; pipelines run immediately."""
+
+    def __init__(self):
+        self.data = {}
+        self.ttls = {}
+
+    def get(self, key):
+        return self.data.get(key)
+
+    def mget(self, keys):
+        return [self.data.get(k) for k in keys]
+
+    def set(self, key, value, ex=None, nx=False):
+        if nx and key in self.data:
+            return False
+        self.data[key] = value
+        self.ttls[key] = ex
+        return True
+
+    def delete(self, key):
+        self.data.pop(key, None)
+
+    def pipeline(self, transaction=False):
+        return self
+
+    def execute(self):
+        return []
+
+
+@pytest.fixture
+def fake_redis():
+    return FakeRedis()
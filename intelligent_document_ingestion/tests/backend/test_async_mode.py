@@ -0,0 +1,147 @@
+# tests/test_async_mode.py
+import pytest
+
+pytest.importorskip("aiosqlite")
+
+from file_processing_backend.async_io import to_async_url
+
+
+@pytest.mark.parametrize(
+    "url, expected",
+    [
+        ("postgresql://u:p@db:5432/filedb", "postgresql+asyncpg://u:p@db:5432/filedb"),
+        ("postgresql+psycopg2://u:p@db/filedb", "postgresql+asyncpg://u:p@db/filedb"),
+        ("sqlite:///./test.db", "sqlite+aiosqlite:///./test.db"),
+        ("postgresql+asyncpg://u:p@db/filedb", "postgresql+asyncpg://u:p@db/filedb"),
+    ],
+)
+def test_to_async_url(url, expected):
+    assert to_async_url(url) == expected
+
+
+def test_mount_swaps_in_async_handlers():
+    from fastapi import FastAPI
+    from fastapi.routing import APIRoute
+    from file_processing_backend import async_routes
+
+    app = FastAPI()
+
+    @app.get("/api/v1/uploads/{file_id}/status")
+    def sync_status(file_id: str):
+        return {}
+
+    @app.get("/api/v1/uploads/{file_id}/download")
+    def sync_download(file_id: str):
+        return {}
+
+    async_routes.mount(app)
+
+    endpoints = {
+        r.endpoint for r in app.router.routes if isinstance(r, APIRoute)
+    }
+    assert sync_status not in endpoints
+    assert sync_download in endpoints
+
+
+# ---- async routes answer like the sync ones ----
+import asyncio
+from datetime import datetime
+
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from file_processing_backend import app as app_mod
+from file_processing_backend.presign_cache import PresignedUrlCache
+
+
+class NullAsyncSQS:
+    def __init__(self):
+        self.sent = []
+
+    async def send_message(self, QueueUrl, MessageBody):
+        self.sent.append(MessageBody)
+
+
+@pytest.fixture
+def async_client(monkeypatch, fake_sqs):
+    from file_processing_backend import async_routes
+
+    monkeypatch.setattr(async_routes, "sqs", NullAsyncSQS())
+    app = FastAPI()
+    app.include_router(async_routes.router)
+    return TestClient(app)
+
+
+@pytest.fixture
+def signed_on(monkeypatch):
+    """Presigner recording whether it ran on an event loop."""
+    calls = []
+
+    def signer(ClientMethod, Params, ExpiresIn):
+        try:
+            asyncio.get_running_loop()
+            calls.append("loop")
+        except RuntimeError:
+            calls.append("thread")
+        return f"https://s3.example/{Params['Key']}?sig=1"
+
+    monkeypatch.setattr(app_mod, "presigned_urls", PresignedUrlCache(signer))
+    return calls
+
+
+def _both(client, async_client, method, url, **kwargs):
+    # async first, so it never rides on caches the sync request warmed
+    async_res = getattr(async_client, method)(url, **kwargs)
+    return getattr(client, method)(url, **kwargs), async_res
+
+
+def test_status_matches_the_sync_route(
+    client, async_client, make_document, system_user, signed_on
+):
+    doc = make_document(
+        "completed", user_id=system_user.user_id, completed_time=datetime.utcnow()
+    )
+    url = f"/api/v1/uploads/{doc.file_id}/status"
+
+    sync_res, async_res = _both(client, async_client, "get", url)
+    assert sync_res.status_code == async_res.status_code == 200
+    assert async_res.json() == sync_res.json()
+    assert async_res.json()["downloadUrl"].startswith("https://s3.example/")
+    assert async_res.headers["etag"] == sync_res.headers["etag"]
+    # the presign lookup ran in a thread, not on the async route's event loop
+    assert signed_on == ["thread"]
+
+    headers = {"If-None-Match": sync_res.headers["etag"]}
+    sync_res, async_res = _both(client, async_client, "get", url, headers=headers)
+    assert sync_res.status_code == async_res.status_code == 304
+
+    sync_res, async_res = _both(client, async_client, "get", "/api/v1/uploads/nope/status")
+    assert sync_res.status_code == async_res.status_code == 404
+    assert async_res.json() == sync_res.json()
+
+
+def test_complete_and_retry_match_the_sync_routes(
+    client, async_client, db_session, make_document, system_user
+):
+    for route in ("complete", "retry"):
+        responses = []
+        for c in (client, async_client):
+            if route == "complete":
+                doc = make_document("uploaded", user_id=system_user.user_id)
+            else:
+                doc = make_document(
+                    "failed", user_id=system_user.user_id, completed_time=datetime.utcnow()
+                )
+            if route == "complete":
+                res = c.post("/api/v1/uploads/complete", json={"fileId": doc.file_id})
+            else:
+                res = c.post(f"/api/v1/uploads/{doc.file_id}/retry")
+            db_session.refresh(doc)
+            responses.append((res.status_code, res.json(), doc.status))
+        assert responses[0] == responses[1], route
+
+    sync_res, async_res = _both(
+        client, async_client, "post", "/api/v1/uploads/complete", json={"fileId": "nope"}
+    )
+    assert sync_res.status_code == async_res.status_code == 404
+    assert async_res.json() == sync_res.json()
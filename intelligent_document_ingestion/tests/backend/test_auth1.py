@@ -48,3 +48,29 @@ def test_admin_guard_blocks_system_user(client, system_user):
     )
     assert res.status_code == 403
     assert res.json()["detail"] == "Admin access required"
+
+
+def test_login_sheds_load_when_hash_queue_full(client, admin_user, monkeypatch):
+    import threading
+    from file_processing_backend import passwords
+
+    full = threading.BoundedSemaphore(1)
+    full.acquire()  # every pending slot taken
+    monkeypatch.setattr(passwords, "_slots", full)
+
+    res = client.post(
+        "/auth/login",
+        data={"username": "admin", "password": "admin@123"},
+        headers={"Content-Type": "application/x-www-form-urlencoded"},
+    )
+    assert res.status_code == 503
+    assert res.headers["Retry-After"] == "1"
+
+
+def test_hashing_metrics_exposed_to_admin(client, admin_user):
+    token = create_access_token({"sub": admin_user.user_id, "role": "admin"})
+    res = client.get("/admin/metrics", headers={"Authorization": f"Bearer {token}"})
+    assert res.status_code == 200
+    body = res.json()
+    assert "password_hash_seconds" in body
+    assert "password_hash_rejected_total" in body
@@ -0,0 +1,96 @@
+# tests/test_bootstrap.py
+import os
+import subprocess
+import sys
+
+from sqlalchemy import create_engine, inspect, text
+from sqlalchemy.orm import sessionmaker
+
+from file_processing_backend import app as app_mod
+from file_processing_backend import bootstrap
+from file_processing_backend.user import User
+
+
+def _legacy_engine(tmp_path):
+    """A database created before multipart uploads and ETags existed."""
+    eng = create_engine(f"sqlite:///{tmp_path / 'legacy.db'}")
+    with eng.begin() as conn:
+        conn.execute(text(
+            "CREATE TABLE documents (file_id VARCHAR PRIMARY KEY, user_id VARCHAR, "
+            "file_name VARCHAR, file_type VARCHAR, file_size INTEGER, status VARCHAR, "
+            "upload_time DATETIME, completed_time DATETIME, s3_key VARCHAR, "
+            "error TEXT, extracted_metadata JSON)"
+        ))
+        conn.execute(text(
+            "INSERT INTO documents (file_id, user_id, status) VALUES ('f1', 'u1', 'completed')"
+        ))
+    return eng
+
+
+def test_init_db_adds_missing_columns_indexes_and_tables(tmp_path):
+    eng = _legacy_engine(tmp_path)
+
+    bootstrap.init_db(bind=eng)
+    bootstrap.init_db(bind=eng)  # idempotent
+
+    insp = inspect(eng)
+    columns = {c["name"] for c in insp.get_columns("documents")}
+    assert {"multipart_upload_id", "updated_at"} <= columns
+    assert "ix_documents_user_upload_time" in {i["name"] for i in insp.get_indexes("documents")}
+    assert insp.has_table("users") and insp.has_table("outbox")
+    with eng.connect() as conn:
+        assert conn.execute(text("SELECT status FROM documents")).scalar() == "completed"
+
+
+def test_seed_admin_only_on_empty_users_table(tmp_path, monkeypatch):
+    eng = create_engine(f"sqlite:///{tmp_path / 'fresh.db'}")
+    bootstrap.init_db(bind=eng)
+    Session = sessionmaker(bind=eng)
+    monkeypatch.setattr(bootstrap, "SessionLocal", Session)
+
+    bootstrap.seed_admin()
+    bootstrap.seed_admin()
+
+    db = Session()
+    users = db.query(User).all()
+    db.close()
+    assert [(u.username, u.role) for u in users] == [("admin", "admin")]
+
+
+def test_table_rewriting_migrations_only_run_from_the_cli(tmp_path, monkeypatch):
+    steps = []
+    monkeypatch.setattr(bootstrap, "init_db", lambda: steps.append("init"))
+    monkeypatch.setattr(bootstrap, "migrate_search", lambda: steps.append("migrate"))
+    monkeypatch.setattr(bootstrap, "search_schema_ready", lambda: True)
+
+    bootstrap.bootstrap(seed=False)  # the app's startup step
+    assert steps == ["init"]
+    bootstrap.bootstrap(seed=False, migrate=True)  # python bootstrap.py
+    assert steps == ["init", "init", "migrate"]
+
+
+def test_search_migration_is_postgres_only(tmp_path):
+    eng = create_engine(f"sqlite:///{tmp_path / 'fresh.db'}")
+    bootstrap.init_db(bind=eng)
+
+    bootstrap.migrate_search(bind=eng)
+
+    assert bootstrap.search_schema_ready(bind=eng)
+    assert "search_vector" not in {c["name"] for c in inspect(eng).get_columns("documents")}
+
+
+def test_import_has_no_side_effects(tmp_path):
+    """Importing the app neither creates the database nor contacts Redis."""
+    db_file = tmp_path / "untouched.db"
+    code = (
+        "import sys; sys.path.insert(0, %r); import app; "
+        "assert app.sqs._client is None and app.s3_client._client is None"
+    ) % os.path.dirname(app_mod.__file__)
+    env = {
+        "DATABASE_URL": f"sqlite:///{db_file}",
+        "REDIS_HOST": "192.0.2.1",
+        "S3_BUCKET_NAME": "test-bucket",
+        "PATH": "",
+    }
+    subprocess.run([sys.executable, "-c", code], env=env, check=True, timeout=60)
+    assert not db_file.exists()
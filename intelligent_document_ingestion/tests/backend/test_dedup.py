@@ -0,0 +1,144 @@
+# tests/test_dedup.py
+import hashlib
+import uuid
+from datetime import datetime
+
+from file_processing_backend import app as app_mod
+from file_processing_backend.app import Document
+from file_processing_backend.user import create_access_token
+
+
+def auth_header_for(user):
+    token = create_access_token({"sub": user.user_id, "role": user.role})
+    return {"Authorization": f"Bearer {token}"}
+
+
+def _fake_presign(monkeypatch):
+    import file_processing_backend.config as cfg
+    monkeypatch.setattr(
+        cfg.s3_client,
+        "generate_presigned_url",
+        lambda ClientMethod, Params, HttpMethod=None, ExpiresIn=None: "https://fake-presigned-url",
+    )
+
+
+def _completed_doc(db_session, user, sha):
+    doc = Document(
+        file_id=str(uuid.uuid4()),
+        user_id=user.user_id,
+        file_name="invoice.pdf",
+        file_type="application/pdf",
+        file_size=100,
+        status="completed",
+        s3_key=f"uploads/{uuid.uuid4()}.pdf",
+        upload_time=datetime.utcnow(),
+        completed_time=datetime.utcnow(),
+        extracted_metadata={"documentType": "Invoice"},
+        content_sha256=sha,
+    )
+    db_session.add(doc)
+    db_session.commit()
+    return doc
+
+
+def _payload(user, sha):
+    return {
+        "userId": user.user_id,
+        "fileName": "invoice-copy.pdf",
+        "fileSize": 100,
+        "fileType": "application/pdf",
+        "sha256": sha,
+    }
+
+
+def test_known_hash_completes_without_upload(client, system_user, db_session, monkeypatch):
+    _fake_presign(monkeypatch)
+    sha = hashlib.sha256(uuid.uuid4().bytes).hexdigest()
+    source = _completed_doc(db_session, system_user, sha)
+    headers = auth_header_for(system_user)
+
+    res = client.post("/api/v1/uploads/request", json=_payload(system_user, sha.upper()), headers=headers)
+
+    body = res.json()
+    assert res.status_code == 200
+    assert body["uploadRequired"] is False and body["uploadUrl"] is None
+    assert body["deduplicatedFrom"] == source.file_id
+
+    doc = db_session.query(Document).filter_by(file_id=body["fileId"]).one()
+    assert doc.status == "completed"
+    assert doc.s3_key == source.s3_key
+    assert doc.extracted_metadata["documentType"] == "Invoice"
+
+    # completing it queues nothing
+    sqs = type("NoSQS", (), {})()
+    monkeypatch.setattr(app_mod, "sqs", sqs)
+    res = client.post("/api/v1/uploads/complete", json={"fileId": doc.file_id}, headers=headers)
+    assert res.json()["message"] == "Already processed"
+
+
+def test_other_users_documents_are_not_reused(
+    client, system_user, admin_user, db_session, monkeypatch
+):
+    _fake_presign(monkeypatch)
+    sha = hashlib.sha256(uuid.uuid4().bytes).hexdigest()
+    _completed_doc(db_session, admin_user, sha)
+
+    res = client.post(
+        "/api/v1/uploads/request",
+        json=_payload(system_user, sha),
+        headers=auth_header_for(system_user),
+    )
+
+    body = res.json()
+    assert body["uploadRequired"] is True
+    assert body["uploadUrl"] == "https://fake-presigned-url"
+    doc = db_session.query(Document).filter_by(file_id=body["fileId"]).one()
+    assert doc.status == "pending" and doc.content_sha256 == sha
+
+
+def test_batch_mixes_deduplicated_and_new_files(client, system_user, db_session, monkeypatch):
+    _fake_presign(monkeypatch)
+    known = hashlib.sha256(uuid.uuid4().bytes).hexdigest()
+    _completed_doc(db_session, system_user, known)
+    new = hashlib.sha256(uuid.uuid4().bytes).hexdigest()
+
+    res = client.post(
+        "/api/v1/uploads/request:batch",
+        json={"files": [_payload(system_user, known), _payload(system_user, new)]},
+        headers=auth_header_for(system_user),
+    )
+
+    first, second = [r["data"] for r in res.json()["results"]]
+    assert first["uploadRequired"] is False
+    assert second["uploadRequired"] is True
+
+
+def test_delete_keeps_shared_s3_object(client, system_user, db_session, monkeypatch):
+    _fake_presign(monkeypatch)
+    sha = hashlib.sha256(uuid.uuid4().bytes).hexdigest()
+    source = _completed_doc(db_session, system_user, sha)
+    res = client.post(
+        "/api/v1/uploads/request",
+        json=_payload(system_user, sha),
+        headers=auth_header_for(system_user),
+    )
+    copy_id = res.json()["fileId"]
+    deleted = []
+    monkeypatch.setattr(
+        app_mod.s3_client, "delete_object", lambda Bucket, Key: deleted.append(Key)
+    )
+
+    client.delete(f"/api/v1/uploads/{source.file_id}")
+    assert deleted == []  # the copy still points at it
+
+    client.delete(f"/api/v1/uploads/{copy_id}")
+    assert deleted == [source.s3_key]
+
+
+def test_rejects_malformed_hash(client, system_user):
+    res = client.post(
+        "/api/v1/uploads/request",
+        json=_payload(system_user, "not-a-hash"),
+        headers=auth_header_for(system_user),
+    )
+    assert res.status_code == 422
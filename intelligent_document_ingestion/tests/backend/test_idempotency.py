@@ -0,0 +1,107 @@
+# tests/test_idempotency.py
+import uuid
+
+import pytest
+from fastapi import HTTPException
+
+from file_processing_backend import app as app_mod
+from file_processing_backend.app import Document
+from file_processing_backend.idempotency import IdempotencyStore
+from file_processing_backend.user import create_access_token
+
+
+def auth_header_for(user):
+    token = create_access_token({"sub": user.user_id, "role": user.role})
+    return {"Authorization": f"Bearer {token}"}
+
+
+def _fake_presign(monkeypatch):
+    import file_processing_backend.config as cfg
+    monkeypatch.setattr(
+        cfg.s3_client,
+        "generate_presigned_url",
+        lambda ClientMethod, Params, HttpMethod=None, ExpiresIn=None: "https://fake-presigned-url",
+    )
+
+
+def _payload(user, name="report.pdf"):
+    return {"userId": user.user_id, "fileName": name, "fileSize": 100, "fileType": "application/pdf"}
+
+
+def test_repeated_request_upload_returns_the_first_response(
+    client, system_user, db_session, monkeypatch
+):
+    _fake_presign(monkeypatch)
+    name = f"{uuid.uuid4()}.pdf"
+    headers = {**auth_header_for(system_user), "Idempotency-Key": str(uuid.uuid4())}
+
+    first = client.post("/api/v1/uploads/request", json=_payload(system_user, name), headers=headers)
+    second = client.post("/api/v1/uploads/request", json=_payload(system_user, name), headers=headers)
+
+    assert second.status_code == 200
+    assert second.json() == first.json()
+    assert second.headers["Idempotent-Replayed"] == "true"
+    assert db_session.query(Document).filter_by(file_name=name).count() == 1
+
+    other = client.post("/api/v1/uploads/request", json=_payload(system_user), headers=headers)
+    assert other.status_code == 422
+
+
+def test_repeated_completion_queues_one_job(client, system_user, make_document, fake_sqs):
+    doc = make_document(user_id=system_user.user_id)
+    headers = {**auth_header_for(system_user), "Idempotency-Key": f"complete-{doc.file_id}"}
+
+    codes = [
+        client.post("/api/v1/uploads/complete", json={"fileId": doc.file_id}, headers=headers)
+        .status_code
+        for _ in range(3)
+    ]
+
+    assert codes == [200, 200, 200]
+    assert len(fake_sqs.messages) == 1
+
+
+def test_processing_documents_are_not_queued_again(client, system_user, make_document, fake_sqs):
+    busy = make_document("processing", user_id=system_user.user_id)
+    stuck = make_document("processing", updated_minutes_ago=60, user_id=system_user.user_id)
+
+    res = client.post("/api/v1/uploads/complete", json={"fileId": busy.file_id})
+    assert res.status_code == 409
+    assert client.post(f"/api/v1/uploads/{busy.file_id}/retry").status_code == 409
+    assert fake_sqs.messages == []
+
+    # a worker that died long ago doesn't block a retry
+    assert client.post(f"/api/v1/uploads/{stuck.file_id}/retry").status_code == 200
+    assert len(fake_sqs.messages) == 1
+
+
+def test_in_flight_key_conflicts_and_failures_release_it():
+    store = IdempotencyStore()
+
+    def nested():
+        return store.run("route", "user:u1", "k1", {"a": 1}, lambda: "second")
+
+    with pytest.raises(HTTPException) as exc:
+        store.run("route", "user:u1", "k1", {"a": 1}, nested)
+    assert exc.value.status_code == 409
+
+    # the failed request released its key
+    assert store.run("route", "user:u1", "k1", {"a": 1}, lambda: {"ok": True}) == {"ok": True}
+    assert store.run("route", "user:u1", "k1", {"a": 1}, lambda: None).body == b'{"ok":true}'
+    # keys are per caller
+    assert store.run("route", "user:u2", "k1", {"a": 1}, lambda: "mine") == "mine"
+
+
+
+def test_request_upload_replays_expire_with_the_presigned_url(
+    client, system_user, fake_redis, monkeypatch
+):
+    _fake_presign(monkeypatch)
+    monkeypatch.setattr(app_mod.idempotency_store, "redis_client", fake_redis)
+    headers = {**auth_header_for(system_user), "Idempotency-Key": str(uuid.uuid4())}
+
+    res = client.post("/api/v1/uploads/request", json=_payload(system_user), headers=headers)
+
+    assert res.status_code == 200
+    [key] = fake_redis.data
+    assert fake_redis.ttls[key] == app_mod.UPLOAD_URL_EXPIRES_IN
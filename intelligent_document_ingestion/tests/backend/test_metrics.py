@@ -0,0 +1,30 @@
+# tests/test_metrics.py
+from file_processing_backend import metrics
+
+
+def test_metrics_endpoint_reports_route_templates(client):
+    client.get("/api/v1/uploads/does-not-exist/status")
+
+    res = client.get("/metrics")
+    assert res.status_code == 200
+    assert res.headers["content-type"].startswith("text/plain")
+    text = res.text
+    assert (
+        'http_request_duration_seconds_count{method="GET",'
+        'route="/api/v1/uploads/{file_id}/status",status="404"}'
+    ) in text
+    assert "does-not-exist" not in text
+    assert 'db_pool_checked_out{engine="primary"}' in text
+    assert "# TYPE status_cache_lookups_total counter" in text
+
+
+def test_histogram_buckets_are_cumulative():
+    h = metrics.histogram("test_render_seconds", "test", buckets=(0.1, 1.0))
+    for v in (0.05, 0.5, 0.5, 5.0):
+        h.observe(v)
+
+    text = metrics.render_prometheus()
+    assert 'test_render_seconds_bucket{le="0.1"} 1' in text
+    assert 'test_render_seconds_bucket{le="1"} 3' in text
+    assert 'test_render_seconds_bucket{le="+Inf"} 4' in text
+    assert "test_render_seconds_count 4" in text
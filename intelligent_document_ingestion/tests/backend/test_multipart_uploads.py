@@ -0,0 +1,107 @@
+# tests/test_multipart_uploads.py
+from datetime import datetime, timedelta
+
+from file_processing_backend.user import create_access_token
+from file_processing_backend.app import Document
+
+
+def auth_header_for(user):
+    token = create_access_token({"sub": user.user_id, "role": user.role})
+    return {"Authorization": f"Bearer {token}"}
+
+
+def _initiate(client, user, size=40 * 1024 * 1024):
+    res = client.post(
+        "/api/v1/uploads/multipart/initiate",
+        json={
+            "userId": user.user_id,
+            "fileName": "scan.pdf",
+            "fileSize": size,
+            "fileType": "application/pdf",
+            "partSize": 16 * 1024 * 1024,
+        },
+        headers=auth_header_for(user),
+    )
+    assert res.status_code == 200
+    return res.json()
+
+
+def test_multipart_flow_with_resume(client, system_user, db_session, fake_s3):
+    headers = auth_header_for(system_user)
+    init = _initiate(client, system_user)
+    assert init["partCount"] == 3
+
+    file_id, upload_id = init["fileId"], init["uploadId"]
+    res = client.post(
+        f"/api/v1/uploads/multipart/{file_id}/parts",
+        json={"uploadId": upload_id, "partNumbers": [3, 1, 2]},
+        headers=headers,
+    )
+    assert [p["partNumber"] for p in res.json()["parts"]] == [1, 2, 3]
+
+    # parts 1 and 3 made it, the client resumes by asking what S3 has
+    fake_s3.uploads[upload_id]["parts"].update({1: '"e1"', 3: '"e3"'})
+    res = client.get(
+        f"/api/v1/uploads/multipart/{file_id}/parts",
+        params={"uploadId": upload_id},
+        headers=headers,
+    )
+    assert [p["partNumber"] for p in res.json()] == [1, 3]
+
+    # queuing before the object is assembled is refused
+    res = client.post("/api/v1/uploads/complete", json={"fileId": file_id}, headers=headers)
+    assert res.status_code == 409
+
+    fake_s3.uploads[upload_id]["parts"][2] = '"e2"'
+    res = client.post(
+        f"/api/v1/uploads/multipart/{file_id}/complete",
+        json={"uploadId": upload_id},
+        headers=headers,
+    )
+    assert res.status_code == 200
+    assert [p["PartNumber"] for p in fake_s3.completed[0][1]] == [1, 2, 3]
+
+    doc = db_session.query(Document).filter_by(file_id=file_id).first()
+    db_session.refresh(doc)
+    assert doc.multipart_upload_id is None
+
+
+def test_multipart_abort_removes_document(client, system_user, db_session, fake_s3):
+    init = _initiate(client, system_user)
+    res = client.post(
+        f"/api/v1/uploads/multipart/{init['fileId']}/abort",
+        json={"uploadId": init["uploadId"]},
+        headers=auth_header_for(system_user),
+    )
+    assert res.status_code == 200
+    assert fake_s3.aborted == [init["uploadId"]]
+    assert db_session.query(Document).filter_by(file_id=init["fileId"]).first() is None
+
+
+def test_stale_multipart_cleanup(client, admin_user, system_user, db_session, fake_s3):
+    old = _initiate(client, system_user)
+    fresh = _initiate(client, system_user)
+    fake_s3.uploads[old["uploadId"]]["initiated"] = datetime.utcnow() - timedelta(days=3)
+
+    res = client.post(
+        "/admin/uploads/multipart/cleanup",
+        params={"olderThanHours": 24},
+        headers=auth_header_for(admin_user),
+    )
+    assert res.json() == {"aborted": 1, "documentsMarkedFailed": 1}
+    assert fake_s3.aborted == [old["uploadId"]]
+
+    doc = db_session.query(Document).filter_by(file_id=old["fileId"]).first()
+    db_session.refresh(doc)
+    assert doc.status == "failed"
+    assert db_session.query(Document).filter_by(file_id=fresh["fileId"]).first().status == "pending"
+
+
+def test_multipart_parts_are_owner_only(client, admin_user, system_user, fake_s3):
+    init = _initiate(client, system_user)
+    res = client.post(
+        f"/api/v1/uploads/multipart/{init['fileId']}/parts",
+        json={"uploadId": init["uploadId"], "partNumbers": [1]},
+        headers=auth_header_for(admin_user),
+    )
+    assert res.status_code == 404
@@ -0,0 +1,75 @@
+# tests/test_outbox.py
+import json
+from datetime import datetime
+
+from file_processing_backend import app as app_mod
+from file_processing_backend import outbox
+from file_processing_backend.config import SessionLocal
+from file_processing_backend.outbox import OutboxEvent, OutboxRelay
+
+
+class BatchSQS:
+    def __init__(self, fail_bodies=()):
+        self.fail_bodies = set(fail_bodies)
+        self.batches = []
+
+    def send_message(self, QueueUrl, MessageBody):
+        raise AssertionError("outbox mode must not send from the request")
+
+    def send_message_batch(self, QueueUrl, Entries):
+        self.batches.append(Entries)
+        ok = [e for e in Entries if e["MessageBody"] not in self.fail_bodies]
+        bad = [e for e in Entries if e["MessageBody"] in self.fail_bodies]
+        return {
+            "Successful": [{"Id": e["Id"], "MessageId": f"m-{e['Id']}"} for e in ok],
+            "Failed": [
+                {"Id": e["Id"], "SenderFault": False, "Code": "InternalError", "Message": "x"}
+                for e in bad
+            ],
+        }
+
+
+def _relay(sqs, batch_size=100):
+    return OutboxRelay(SessionLocal, lambda: sqs, lambda: "https://queue", batch_size=batch_size)
+
+
+def test_upload_complete_in_outbox_mode_commits_job_with_status(
+    client, system_user, db_session, make_document, monkeypatch
+):
+    sqs = BatchSQS()
+    monkeypatch.setattr(outbox, "JOB_DISPATCH_MODE", "outbox")
+    monkeypatch.setattr(app_mod, "sqs", sqs)
+    doc = make_document(file_id="ob-1", user_id=system_user.user_id)
+
+    res = client.post("/api/v1/uploads/complete", json={"fileId": "ob-1"})
+    assert res.status_code == 200
+
+    db_session.refresh(doc)
+    assert doc.status == "processing"
+    rows = db_session.query(OutboxEvent).all()
+    assert [json.loads(r.payload)["fileId"] for r in rows] == ["ob-1"]
+    assert sqs.batches == []
+
+    assert _relay(sqs).drain_once() == 1
+    assert json.loads(sqs.batches[0][0]["MessageBody"])["fileId"] == "ob-1"
+    db_session.expire_all()
+    assert db_session.query(OutboxEvent).count() == 0
+
+
+def test_relay_batches_and_defers_failed_rows(db_session):
+    for i in range(25):
+        outbox.enqueue(db_session, f"job-{i}")
+    db_session.commit()
+
+    sqs = BatchSQS(fail_bodies={"job-3"})
+    assert _relay(sqs).drain_once() == 24
+    assert [len(b) for b in sqs.batches] == [10, 10, 5]
+
+    db_session.expire_all()
+    left = db_session.query(OutboxEvent).all()
+    assert [r.payload for r in left] == ["job-3"]
+    assert left[0].attempts == 1
+    assert left[0].available_at > datetime.utcnow()
+
+    # backed off: not due yet
+    assert _relay(sqs).drain_once() == 0
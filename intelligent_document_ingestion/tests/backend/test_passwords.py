@@ -0,0 +1,106 @@
+# tests/test_passwords.py
+import asyncio
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from file_processing_backend import passwords
+
+
+@pytest.fixture
+def slow_pool(monkeypatch):
+    """Hash jobs that run until `release` is set, on a real executor."""
+    release = threading.Event()
+
+    def slow(op, *args):
+        started = time.time()
+        release.wait(5)
+        return f"{op}:{args[0]}", started, time.time()
+
+    pool = ThreadPoolExecutor(2)
+    monkeypatch.setattr(passwords, "PASSWORD_HASH_WORKERS", 2)
+    monkeypatch.setattr(passwords, "_get_pool", lambda: pool)
+    monkeypatch.setattr(passwords, "_timed", slow)
+    monkeypatch.setattr(passwords, "_slots", threading.BoundedSemaphore(2))
+    monkeypatch.setattr(passwords, "_blocking_slots", threading.BoundedSemaphore(1))
+    yield release
+    release.set()
+    pool.shutdown(wait=True)
+
+
+def _wait_for(cond, timeout=5):
+    deadline = time.monotonic() + timeout
+    while not cond():
+        assert time.monotonic() < deadline, "timed out"
+        time.sleep(0.005)
+
+
+def _count(counter, op):
+    return sum(c.value for labels, c in counter.children() if labels["op"] == op)
+
+
+def test_timed_out_job_keeps_its_slot_until_it_ends(slow_pool, monkeypatch):
+    monkeypatch.setattr(passwords, "PASSWORD_HASH_TIMEOUT", 0.05)
+    timeouts, rejected = _count(passwords.TIMEOUTS, "hash"), _count(passwords.REJECTED, "hash")
+
+    with pytest.raises(passwords.PasswordHashingTimeout):
+        passwords.hash_password("a")
+    with pytest.raises(passwords.PasswordHashingTimeout):
+        passwords.hash_password("b")
+    # slow jobs are timeouts, not queue-full rejections
+    assert _count(passwords.TIMEOUTS, "hash") == timeouts + 2
+    assert _count(passwords.REJECTED, "hash") == rejected
+    # both jobs still run in the pool, so a third caller is turned away at once
+    started = time.monotonic()
+    with pytest.raises(passwords.PasswordHashingBusy):
+        passwords.hash_password("c")
+    assert time.monotonic() - started < 0.05
+    assert _count(passwords.REJECTED, "hash") == rejected + 1
+
+    slow_pool.set()
+    _wait_for(lambda: passwords._slots._value == 2)
+    monkeypatch.setattr(passwords, "PASSWORD_HASH_TIMEOUT", 5)
+    assert passwords.hash_password("d") == "hash:d"
+
+
+def test_blocking_callers_are_capped_but_async_ones_are_not(slow_pool):
+    blocked = threading.Thread(target=passwords.hash_password, args=("a",))
+    blocked.start()
+    _wait_for(lambda: passwords._blocking_slots._value == 0)
+
+    # a second sync caller would park another request thread: rejected
+    with pytest.raises(passwords.PasswordHashingBusy):
+        passwords.verify_password("b", "hash")
+
+    async def login_while_blocked():
+        ticks = 0
+
+        async def ticker():
+            nonlocal ticks
+            while True:
+                ticks += 1
+                await asyncio.sleep(0.01)
+
+        task = asyncio.create_task(ticker())
+        verify = asyncio.create_task(passwords.verify_password_async("c", "hash"))
+        await asyncio.sleep(0.1)
+        slow_pool.set()
+        result = await verify
+        task.cancel()
+        return result, ticks
+
+    result, ticks = asyncio.run(login_while_blocked())
+    blocked.join(5)
+
+    assert result == "verify:c"
+    assert ticks >= 5  # the event loop kept running while the job waited
+
+
+def test_async_timeout_raises_timeout(slow_pool, monkeypatch):
+    monkeypatch.setattr(passwords, "PASSWORD_HASH_TIMEOUT", 0.05)
+
+    with pytest.raises(passwords.PasswordHashingTimeout):
+        asyncio.run(passwords.verify_password_async("a", "hash"))
+    assert passwords._slots._value == 1  # still held by the running job
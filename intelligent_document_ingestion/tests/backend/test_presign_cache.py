@@ -0,0 +1,49 @@
+# tests/test_presign_cache.py
+import types
+from datetime import datetime, timedelta
+
+from file_processing_backend import presign_cache, status_cache
+from file_processing_backend.presign_cache import PresignedUrlCache
+
+
+class CountingSigner:
+    def __init__(self):
+        self.calls = 0
+
+    def __call__(self, ClientMethod, Params, ExpiresIn):
+        self.calls += 1
+        return f"https://signed/{Params['Key']}?v={self.calls}"
+
+
+def test_url_is_reused_until_the_safety_margin(monkeypatch):
+    clock = [1000.0]
+    monkeypatch.setattr(presign_cache, "time", types.SimpleNamespace(time=lambda: clock[0]))
+    signer = CountingSigner()
+    cache = PresignedUrlCache(signer, expires_in=1800, safety_margin=300)
+
+    url, expires_at = cache.get("bucket", "uploads/a.pdf")
+    assert expires_at == 2800.0
+    clock[0] += 1400
+    assert cache.get("bucket", "uploads/a.pdf")[0] == url
+    assert signer.calls == 1
+
+    # inside the margin: sign a fresh one
+    clock[0] += 200
+    assert cache.get("bucket", "uploads/a.pdf")[0] != url
+    assert signer.calls == 2
+
+
+def test_invalidate_forces_resign():
+    signer = CountingSigner()
+    cache = PresignedUrlCache(signer)
+    cache.get("bucket", "uploads/b.pdf")
+    cache.invalidate("bucket", "uploads/b.pdf")
+    cache.get("bucket", "uploads/b.pdf")
+    assert signer.calls == 2
+
+
+def test_status_ttl_never_outlives_the_download_url():
+    soon = (datetime.utcnow() + timedelta(seconds=presign_cache.PRESIGN_SAFETY_MARGIN + 60))
+    payload = {"status": "completed", "downloadUrlExpiresAt": soon.isoformat()}
+    assert status_cache.ttl_for(payload) <= 60
+    assert status_cache.ttl_for({"status": "failed"}) == status_cache.STATUS_CACHE_FINAL_TTL
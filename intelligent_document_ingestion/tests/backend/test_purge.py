@@ -0,0 +1,145 @@
+# tests/test_purge.py
+import time
+import uuid
+from datetime import datetime, timedelta
+
+from file_processing_backend import app as app_mod
+from file_processing_backend.app import Document
+from file_processing_backend.config import SessionLocal
+from file_processing_backend.purge import DocumentPurger
+from file_processing_backend.user import create_access_token
+
+
+def auth_header_for(user):
+    token = create_access_token({"sub": user.user_id, "role": user.role})
+    return {"Authorization": f"Bearer {token}"}
+
+
+class FakeStatusCache:
+    def __init__(self):
+        self.missing = []
+
+    def put_many(self, payloads, missing=()):
+        self.missing.extend(missing)
+
+
+def _docs(db_session, user_id, n, days_old, s3_key=None):
+    docs = []
+    for _ in range(n):
+        fid = str(uuid.uuid4())
+        docs.append(
+            Document(
+                file_id=fid,
+                user_id=user_id,
+                file_name="old.pdf",
+                status="completed",
+                s3_key=s3_key or f"uploads/{fid}.pdf",
+                upload_time=datetime.utcnow() - timedelta(days=days_old),
+            )
+        )
+    db_session.add_all(docs)
+    db_session.commit()
+    for d in docs:  # keep the attributes readable after the rows are gone
+        db_session.refresh(d)
+        db_session.expunge(d)
+    return docs
+
+
+def _purger(s3, cache=None, chunk_size=1000):
+    return DocumentPurger(
+        SessionLocal, Document, lambda: s3, "test-bucket", status_cache=cache, chunk_size=chunk_size
+    )
+
+
+def _remaining(db_session, docs):
+    ids = [d.file_id for d in docs]
+    return {fid for (fid,) in db_session.query(Document.file_id).filter(Document.file_id.in_(ids))}
+
+
+def test_purge_deletes_old_documents_in_chunks(db_session, fake_s3):
+    user = f"purge-{uuid.uuid4()}"
+    old = _docs(db_session, user, 5, days_old=400)
+    recent = _docs(db_session, user, 2, days_old=1)
+    cache = FakeStatusCache()
+    progress = []
+
+    summary = _purger(fake_s3, cache, chunk_size=2).purge(
+        [Document.user_id == user, Document.upload_time < datetime.utcnow() - timedelta(days=365)],
+        progress=progress.append,
+    )
+
+    assert summary["deleted"] == 5 and summary["done"]
+    assert [len(c) for c in fake_s3.calls] == [2, 2, 1]
+    assert [p["deleted"] for p in progress] == [2, 4, 5]
+    assert _remaining(db_session, old + recent) == {d.file_id for d in recent}
+    assert set(cache.missing) == {d.file_id for d in old}
+
+
+def test_failed_objects_keep_their_rows_and_purge_resumes(db_session, fake_s3):
+    user = f"purge-{uuid.uuid4()}"
+    docs = _docs(db_session, user, 3, days_old=400)
+    bad = docs[1]
+    fake_s3.fail_keys.add(bad.s3_key)
+
+    summary = _purger(fake_s3).purge([Document.user_id == user])
+    assert summary["deleted"] == 2 and summary["failed"] == 1
+    assert _remaining(db_session, docs) == {bad.file_id}
+
+    # next run picks up what is left
+    fake_s3.fail_keys.clear()
+    summary = _purger(fake_s3).purge([Document.user_id == user])
+    assert summary["deleted"] == 1
+    assert _remaining(db_session, docs) == set()
+
+
+def test_dry_run_and_shared_objects(db_session, fake_s3):
+    user = f"purge-{uuid.uuid4()}"
+    old = _docs(db_session, user, 1, days_old=400, s3_key=f"uploads/{user}/shared.pdf")
+    keep = _docs(db_session, user, 1, days_old=1, s3_key=old[0].s3_key)
+    criteria = [Document.user_id == user, Document.upload_time < datetime.utcnow() - timedelta(days=30)]
+
+    dry = _purger(fake_s3).purge(criteria, dry_run=True)
+    assert dry["matched"] == 1 and dry["deleted"] == 0 and fake_s3.calls == []
+
+    summary = _purger(fake_s3).purge(criteria)
+    assert summary["deleted"] == 1 and summary["s3Shared"] == 1
+    assert fake_s3.calls == []  # the recent copy still uses the object
+    assert _remaining(db_session, old + keep) == {keep[0].file_id}
+
+
+def test_bulk_delete_endpoint_only_touches_own_documents(
+    client, system_user, admin_user, db_session, fake_s3, monkeypatch
+):
+    mine = _docs(db_session, system_user.user_id, 2, days_old=0)
+    theirs = _docs(db_session, admin_user.user_id, 1, days_old=0)
+    monkeypatch.setattr(app_mod.document_purger, "s3_client_factory", lambda: fake_s3)
+
+    res = client.post(
+        "/api/v1/uploads:bulkDelete",
+        json={"fileIds": [d.file_id for d in mine + theirs] + ["nope"]},
+        headers=auth_header_for(system_user),
+    )
+
+    body = res.json()
+    assert sorted(body["deleted"]) == sorted(d.file_id for d in mine)
+    assert body["notFound"] == [theirs[0].file_id, "nope"]
+    assert len(fake_s3.calls) == 1
+    assert _remaining(db_session, mine + theirs) == {theirs[0].file_id}
+
+
+def test_admin_purge_job_reports_progress(
+    client, admin_user, db_session, fake_s3, monkeypatch
+):
+    _docs(db_session, f"purge-{uuid.uuid4()}", 2, days_old=4000)
+    monkeypatch.setattr(app_mod.document_purger, "s3_client_factory", lambda: fake_s3)
+    headers = auth_header_for(admin_user)
+
+    job = client.post("/admin/uploads/purge", params={"olderThanDays": 3650}, headers=headers).json()
+    for _ in range(100):
+        job = client.get(f"/admin/uploads/purge/{job['jobId']}", headers=headers).json()
+        if job["state"] != "running":
+            break
+        time.sleep(0.05)
+
+    assert job["state"] == "completed"
+    assert job["progress"]["deleted"] >= 2
@@ -0,0 +1,208 @@
+# tests/test_rate_limit.py
+import asyncio
+import ipaddress
+import time
+
+import pytest
+
+from file_processing_backend import rate_limit
+from file_processing_backend.user import create_access_token
+
+
+def auth_header_for(user):
+    token = create_access_token({"sub": user.user_id, "role": user.role})
+    return {"Authorization": f"Bearer {token}"}
+
+
+class BrokenRedis:
+    def __init__(self):
+        self.calls = 0
+
+    def register_script(self, script):
+        self.calls += 1
+        raise ConnectionError("redis down")
+
+
+class AsyncBrokenRedis(BrokenRedis):
+    def register_script(self, script):
+        client = self
+
+        class Script:
+            registered_client = client
+
+            async def __call__(self, keys, args):
+                client.calls += 1
+                raise ConnectionError("redis down")
+
+        return Script()
+
+
+class AlwaysAllowRedis:
+    def register_script(self, script):
+        client = self
+
+        class Script:
+            registered_client = client
+
+            def __call__(self, keys, args):
+                return [1, "0"]
+
+        return Script()
+
+
+@pytest.fixture
+def tight_limits(monkeypatch):
+    limits = {"poll": (0.5, 2), "upload": (0.5, 1), "admin": (0.5, 1)}
+    limiter = rate_limit.TokenBucketLimiter(limits=limits)
+    monkeypatch.setattr(rate_limit, "limiter", limiter)
+    return limiter
+
+
+def test_poll_over_burst_gets_429_with_retry_after(client, system_user, tight_limits):
+    headers = auth_header_for(system_user)
+    codes = [
+        client.get("/api/v1/uploads/search", params={"q": "x"}, headers=headers).status_code
+        for _ in range(3)
+    ]
+    assert codes == [200, 200, 429]
+
+    res = client.get("/api/v1/uploads/search", params={"q": "x"}, headers=headers)
+    assert res.status_code == 429
+    assert res.headers["Retry-After"] == "2"
+
+
+def test_buckets_are_per_user_and_per_class(client, system_user, admin_user, tight_limits):
+    user_headers = auth_header_for(system_user)
+    admin_headers = auth_header_for(admin_user)
+
+    assert client.get("/admin/users", headers=admin_headers).status_code == 200
+    assert client.get("/admin/users", headers=admin_headers).status_code == 429
+    # the admin's poll bucket and other users are unaffected
+    res = client.get("/api/v1/uploads/search", params={"q": "x"}, headers=admin_headers)
+    assert res.status_code == 200
+    res = client.get("/api/v1/uploads/search", params={"q": "x"}, headers=user_headers)
+    assert res.status_code == 200
+
+
+def test_falls_back_to_local_buckets_when_redis_fails(tight_limits):
+    tight_limits.redis_client = BrokenRedis()
+
+    results = [tight_limits.take("upload", "user:u1") for _ in range(2)]
+
+    assert [(allowed, store) for allowed, _, store in results] == [
+        (True, "local"),
+        (False, "local"),
+    ]
+    assert results[1][1] == pytest.approx(2, abs=0.1)
+
+
+def test_poll_routes_are_shed_when_the_pool_is_exhausted(
+    client, system_user, tight_limits, monkeypatch
+):
+    monkeypatch.setattr(rate_limit, "_read_pool_exhausted", lambda: True)
+    headers = auth_header_for(system_user)
+
+    res = client.get("/api/v1/uploads/search", params={"q": "x"}, headers=headers)
+    assert res.status_code == 503
+    assert res.headers["Retry-After"] == "1"
+    # writes aren't shed, they queue for a connection as before
+    res = client.delete("/api/v1/uploads/does-not-exist", headers=headers)
+    assert res.status_code == 404
+
+
+def test_redis_breaker_skips_redis_between_retries(tight_limits, capsys):
+    broken = BrokenRedis()
+    tight_limits.redis_client = broken
+    tight_limits.redis_retry = 0.05
+
+    stores = [tight_limits.take("poll", f"user:u{i}")[2] for i in range(5)]
+    assert stores == ["local"] * 5
+    assert broken.calls == 1  # the others didn't wait on Redis
+
+    time.sleep(0.06)
+    tight_limits.take("poll", "user:u9")
+    assert broken.calls == 2  # one probe per retry interval
+
+    tight_limits.redis_client = AlwaysAllowRedis()
+    time.sleep(0.06)
+    assert tight_limits.take("poll", "user:u9")[2] == "redis"
+    assert tight_limits.take("poll", "user:u9")[2] == "redis"
+
+    log = capsys.readouterr().out
+    assert log.count("Redis rate limit error") == 1  # once per state change
+    assert log.count("Redis rate limiting restored") == 1
+
+
+def test_async_limiter_falls_back_and_opens_the_breaker():
+    limiter = rate_limit.AsyncTokenBucketLimiter(
+        redis_client=AsyncBrokenRedis(), limits={"upload": (0.5, 1)}
+    )
+
+    async def burst():
+        return [await limiter.take("upload", "user:u1") for _ in range(3)]
+
+    results = asyncio.run(burst())
+
+    assert [(allowed, store) for allowed, _, store in results] == [
+        (True, "local"),
+        (False, "local"),
+        (False, "local"),
+    ]
+    assert limiter.redis_client.calls == 1
+
+
+def test_poll_shedding_watches_the_replica_pool_while_reads_go_there(monkeypatch):
+    class Pool:
+        def __init__(self, used):
+            self.used = used
+
+        def checkedout(self):
+            return self.used
+
+    class Engine:
+        def __init__(self, used):
+            self.pool = Pool(used)
+
+    class Router:
+        replica_up = True
+
+        def available(self):
+            return self.replica_up
+
+    router = Router()
+    monkeypatch.setattr(rate_limit, "read_router", router)
+    monkeypatch.setattr(rate_limit, "engine", Engine(0))
+    monkeypatch.setattr(rate_limit, "replica_engine", Engine(10_000))
+
+    assert rate_limit._read_pool_exhausted()
+    router.replica_up = False  # reads fall back to the idle primary
+    assert not rate_limit._read_pool_exhausted()
+
+
+def test_clients_behind_a_trusted_proxy_get_their_own_buckets(tight_limits, monkeypatch):
+    from fastapi.testclient import TestClient
+    from file_processing_backend.app import app
+
+    monkeypatch.setattr(rate_limit, "TRUSTED_PROXIES", [ipaddress.ip_network("10.0.0.0/16")])
+    alb = TestClient(app, client=("10.0.3.7", 40000))
+
+    def poll(forwarded_for):
+        return alb.get(
+            "/api/v1/uploads/nope/status", headers={"X-Forwarded-For": forwarded_for}
+        ).status_code
+
+    # a spoofed left-most entry doesn't help: the ALB appends the real address
+    assert [poll("1.1.1.1, 203.0.113.9") for _ in range(3)] == [404, 404, 429]
+    assert poll("2.2.2.2, 203.0.113.9") == 429
+    # another client behind the same ALB has its own bucket
+    assert poll("198.51.100.4") == 404
+
+    # X-Forwarded-For from an untrusted peer is ignored: keyed on the peer
+    direct = TestClient(app, client=("192.0.2.50", 40000))
+    codes = [
+        direct.get(
+            "/api/v1/uploads/nope/status", headers={"X-Forwarded-For": f"198.51.100.{i}"}
+        ).status_code
+        for i in range(3)
+    ]
+    assert codes == [404, 404, 429]
@@ -0,0 +1,90 @@
+# tests/test_replicas.py
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from file_processing_backend.app import Document
+from file_processing_backend.config import Base
+from file_processing_backend.replicas import read_router
+
+
+@pytest.fixture
+def replica(tmp_path, monkeypatch):
+    """An empty replica database (nothing replayed yet) routed to by read_router."""
+    eng = create_engine(f"sqlite:///{tmp_path / 'replica.db'}")
+    Base.metadata.create_all(bind=eng)
+    Session = sessionmaker(bind=eng)
+    monkeypatch.setattr(read_router, "session_factory", Session)
+    monkeypatch.setattr(read_router, "engine", eng)
+    monkeypatch.setattr(read_router, "_down_until", 0.0)
+    monkeypatch.setattr(read_router, "_fresh", True)
+    monkeypatch.setattr(read_router, "_checked_at", float("-inf"))
+    return Session
+
+
+def test_status_falls_back_to_primary_for_rows_not_replayed(client, make_document, replica):
+    doc = make_document("processing")
+
+    resp = client.get(f"/api/v1/uploads/{doc.file_id}/status")
+
+    assert resp.status_code == 200
+    assert resp.json()["status"] == "processing"
+
+
+def test_replica_rows_are_served_from_the_replica(client, make_document, replica):
+    doc = make_document("processing")
+    with replica() as r:
+        r.add(Document(file_id=doc.file_id, user_id=doc.user_id, status="completed",
+                       upload_time=doc.upload_time, file_name="a.pdf"))
+        r.commit()
+
+    resp = client.get(f"/api/v1/uploads/user/{doc.user_id}/history")
+
+    assert resp.status_code == 200
+    assert [d["status"] for d in resp.json()] == ["completed"]
+
+
+def test_lagging_replica_is_skipped(client, make_document, replica, monkeypatch):
+    doc = make_document("processing")
+    monkeypatch.setattr(read_router, "_lag", lambda: read_router.max_lag + 1)
+
+    resp = client.get(f"/api/v1/uploads/user/{doc.user_id}/history")
+
+    assert [d["status"] for d in resp.json()] == ["processing"]
+
+
+def test_replica_errors_fall_back_and_open_the_breaker(
+    client, make_document, replica, monkeypatch
+):
+    doc = make_document("processing")
+    broken = create_engine("sqlite:////nonexistent-dir/replica.db")
+    monkeypatch.setattr(read_router, "session_factory", sessionmaker(bind=broken))
+
+    resp = client.get(f"/api/v1/uploads/user/{doc.user_id}/history")
+
+    assert [d["status"] for d in resp.json()] == ["processing"]
+    assert not read_router.available()
+
+
+def test_replica_reads_are_not_written_to_the_status_cache(
+    client, make_document, replica, fake_redis, monkeypatch
+):
+    from file_processing_backend import app as app_mod
+    from file_processing_backend.status_cache import StatusCache
+
+    monkeypatch.setattr(app_mod, "status_cache", StatusCache(fake_redis))
+    stale, missing = make_document("processing"), make_document("processing")
+    with replica() as r:  # replayed `stale` only
+        r.add(Document(file_id=stale.file_id, user_id=stale.user_id, status="pending",
+                       upload_time=stale.upload_time, file_name="a.pdf"))
+        r.commit()
+
+    assert client.get(f"/api/v1/uploads/{stale.file_id}/status").json()["status"] == "pending"
+    res = client.post("/api/v1/uploads/status:batch", json={"fileIds": [stale.file_id]})
+    assert res.json()["results"][0]["data"]["status"] == "pending"
+    # the lagging row may be older than what the worker wrote through: not cached
+    assert f"status:{stale.file_id}" not in fake_redis.data
+
+    # a row read from the primary (not replayed yet) is
+    assert client.get(f"/api/v1/uploads/{missing.file_id}/status").status_code == 200
+    assert f"status:{missing.file_id}" in fake_redis.data
@@ -0,0 +1,44 @@
+# tests/test_responses.py
+from datetime import datetime
+
+from file_processing_backend.app import Document
+from file_processing_backend.responses import negotiate_encoding
+
+
+def test_negotiate_encoding_respects_q_zero():
+    assert negotiate_encoding("gzip, deflate") == "gzip"
+    assert negotiate_encoding("gzip;q=0, deflate") is None
+    assert negotiate_encoding(None) is None
+
+
+def test_large_history_is_gzipped_small_status_is_not(client, system_user, db_session):
+    db_session.add_all(
+        [
+            Document(
+                file_id=f"cmp-{i:03d}",
+                user_id=system_user.user_id,
+                file_name=f"scan_{i:03d}.pdf",
+                file_type="application/pdf",
+                file_size=1,
+                status="pending",
+                s3_key=f"uploads/cmp-{i}.pdf",
+                upload_time=datetime.utcnow(),
+            )
+            for i in range(60)
+        ]
+    )
+    db_session.commit()
+
+    res = client.get(
+        f"/api/v1/uploads/user/{system_user.user_id}/history",
+        headers={"Accept-Encoding": "gzip"},
+    )
+    assert res.status_code == 200
+    assert res.headers["content-encoding"] == "gzip"
+    assert "accept-encoding" in res.headers["vary"].lower()
+    assert res.headers["etag"].startswith("W/")
+    assert len(res.json()) == 50
+
+    res = client.get("/api/v1/uploads/cmp-000/status", headers={"Accept-Encoding": "gzip"})
+    assert res.status_code == 200
+    assert "content-encoding" not in res.headers
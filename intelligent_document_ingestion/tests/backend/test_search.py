@@ -0,0 +1,102 @@
+# tests/test_search.py
+from datetime import datetime, timedelta
+
+from sqlalchemy.dialects import postgresql
+
+from file_processing_backend import app as app_mod
+from file_processing_backend.user import create_access_token
+
+
+def auth_header_for(user):
+    token = create_access_token({"sub": user.user_id, "role": user.role})
+    return {"Authorization": f"Bearer {token}"}
+
+
+def _processed(make_document, user, name, doc_type, llm, preview="", minutes_ago=0):
+    return make_document(
+        "completed",
+        user_id=user.user_id,
+        file_name=name,
+        s3_key=f"uploads/{name}",
+        upload_time=datetime.utcnow() - timedelta(minutes=minutes_ago),
+        completed_time=datetime.utcnow(),
+        document_type=doc_type,
+        extracted_metadata={"documentType": doc_type, "llmMetadata": llm, "textPreview": preview},
+    )
+
+
+def _seed(make_document, user):
+    return [
+        _processed(make_document, user, "inv-1.pdf", "Invoice", {"supplier": "Acme Corp"},
+                   "Total due 120", 3),
+        _processed(make_document, user, "inv-2.pdf", "Invoice", {"supplier": "Globex"},
+                   "Total due 80", 2),
+        _processed(make_document, user, "physics.pdf", "Question Paper", {"subject": "Physics"},
+                   "Explain quantum tunnelling", 1),
+    ]
+
+
+def test_search_by_document_type_and_field(client, system_user, make_document):
+    inv1, inv2, _ = _seed(make_document, system_user)
+    headers = auth_header_for(system_user)
+
+    res = client.get("/api/v1/uploads/search", params={"documentType": "Invoice"}, headers=headers)
+    assert [d["fileId"] for d in res.json()] == [inv2.file_id, inv1.file_id]
+
+    res = client.get(
+        "/api/v1/uploads/search",
+        params={"documentType": "Invoice", "field": "llmMetadata.supplier=Acme Corp"},
+        headers=headers,
+    )
+    assert [d["fileId"] for d in res.json()] == [inv1.file_id]
+
+
+def test_full_text_covers_preview_and_is_scoped_to_the_user(
+    client, system_user, admin_user, make_document
+):
+    _, _, paper = _seed(make_document, system_user)
+    _processed(make_document, admin_user, "other.pdf", "Question Paper", {}, "quantum things")
+
+    res = client.get(
+        "/api/v1/uploads/search", params={"q": "Quantum"}, headers=auth_header_for(system_user)
+    )
+
+    assert [d["fileId"] for d in res.json()] == [paper.file_id]
+    assert res.json()[0]["documentType"] == "Question Paper"
+
+
+def test_search_pages_with_cursor_and_etag(client, system_user, make_document):
+    inv1, inv2, _ = _seed(make_document, system_user)
+    headers = auth_header_for(system_user)
+    params = {"q": "total", "limit": 1}
+
+    first = client.get("/api/v1/uploads/search", params=params, headers=headers)
+    cursor = first.headers["X-Next-Cursor"]
+    second = client.get("/api/v1/uploads/search", params={**params, "cursor": cursor}, headers=headers)
+    assert [d["fileId"] for d in first.json() + second.json()] == [inv2.file_id, inv1.file_id]
+
+    again = client.get(
+        "/api/v1/uploads/search",
+        params=params,
+        headers={**headers, "If-None-Match": first.headers["ETag"]},
+    )
+    assert again.status_code == 304
+
+
+def test_search_needs_a_criterion_and_valid_fields(client, system_user):
+    headers = auth_header_for(system_user)
+    assert client.get("/api/v1/uploads/search", headers=headers).status_code == 400
+    res = client.get("/api/v1/uploads/search", params={"field": "nokey"}, headers=headers)
+    assert res.status_code == 400
+
+
+def test_postgres_filters_use_the_gin_indexed_forms():
+    dialect = postgresql.dialect()
+    text_sql = str(app_mod._text_filter("acme invoice", "postgresql").compile(dialect=dialect))
+    assert "search_vector @@ websearch_to_tsquery('simple'::regconfig" in text_sql
+
+    field_sql = str(
+        app_mod._metadata_field_filter(["llmMetadata", "supplier"], "Acme", "postgresql")
+        .compile(dialect=dialect)
+    )
+    assert "documents.extracted_metadata @>" in field_sql
@@ -0,0 +1,122 @@
+# tests/test_sqs_publisher.py
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from file_processing_backend import app as app_mod
+from file_processing_backend.sqs_publisher import (
+    SqsBatchPublisher,
+    SqsPublishError,
+    SqsPublishTimeout,
+)
+
+
+class FlakySQS:
+    """Fails the first attempt of every body listed in `flaky`."""
+
+    def __init__(self, flaky=(), sender_fault=()):
+        self.flaky = set(flaky)
+        self.sender_fault = set(sender_fault)
+        self.calls = []
+        self.lock = threading.Lock()
+
+    def send_message_batch(self, QueueUrl, Entries):
+        with self.lock:
+            self.calls.append([e["MessageBody"] for e in Entries])
+        ok, failed = [], []
+        for e in Entries:
+            body = e["MessageBody"]
+            if body in self.sender_fault:
+                failed.append({"Id": e["Id"], "SenderFault": True, "Code": "Invalid", "Message": "bad"})
+            elif body in self.flaky:
+                self.flaky.discard(body)
+                failed.append({"Id": e["Id"], "SenderFault": False, "Code": "InternalError", "Message": "x"})
+            else:
+                ok.append({"Id": e["Id"], "MessageId": f"id-{body}"})
+        return {"Successful": ok, "Failed": failed}
+
+
+def _publisher(sqs, **kwargs):
+    return SqsBatchPublisher(lambda: sqs, lambda: "https://queue", **kwargs)
+
+
+def test_concurrent_sends_are_coalesced():
+    sqs = FlakySQS()
+    pub = _publisher(sqs, max_latency_ms=50)
+
+    with ThreadPoolExecutor(max_workers=25) as pool:
+        ids = list(pool.map(lambda i: pub.send(f"m{i}"), range(25)))
+
+    assert ids == [f"id-m{i}" for i in range(25)]
+    assert all(len(batch) <= 10 for batch in sqs.calls)
+    assert len(sqs.calls) < 25
+
+
+def test_partial_failures_are_retried_per_entry():
+    sqs = FlakySQS(flaky={"b"})
+    pub = _publisher(sqs, max_latency_ms=20)
+
+    futures = [pub.publish(body) for body in ("a", "b", "c")]
+    assert [f.result(timeout=5) for f in futures] == ["id-a", "id-b", "id-c"]
+    # only the failed entry went out again
+    assert sqs.calls[-1] == ["b"]
+
+
+def test_sender_faults_are_not_retried():
+    sqs = FlakySQS(sender_fault={"bad"})
+    pub = _publisher(sqs)
+
+    with pytest.raises(SqsPublishError):
+        pub.send("bad", timeout=5)
+    assert sum(batch.count("bad") for batch in sqs.calls) == 1
+
+
+class StalledSQS(FlakySQS):
+    """Holds every batch call until `release` is set."""
+
+    def __init__(self):
+        super().__init__()
+        self.release = threading.Event()
+
+    def send_message_batch(self, QueueUrl, Entries):
+        self.release.wait(5)
+        return super().send_message_batch(QueueUrl, Entries)
+
+
+def test_a_timed_out_send_is_only_reported_unsent_if_it_never_went_out():
+    sqs = StalledSQS()
+    pub = _publisher(sqs)
+    try:
+        # in the stalled batch call: SQS may still take it
+        with pytest.raises(SqsPublishTimeout):
+            pub.send("in-flight", timeout=0.2)
+        # queued behind it: cancelled, so it never goes out
+        with pytest.raises(SqsPublishError) as err:
+            pub.send("queued", timeout=0.05)
+        assert not isinstance(err.value, SqsPublishTimeout)
+    finally:
+        sqs.release.set()
+
+    assert pub.send("next", timeout=5) == "id-next"
+    sent = [body for batch in sqs.calls for body in batch]
+    assert sent == ["in-flight", "next"]
+
+
+def test_upload_complete_treats_an_unconfirmed_send_as_queued(
+    client, system_user, db_session, make_document, monkeypatch
+):
+    class Unconfirmed:
+        def send(self, message):
+            raise SqsPublishTimeout("no answer from SQS within 10s")
+
+    monkeypatch.setattr(app_mod, "sqs_publisher", Unconfirmed())
+    doc = make_document("uploaded", user_id=system_user.user_id)
+
+    res = client.post("/api/v1/uploads/complete", json={"fileId": doc.file_id})
+
+    assert res.status_code == 200
+    db_session.refresh(doc)
+    assert (doc.status, doc.error) == ("processing", None)
+    # and a client retrying the request does not queue a second job
+    assert client.post("/api/v1/uploads/complete", json={"fileId": doc.file_id}).status_code == 409
@@ -0,0 +1,120 @@
+# tests/test_status_cache.py
+import asyncio
+import threading
+import time
+from datetime import datetime
+
+import pytest
+
+from file_processing_backend import app as app_mod
+from file_processing_backend.presign_cache import PresignedUrlCache
+from file_processing_backend.status_cache import (
+    AsyncStatusCache,
+    StatusCache,
+    status_entry,
+    ttl_for,
+)
+
+
+def test_concurrent_misses_share_one_load(fake_redis):
+    cache = StatusCache(fake_redis)
+    calls = []
+
+    def loader():
+        calls.append(1)
+        time.sleep(0.1)
+        return {"fileId": "f-1", "status": "processing"}
+
+    results = []
+    threads = [
+        threading.Thread(target=lambda: results.append(cache.load("f-1", loader)))
+        for _ in range(10)
+    ]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    assert len(calls) == 1
+    assert all(r["status"] == "processing" for r in results)
+    assert cache.get("f-1")["status"] == "processing"
+
+
+def test_unknown_file_is_negatively_cached(client, fake_redis, monkeypatch):
+    monkeypatch.setattr(app_mod, "status_cache", StatusCache(fake_redis))
+
+    assert client.get("/api/v1/uploads/nope/status").status_code == 404
+    assert fake_redis.data["status:nope"] == "__missing__"
+    assert app_mod.status_cache.get("nope") is None  # negative hit, not MISS
+
+    # later lookups answer 404 without loading from the DB
+    monkeypatch.setattr(app_mod, "_load_status_entry", lambda db, fid: 1 / 0)
+    assert client.get("/api/v1/uploads/nope/status").status_code == 404
+
+
+def test_transitions_write_through(
+    client, system_user, make_document, fake_redis, fake_sqs, monkeypatch
+):
+    monkeypatch.setattr(app_mod, "status_cache", StatusCache(fake_redis))
+    make_document("failed", file_id="wt-1", user_id=system_user.user_id)
+    assert client.post("/api/v1/uploads/wt-1/retry").status_code == 200
+
+    monkeypatch.setattr(app_mod, "_load_status_entry", lambda db, fid: 1 / 0)
+    res = client.get("/api/v1/uploads/wt-1/status")
+    assert res.status_code == 200
+    assert res.json()["status"] == "pending"
+
+    monkeypatch.setattr(app_mod.s3_client, "delete_object", lambda Bucket, Key: None)
+    assert client.delete("/api/v1/uploads/wt-1").status_code == 200
+    assert fake_redis.data["status:wt-1"] == "__missing__"
+    assert client.get("/api/v1/uploads/wt-1/status").status_code == 404
+
+
+def test_worker_entries_follow_the_presign_cache(
+    client, system_user, make_document, monkeypatch
+):
+    # the worker builds its entries with status_entry and its own PresignedUrlCache
+    urls = PresignedUrlCache(
+        lambda **kwargs: f"https://s3.example/{kwargs['Params']['Key']}",
+        expires_in=600,
+        safety_margin=240,
+    )
+    monkeypatch.setattr(app_mod, "presigned_urls", urls)
+    doc = make_document(
+        "completed",
+        file_id="wk-1",
+        user_id=system_user.user_id,
+        completed_time=datetime.utcnow(),
+    )
+
+    entry = status_entry(doc, urls, "test-bucket")
+    expires_at = datetime.fromisoformat(entry["downloadUrlExpiresAt"])
+    assert 590 < (expires_at - datetime.utcnow()).total_seconds() <= 600
+    # expires before the URL's safety margin, not after STATUS_CACHE_FINAL_TTL
+    assert ttl_for(entry) <= 600 - 240
+
+    res = client.get("/api/v1/uploads/wk-1/status")
+    assert res.headers["etag"] == entry["etag"]
+    assert res.json() == {k: v for k, v in entry.items() if k != "etag"}
+
+
+def test_followers_survive_a_cancelled_leader():
+    cache = AsyncStatusCache()
+
+    async def run():
+        async def stuck():
+            await asyncio.sleep(60)
+
+        async def load():
+            return {"fileId": "f-1", "status": "completed"}
+
+        leader = asyncio.create_task(cache.load("f-1", stuck))
+        await asyncio.sleep(0)
+        follower = asyncio.create_task(cache.load("f-1", load))
+        await asyncio.sleep(0)
+        leader.cancel()  # e.g. its client disconnected
+        with pytest.raises(asyncio.CancelledError):
+            await leader
+        return await follower
+
+    assert asyncio.run(run()) == {"fileId": "f-1", "status": "completed"}
@@ -0,0 +1,104 @@
+# tests/test_status_events.py
+import asyncio
+import json
+from datetime import datetime
+
+from file_processing_backend import app as app_mod
+from file_processing_backend.events import StatusEventBus
+
+
+def _parse_sse(text):
+    events = []
+    for block in text.strip().split("\n\n"):
+        lines = dict(
+            line.split(": ", 1) for line in block.splitlines() if not line.startswith(":")
+        )
+        if "event" in lines:
+            events.append((lines["event"], json.loads(lines["data"])))
+    return events
+
+
+def test_local_bus_delivers_published_events():
+    bus = StatusEventBus()
+
+    async def run():
+        async with bus.subscribe(["f-1"]) as sub:
+            bus.publish("f-2", "completed")  # not subscribed
+            bus.publish("f-1", "processing")
+            return await sub.get(timeout=1)
+
+    event = asyncio.run(run())
+    assert event == {"fileId": "f-1", "status": "processing"}
+
+
+def test_stream_ends_for_terminal_and_unknown_files(client, system_user, make_document):
+    make_document(
+        "failed",
+        file_id="sse-1",
+        user_id=system_user.user_id,
+        file_name="done.pdf",
+        error="boom",
+    )
+
+    res = client.get("/api/v1/uploads/status/stream?fileIds=sse-1,missing")
+    assert res.status_code == 200
+    assert res.headers["content-type"].startswith("text/event-stream")
+
+    events = _parse_sse(res.text)
+    assert ("notfound", {"fileId": "missing"}) in events
+    status_events = [data for name, data in events if name == "status"]
+    assert status_events[0]["fileId"] == "sse-1"
+    assert status_events[0]["status"] == "failed"
+    assert status_events[0]["error"] == "boom"
+
+
+def test_stream_requires_file_ids(client):
+    res = client.get("/api/v1/uploads/status/stream?fileIds=,")
+    assert res.status_code == 400
+
+
+class DroppingPubSub:
+    """Subscribes fine, then the connection drops on the first read."""
+
+    def __init__(self, on_drop):
+        self.on_drop = on_drop
+
+    async def subscribe(self, *channels):
+        pass
+
+    async def get_message(self, ignore_subscribe_messages=True, timeout=None):
+        self.on_drop()
+        raise ConnectionError("Connection reset by peer")
+
+    async def unsubscribe(self):
+        raise ConnectionError("Connection reset by peer")
+
+    async def aclose(self):
+        pass
+
+
+def test_stream_falls_back_to_polling_when_pubsub_drops(
+    client, system_user, db_session, make_document, monkeypatch
+):
+    doc = make_document("processing", file_id="sse-drop", user_id=system_user.user_id)
+
+    def worker_finishes():
+        # the worker's publish is lost along with the connection
+        doc.status = "completed"
+        doc.completed_time = datetime.utcnow()
+        db_session.commit()
+
+    class FakeAsyncRedis:
+        def pubsub(self):
+            return DroppingPubSub(worker_finishes)
+
+    bus = StatusEventBus(redis_client=object())
+    bus._async_redis = FakeAsyncRedis()
+    monkeypatch.setattr(app_mod, "status_events", bus)
+    monkeypatch.setattr(app_mod, "STREAM_FALLBACK_POLL_SECONDS", 0.05)
+
+    res = client.get("/api/v1/uploads/status/stream?fileIds=sse-drop")
+
+    assert res.status_code == 200
+    statuses = [data["status"] for name, data in _parse_sse(res.text) if name == "status"]
+    assert statuses == ["processing", "completed"]
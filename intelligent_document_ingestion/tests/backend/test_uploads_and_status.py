@@ -10,15 +10,6 @@ def auth_header_for(user):
     return {"Authorization": f"Bearer {token}"}
 
 
-class DummySQS:
-    def __init__(self):
-        self.messages = []
-
-    def send_message(self, QueueUrl, MessageBody):
-        self.messages.append({"QueueUrl": QueueUrl, "Body": MessageBody})
-        return {"MessageId": "msg-1"}
-
-
 def test_request_upload_creates_doc_and_presign(
     client, system_user, db_session, monkeypatch
 ):
@@ -54,7 +45,7 @@ def test_request_upload_creates_doc_and_presign(
 
 
 def test_upload_complete_sets_processing_and_sends_sqs(
-    client, system_user, db_session, monkeypatch
+    client, system_user, db_session, fake_sqs
 ):
     headers = auth_header_for(system_user)
 
@@ -72,10 +63,6 @@ def test_upload_complete_sets_processing_and_sends_sqs(
     db_session.add(doc)
     db_session.commit()
 
-    # fake SQS
-    from file_processing_backend import app as app_mod
-    dummy_sqs = DummySQS()
-    monkeypatch.setattr(app_mod, "sqs", dummy_sqs)
 
     res = client.post(
         "/api/v1/uploads/complete",
@@ -89,8 +76,8 @@ def test_upload_complete_sets_processing_and_sends_sqs(
     assert doc.status == "processing"
 
     # SQS message captured
-    assert len(dummy_sqs.messages) == 1
-    msg = json.loads(dummy_sqs.messages[0]["Body"])
+    assert len(fake_sqs.messages) == 1
+    msg = json.loads(fake_sqs.messages[0]["Body"])
     assert msg["fileId"] == "file-123"
 
 
@@ -189,7 +176,7 @@ def test_download_endpoint(client, system_user, db_session, monkeypatch):
     assert res.json()["downloadUrl"] == "https://fake-download-url"
 
 
-def test_retry_endpoint(client, system_user, db_session, monkeypatch):
+def test_retry_endpoint(client, system_user, db_session, fake_sqs):
     # doc with failed status
     doc = Document(
         file_id="r1",
@@ -205,10 +192,6 @@ def test_retry_endpoint(client, system_user, db_session, monkeypatch):
     db_session.add(doc)
     db_session.commit()
 
-    # fake SQS send
-    from file_processing_backend import app as app_mod
-    dummy_sqs = DummySQS()
-    monkeypatch.setattr(app_mod, "sqs", dummy_sqs)
 
     res = client.post(f"/api/v1/uploads/{doc.file_id}/retry")
     assert res.status_code == 200
@@ -217,4 +200,197 @@ def test_retry_endpoint(client, system_user, db_session, monkeypatch):
     db_session.refresh(doc)
     assert doc.status == "pending"
     assert doc.error is None
-    assert len(dummy_sqs.messages) == 1
+    assert len(fake_sqs.messages) == 1
+
+
+def test_batch_status_reports_missing_inline(
+    client, system_user, db_session, monkeypatch
+):
+    docs = [
+        Document(
+            file_id=f"b{i}",
+            user_id=system_user.user_id,
+            file_name=f"b{i}.pdf",
+            file_type="application/pdf",
+            file_size=1,
+            status="pending",
+            s3_key=f"uploads/b{i}.pdf",
+            upload_time=datetime.utcnow(),
+        )
+        for i in range(3)
+    ]
+    db_session.add_all(docs)
+    db_session.commit()
+
+    res = client.post(
+        "/api/v1/uploads/status:batch",
+        json={"fileIds": ["b2", "nope", "b0", "b1", "b0"]},
+    )
+    assert res.status_code == 200
+    results = res.json()["results"]
+
+    # request order kept, duplicates collapsed
+    assert [r["fileId"] for r in results] == ["b2", "nope", "b0", "b1"]
+    assert results[1]["code"] == 404
+    assert results[1]["data"] is None
+    assert all(r["code"] == 200 for r in results if r["fileId"] != "nope")
+    assert results[0]["data"]["status"] == "pending"
+
+
+def test_batch_status_rejects_oversized_batches(client, monkeypatch):
+    from file_processing_backend import app as app_mod
+    monkeypatch.setattr(app_mod, "MAX_BATCH_STATUS_IDS", 2)
+
+    res = client.post(
+        "/api/v1/uploads/status:batch", json={"fileIds": ["a", "b", "c"]}
+    )
+    assert res.status_code == 400
+
+
+def test_history_keyset_pagination(client, system_user, db_session):
+    from datetime import timedelta
+
+    headers = auth_header_for(system_user)
+    base = datetime(2025, 1, 1)
+    # two docs share an upload_time to exercise the file_id tie-breaker
+    times = [base, base, base + timedelta(minutes=1), base + timedelta(minutes=2), base + timedelta(minutes=3)]
+    db_session.add_all(
+        [
+            Document(
+                file_id=f"p{i}",
+                user_id=system_user.user_id,
+                file_name=f"p{i}.pdf",
+                file_type="application/pdf",
+                file_size=1,
+                status="pending",
+                s3_key=f"uploads/p{i}.pdf",
+                upload_time=t,
+                extracted_metadata={"big": "x" * 1000},
+            )
+            for i, t in enumerate(times)
+        ]
+    )
+    db_session.commit()
+
+    seen, cursor = [], None
+    while True:
+        params = {"limit": 2}
+        if cursor:
+            params["cursor"] = cursor
+        res = client.get(
+            f"/api/v1/uploads/user/{system_user.user_id}", params=params, headers=headers
+        )
+        assert res.status_code == 200
+        page = res.json()
+        assert len(page) <= 2
+        assert "metadata" not in page[0]
+        seen.extend(d["fileId"] for d in page)
+        cursor = res.headers.get("X-Next-Cursor")
+        if not cursor:
+            break
+
+    assert seen == ["p4", "p3", "p2", "p1", "p0"]
+
+
+def test_history_rejects_bad_cursor(client, system_user):
+    res = client.get(
+        f"/api/v1/uploads/user/{system_user.user_id}/history", params={"cursor": "???"}
+    )
+    assert res.status_code == 400
+
+
+def test_batch_upload_request_isolates_presign_failures(
+    client, system_user, db_session, monkeypatch
+):
+    headers = auth_header_for(system_user)
+
+    import file_processing_backend.config as cfg
+
+    def fake_presign(ClientMethod, Params, HttpMethod, ExpiresIn):
+        if Params["Key"].endswith(".png"):
+            raise RuntimeError("signing failed")
+        return "https://fake-presigned-url/" + Params["Key"]
+
+    monkeypatch.setattr(cfg.s3_client, "generate_presigned_url", fake_presign)
+
+    files = [
+        {"userId": system_user.user_id, "fileName": "a.pdf", "fileSize": 1, "fileType": "application/pdf"},
+        {"userId": system_user.user_id, "fileName": "b.png", "fileSize": 1, "fileType": "image/png"},
+        {"userId": system_user.user_id, "fileName": "c.csv", "fileSize": 1, "fileType": "text/csv"},
+    ]
+    res = client.post("/api/v1/uploads/request:batch", json={"files": files}, headers=headers)
+    assert res.status_code == 200
+    results = res.json()["results"]
+    assert [r["code"] for r in results] == [200, 500, 200]
+
+    ok_ids = [r["data"]["fileId"] for r in results if r["code"] == 200]
+    docs = db_session.query(Document).filter(Document.user_id == system_user.user_id).all()
+    assert sorted(d.file_id for d in docs) == sorted(ok_ids)
+
+
+def test_batch_upload_request_rejects_invalid_entries(client, system_user, db_session):
+    headers = auth_header_for(system_user)
+    files = [
+        {"userId": system_user.user_id, "fileName": "a.pdf", "fileSize": 1, "fileType": "application/pdf"},
+        {"userId": system_user.user_id, "fileName": "x.exe", "fileSize": 1, "fileType": "application/x-msdownload"},
+    ]
+    res = client.post("/api/v1/uploads/request:batch", json={"files": files}, headers=headers)
+    assert res.status_code == 400
+    assert res.json()["detail"][0]["index"] == 1
+    assert db_session.query(Document).filter(Document.user_id == system_user.user_id).count() == 0
+
+
+def test_status_etag_and_not_modified(client, system_user, db_session, fake_sqs):
+    doc = Document(
+        file_id="etag-1",
+        user_id=system_user.user_id,
+        file_name="e.pdf",
+        file_type="application/pdf",
+        file_size=1,
+        status="failed",
+        s3_key="uploads/e.pdf",
+        upload_time=datetime.utcnow(),
+    )
+    db_session.add(doc)
+    db_session.commit()
+
+    res = client.get("/api/v1/uploads/etag-1/status")
+    etag = res.headers["ETag"]
+
+    res = client.get("/api/v1/uploads/etag-1/status", headers={"If-None-Match": etag})
+    assert res.status_code == 304
+    assert res.content == b""
+
+    client.post("/api/v1/uploads/etag-1/retry")
+
+    res = client.get("/api/v1/uploads/etag-1/status", headers={"If-None-Match": etag})
+    assert res.status_code == 200
+    assert res.json()["status"] == "pending"
+    assert res.headers["ETag"] != etag
+
+
+def test_history_not_modified_until_a_row_changes(client, system_user, db_session):
+    headers = auth_header_for(system_user)
+    doc = Document(
+        file_id="etag-h1",
+        user_id=system_user.user_id,
+        file_name="h.pdf",
+        file_type="application/pdf",
+        file_size=1,
+        status="pending",
+        s3_key="uploads/h.pdf",
+        upload_time=datetime.utcnow(),
+    )
+    db_session.add(doc)
+    db_session.commit()
+
+    url = f"/api/v1/uploads/user/{system_user.user_id}"
+    etag = client.get(url, headers=headers).headers["ETag"]
+    res = client.get(url, headers={**headers, "If-None-Match": etag})
+    assert res.status_code == 304
+
+    doc.status = "completed"
+    db_session.commit()
+    res = client.get(url, headers={**headers, "If-None-Match": etag})
+    assert res.status_code == 200
+    assert res.json()[0]["status"] == "completed"
@@ -0,0 +1,77 @@
+# tests/test_user_cache.py
+import time
+
+from file_processing_backend import user as user_mod
+from file_processing_backend.user import User, UserCache, create_access_token
+
+
+def auth_header_for(user):
+    token = create_access_token({"sub": user.user_id, "role": user.role})
+    return {"Authorization": f"Bearer {token}"}
+
+
+def test_cache_expires_and_evicts_lru():
+    cache = UserCache(ttl=0.05, maxsize=2)
+    for uid in ("a", "b"):
+        cache.put(User(user_id=uid, username=uid, role="system"))
+
+    assert cache.get("a").username == "a"  # "a" is now most recent
+    cache.put(User(user_id="c", username="c", role="system"))
+    assert cache.get("b") is None
+    assert cache.get("a") is not None
+
+    time.sleep(0.06)
+    assert cache.get("a") is None
+
+
+def test_cached_user_skips_db_until_invalidated(
+    client, admin_user, system_user, db_session, monkeypatch
+):
+    monkeypatch.setattr(user_mod, "AUTH_USER_MODE", "cache")
+    user_mod.user_cache.clear()
+    headers = auth_header_for(system_user)
+
+    res = client.get(f"/api/v1/uploads/user/{system_user.user_id}", headers=headers)
+    assert res.status_code == 200
+    assert user_mod.user_cache.get(system_user.user_id) is not None
+
+    # admin demotion/changes must drop the cached copy right away
+    res = client.put(
+        f"/admin/users/{system_user.user_id}",
+        json={"username": "renamed"},
+        headers=auth_header_for(admin_user),
+    )
+    assert res.status_code == 200
+    assert user_mod.user_cache.get(system_user.user_id) is None
+
+
+def test_deleted_user_is_rejected_in_cache_mode(
+    client, admin_user, db_session, monkeypatch
+):
+    monkeypatch.setattr(user_mod, "AUTH_USER_MODE", "cache")
+    headers = auth_header_for(admin_user)
+    res = client.post(
+        "/admin/users",
+        json={"username": "shortlived", "password": "x", "role": "system"},
+        headers=headers,
+    )
+    victim_id = res.json()["userId"]
+    victim_headers = {
+        "Authorization": "Bearer "
+        + create_access_token({"sub": victim_id, "role": "system"})
+    }
+    assert client.get("/api/v1/uploads/user/x", headers=victim_headers).status_code == 200
+
+    client.delete(f"/admin/users/{victim_id}", headers=headers)
+    assert client.get("/api/v1/uploads/user/x", headers=victim_headers).status_code == 401
+
+
+def test_claims_mode_trusts_token(client, monkeypatch):
+    monkeypatch.setattr(user_mod, "AUTH_USER_MODE", "claims")
+    headers = {
+        "Authorization": "Bearer "
+        + create_access_token({"sub": "not-in-db", "role": "system"})
+    }
+    res = client.get("/api/v1/uploads/user/not-in-db", headers=headers)
+    assert res.status_code == 200
+    assert res.json() == []
@@ -0,0 +1,91 @@
+# tests/test_consumer.py
+import threading
+import time
+
+from consumer import SqsConsumer
+
+
+class FakeSQS:
+    def __init__(self, bodies):
+        self._lock = threading.Lock()
+        self.queue = [
+            {"MessageId": str(i), "ReceiptHandle": f"rh-{i}", "Body": b}
+            for i, b in enumerate(bodies)
+        ]
+        self.deleted = []
+        self.requested = []
+
+    def receive_message(self, QueueUrl, MaxNumberOfMessages, WaitTimeSeconds):
+        with self._lock:
+            self.requested.append(MaxNumberOfMessages)
+            batch = self.queue[:MaxNumberOfMessages]
+            del self.queue[:MaxNumberOfMessages]
+        if not batch:
+            time.sleep(0.01)  # long poll on an empty queue
+        return {"Messages": batch}
+
+    def delete_message(self, QueueUrl, ReceiptHandle):
+        with self._lock:
+            self.deleted.append(ReceiptHandle)
+
+
+def _start(consumer):
+    t = threading.Thread(target=consumer.run, daemon=True)
+    t.start()
+    return t
+
+
+def _wait_for(cond, timeout=5):
+    deadline = time.monotonic() + timeout
+    while not cond():
+        assert time.monotonic() < deadline, "timed out"
+        time.sleep(0.005)
+
+
+def test_slow_message_does_not_stall_the_others():
+    release = threading.Event()
+    done = []
+
+    def handler(msg):
+        if msg["Body"] == "slow":
+            release.wait(5)
+        done.append(msg["Body"])
+
+    sqs = FakeSQS(["slow"] + [f"fast-{i}" for i in range(20)])
+    consumer = SqsConsumer(sqs, "q", handler, threads=2, prefetch=1, wait_seconds=0)
+    t = _start(consumer)
+
+    # every fast message gets through while "slow" still holds its thread
+    _wait_for(lambda: len(done) == 20)
+    assert "slow" not in done
+
+    release.set()
+    _wait_for(lambda: len(sqs.deleted) == 21)
+    consumer.stop()
+    t.join(5)
+    assert not t.is_alive()
+    # never asked for more than the free slots
+    assert max(sqs.requested) <= 3
+
+
+def test_failed_messages_are_not_deleted_and_stop_drains_in_flight():
+    started = threading.Event()
+    release = threading.Event()
+
+    def handler(msg):
+        if msg["Body"] == "bad":
+            raise ValueError("boom")
+        started.set()
+        release.wait(5)
+
+    sqs = FakeSQS(["bad", "good"])
+    consumer = SqsConsumer(sqs, "q", handler, threads=1, wait_seconds=0)
+    t = _start(consumer)
+    started.wait(5)
+
+    consumer.stop()
+    release.set()
+    t.join(5)
+
+    assert sqs.deleted == ["rh-1"]
+    assert (consumer.processed, consumer.failed, consumer.in_flight) == (1, 1, 0)
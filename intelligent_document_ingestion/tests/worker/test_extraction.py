@@ -0,0 +1,130 @@
+# tests/test_extraction.py
+import os
+import signal
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+import pytest
+
+import extraction
+from extraction import ExtractionPool, extract_file
+
+
+@pytest.fixture
+def pool():
+    p = ExtractionPool(2)
+    yield p
+    p.shutdown()
+
+
+def _csv(tmp_path):
+    path = tmp_path / "rows.csv"
+    path.write_text("id,supplier\n1,Acme\n2,Globex\n")
+    return str(path)
+
+
+def test_pool_matches_in_process_extraction(pool, tmp_path):
+    path = _csv(tmp_path)
+
+    pids = pool.start()
+
+    assert os.getpid() not in pids
+    assert pool.run(path, "text/csv") == extract_file(path, "text/csv")
+    assert pool.run(path, "application/zip")["text"] == "Unsupported format"
+
+
+def _kill_all(pids):
+    # every process, so no job can still finish on the old pool
+    for pid in pids:
+        os.kill(pid, signal.SIGKILL)
+
+
+def crash_on_poison(file_path, file_type):
+    if file_path.endswith("poison"):
+        os._exit(1)  # a parser segfault, as far as the pool can tell
+    return extract_file(file_path, file_type)
+
+
+def test_jobs_caught_by_a_dead_process_are_retried_on_a_new_pool(pool, tmp_path):
+    path = _csv(tmp_path)
+    _kill_all(pool.start())
+
+    assert pool.run(path, "text/csv")["columns"] == ["id", "supplier"]
+    assert pool.restarts == 1
+
+
+def test_a_job_that_breaks_the_pool_twice_fails(pool, tmp_path, monkeypatch):
+    monkeypatch.setattr(extraction, "extract_file", crash_on_poison)
+    pool.start()
+
+    with pytest.raises(BrokenProcessPool):
+        pool.run(str(tmp_path / "poison"), "text/csv")
+    assert pool.restarts == 2
+    assert pool.run(_csv(tmp_path), "text/csv")["columns"] == ["id", "supplier"]
+
+
+def _dead(pid, wait=5.0):
+    # killed children may linger as zombies until the executor reaps them
+    deadline = time.monotonic() + wait
+    while time.monotonic() < deadline:
+        try:
+            with open(f"/proc/{pid}/stat") as f:
+                if f.read().rsplit(")", 1)[1].split()[0] == "Z":
+                    return True
+        except FileNotFoundError:
+            return True
+        time.sleep(0.05)
+    return False
+
+
+def test_hung_extraction_times_out_and_frees_its_process(tmp_path):
+    stuck = str(tmp_path / "stuck.csv")
+    os.mkfifo(stuck)  # reading blocks until a writer shows up, i.e. forever
+    pool = ExtractionPool(1, timeout=0.5)
+    try:
+        [pid] = pool.start()
+        with pytest.raises(TimeoutError):
+            pool.run(stuck, "text/csv")
+        assert _dead(pid)
+        # the only process was stuck; it has been killed and replaced
+        assert pool.run(_csv(tmp_path), "text/csv")["columns"] == ["id", "supplier"]
+    finally:
+        pool.shutdown()
+
+
+def test_restart_forks_from_a_consumer_thread_while_others_hold_locks(pool, tmp_path):
+    path = _csv(tmp_path)
+    _kill_all(pool.start())
+    held, release = threading.Lock(), threading.Event()
+
+    def busy():
+        with held:
+            release.wait(5)
+
+    other = threading.Thread(target=busy)
+    other.start()
+    try:
+        with ThreadPoolExecutor(4) as consumers:
+            results = list(consumers.map(lambda _: pool.run(path, "text/csv"), range(8)))
+    finally:
+        release.set()
+        other.join()
+
+    assert all(r["columns"] == ["id", "supplier"] for r in results)
+    assert pool.restarts == 1
+
+
+def test_run_extraction_uses_the_pool_only_in_process_mode(monkeypatch, tmp_path):
+    path = _csv(tmp_path)
+    calls = []
+    monkeypatch.setattr(extraction.pool, "run", lambda *args: calls.append(args) or {})
+
+    monkeypatch.setattr(extraction, "EXTRACTION_MODE", "thread")
+    extraction.run_extraction(path, "text/csv")
+    assert calls == []
+
+    monkeypatch.setattr(extraction, "EXTRACTION_MODE", "process")
+    extraction.run_extraction(path, "text/csv")
+    assert calls == [(path, "text/csv")]
@@ -0,0 +1,157 @@
+# tests/test_pipeline.py
+import asyncio
+import threading
+import time
+
+from pipeline import Pipeline, Stage, run_inline
+
+
+class FakeQueue:
+    def __init__(self, bodies):
+        self._lock = threading.Lock()
+        self.messages = [{"ReceiptHandle": f"rh-{b}", "Body": b} for b in bodies]
+        self.received = 0
+
+    def receive(self, n):
+        with self._lock:
+            batch, self.messages = self.messages[:n], self.messages[n:]
+            self.received += len(batch)
+        if not batch:
+            time.sleep(0.01)  # long poll on an empty queue
+        return batch
+
+
+class Tracker:
+    """Stage fn that records its peak concurrency."""
+
+    def __init__(self, seconds=0.0, gate=None):
+        self.seconds = seconds
+        self.gate = gate
+        self._lock = threading.Lock()
+        self.active = self.peak = 0
+
+    def __call__(self, job):
+        with self._lock:
+            self.active += 1
+            self.peak = max(self.peak, self.active)
+        try:
+            if self.gate is not None:
+                self.gate.wait(5)
+            time.sleep(self.seconds)
+        finally:
+            with self._lock:
+                self.active -= 1
+
+
+def _make_job(msg):
+    return {"message": msg, "body": msg["Body"]}
+
+
+async def _run_until(pipeline, cond, during=None, timeout=5):
+    task = asyncio.create_task(pipeline.run())
+    deadline = time.monotonic() + timeout
+    while not cond():
+        if during:
+            during()
+        assert time.monotonic() < deadline, "timed out"
+        await asyncio.sleep(0.005)
+    pipeline.stop()
+    await asyncio.wait_for(task, timeout)
+
+
+def test_stages_respect_their_concurrency_limits():
+    io, cpu = Tracker(0.02), Tracker(0.01)
+    finished = []
+    queue = FakeQueue([str(i) for i in range(20)])
+    pipeline = Pipeline(
+        [Stage("io", io, 6), Stage("cpu", cpu, 2)],
+        queue.receive,
+        _make_job,
+        finished.append,
+        queue_size=2,
+        stats_interval=0,
+    )
+
+    asyncio.run(_run_until(pipeline, lambda: len(finished) == 20))
+
+    assert io.peak > 2  # downloads overlap
+    assert io.peak <= 6 and cpu.peak <= 2
+    stats = pipeline.stats()
+    assert [s["processed"] for s in stats["stages"]] == [20, 20]
+    assert stats["inFlight"] == 0
+
+
+def test_a_saturated_stage_stops_the_poller():
+    gate = threading.Event()
+    finished = []
+    queue = FakeQueue([str(i) for i in range(50)])
+    pipeline = Pipeline(
+        [Stage("fast", lambda job: None, 4), Stage("slow", Tracker(gate=gate), 1)],
+        queue.receive,
+        _make_job,
+        finished.append,
+        queue_size=1,
+        max_in_flight=5,
+        stats_interval=0,
+    )
+    seen = []
+
+    def watch():
+        seen.append(queue.received)
+        if len(seen) == 50:
+            gate.set()
+
+    asyncio.run(_run_until(pipeline, lambda: len(finished) == 50, during=watch))
+
+    # while "slow" was blocked only max_in_flight messages were taken from SQS
+    assert max(seen[:50]) == 5
+
+
+def test_failures_skip_to_the_always_stages():
+    calls = []
+
+    def parse(job):
+        if job["body"] == "bad":
+            raise ValueError("broken file")
+
+    stages = [
+        Stage("parse", parse, 1),
+        Stage("llm", lambda job: calls.append(("llm", job["body"])), 1),
+        Stage("store", lambda job: calls.append(("store", repr(job.get("error")))), 1, always=True),
+    ]
+
+    good = run_inline(stages, {"body": "good"})
+    bad = run_inline(stages, {"body": "bad"})
+
+    assert calls == [("llm", "good"), ("store", "None"), ("store", "ValueError('broken file')")]
+    assert "error" not in good and bad["failedStage"] == "parse"
+    assert stages[0].failed == 1 and stages[2].processed == 2
+
+
+def test_an_unreadable_message_is_discarded_and_the_loop_keeps_running():
+    finished, discarded = [], []
+
+    def make_job(msg):
+        if msg["Body"] == "garbage":
+            raise ValueError("not JSON")
+        return _make_job(msg)
+
+    queue = FakeQueue(["0", "garbage", "1", "2"])
+    pipeline = Pipeline(
+        [Stage("only", lambda job: None, 1)],
+        queue.receive,
+        make_job,
+        finished.append,
+        discard=discarded.append,
+        max_in_flight=2,
+        stats_interval=0,
+    )
+
+    asyncio.run(_run_until(pipeline, lambda: len(finished) == 3 and discarded))
+
+    assert [m["Body"] for m in discarded] == ["garbage"]
+    assert sorted(j["body"] for j in finished) == ["0", "1", "2"]
+    stats = pipeline.stats()
+    assert (stats["inFlight"], stats["discarded"]) == (0, 1)
+    # the discarded message gave its slot back
+    assert pipeline._slots._value == 2
@@ -0,0 +1,122 @@
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+# ================== Continuously fed SQS consumer ==================
+# One poller thread keeps up to `threads + prefetch` messages in flight. A
+# slot is taken per received message and given back as soon as that message
+# finishes, and the poller asks SQS for exactly as many messages as there are
+# free slots (max 10 per call). A slow OCR/LLM job then only holds its own
+# thread instead of stalling the next receive for the whole batch.
+# Prefetched messages wait in the executor queue with their visibility
+# timeout running, so keep WORKER_PREFETCH small relative to the timeout.
+
+SQS_MAX_MESSAGES = 10  # ReceiveMessage limit
+RECEIVE_ERROR_BACKOFF_SECONDS = 2
+
+
+class SqsConsumer:
+    """
+    `handler(message)` processes one SQS message; the message is deleted
+    when it returns and left for redelivery when it raises.
+    """
+
+    def __init__(
+        self,
+        sqs_client,
+        queue_url: str,
+        handler,
+        threads: int,
+        prefetch: int = 0,
+        wait_seconds: int = 10,
+    ):
+        self.sqs_client = sqs_client
+        self.queue_url = queue_url
+        self.handler = handler
+        self.threads = threads
+        self.capacity = threads + max(0, prefetch)
+        self.wait_seconds = wait_seconds
+        self._slots = threading.Semaphore(self.capacity)
+        self._stopping = threading.Event()
+        self._lock = threading.Lock()
+        self.in_flight = 0
+        self.processed = 0
+        self.failed = 0
+
+    # ---- slots ----
+    def _take_slots(self) -> int:
+        """Block for one free slot, then grab any others free right now."""
+        while not self._slots.acquire(timeout=1):
+            if self._stopping.is_set():
+                return 0
+        taken = 1
+        while taken < SQS_MAX_MESSAGES and self._slots.acquire(blocking=False):
+            taken += 1
+        return taken
+
+    def _release(self, n: int = 1):
+        for _ in range(n):
+            self._slots.release()
+
+    # ---- one message ----
+    def _run_one(self, message: dict):
+        ok = False
+        try:
+            self.handler(message)
+            # delete only if processing finished without raising
+            self.sqs_client.delete_message(
+                QueueUrl=self.queue_url,
+                ReceiptHandle=message["ReceiptHandle"],
+            )
+            ok = True
+        except Exception as e:
+            # we do NOT delete the message → SQS will retry after visibility timeout
+            print("[WORKER] Unexpected error in thread:", e)
+        finally:
+            with self._lock:
+                self.in_flight -= 1
+                if ok:
+                    self.processed += 1
+                else:
+                    self.failed += 1
+            self._release()
+
+    # ---- poller ----
+    def poll_once(self, executor) -> int:
+        """One ReceiveMessage sized to the free slots; returns messages submitted."""
+        taken = self._take_slots()
+        if not taken:
+            return 0
+        messages = []
+        try:
+            resp = self.sqs_client.receive_message(
+                QueueUrl=self.queue_url,
+                MaxNumberOfMessages=taken,
+                WaitTimeSeconds=self.wait_seconds,  # long-polling to reduce empty calls
+            )
+            messages = resp.get("Messages", [])
+        except Exception as e:
+            print("[WORKER] SQS receive failed:", e)
+            self._stopping.wait(RECEIVE_ERROR_BACKOFF_SECONDS)
+        finally:
+            self._release(taken - len(messages))
+
+        with self._lock:
+            self.in_flight += len(messages)
+        for m in messages:
+            executor.submit(self._run_one, m)
+        return len(messages)
+
+    def run(self):
+        """Poll until stop(); then let in-flight messages finish."""
+        print(f"[WORKER] Consumer: {self.threads} threads, "
+              f"up to {self.capacity} messages in flight")
+        with ThreadPoolExecutor(
+            max_workers=self.threads, thread_name_prefix="worker"
+        ) as executor:
+            while not self._stopping.is_set():
+                self.poll_once(executor)
+            print(f"[WORKER] Stopping, waiting for {self.in_flight} in-flight messages")
+        print(f"[WORKER] Consumer stopped: {self.processed} processed, {self.failed} failed")
+
+    def stop(self):
+        self._stopping.set()
@@ -0,0 +1,203 @@
+import multiprocessing
+import os
+import signal
+import threading
+from concurrent.futures import ProcessPoolExecutor, TimeoutError as FutureTimeout
+from concurrent.futures.process import BrokenProcessPool
+
+# extract libs
+import PyPDF2
+import pytesseract
+from PIL import Image
+import docx
+import pandas as pd
+
+
+# ================== Extraction Helpers ==================
+def extract_pdf_text(fpath):
+    with open(fpath, "rb") as f:
+        reader = PyPDF2.PdfReader(f)
+        text = ""
+        for page in reader.pages:
+            text += page.extract_text() or ""
+        return {
+            "text": text[:5000],   # limit size for DB
+            "pageCount": len(reader.pages),
+        }
+
+
+def extract_image_text(fpath):
+    img = Image.open(fpath)
+    text = pytesseract.image_to_string(img)
+    return {
+        "text": text[:5000],
+        "pageCount": 1,
+    }
+
+
+def extract_docx_text(fpath):
+    document = docx.Document(fpath)
+    full_text = "\n".join(p.text for p in document.paragraphs)
+    return {
+        "text": full_text[:5000],
+        "pageCount": None,
+    }
+
+
+def extract_csv_info(fpath):
+    df = pd.read_csv(fpath, nrows=5)
+    return {
+        "columns": df.columns.tolist(),
+        "sampleRows": df.head(3).to_dict(),
+        "pageCount": None,
+    }
+
+
+def extract_file(file_path: str, file_type: str) -> dict:
+    """Text (or CSV sample) of one file; runs in a pool process in process mode."""
+    if file_type == "application/pdf":
+        return extract_pdf_text(file_path)
+    elif file_type in ["image/jpeg", "image/png"]:
+        return extract_image_text(file_path)
+    elif file_type == "application/vnd.openxmlformats-officedocument.wordprocessingml.document":
+        return extract_docx_text(file_path)
+    elif file_type == "text/csv":
+        return extract_csv_info(file_path)
+    else:
+        return {"text": "Unsupported format", "pageCount": None}
+
+
+# ================== Process pool ==================
+# PyPDF2 parsing and the Python side of OCR/docx hold the GIL, so extraction
+# on the worker's thread pool gets about one core whatever WORKER_THREADS is.
+# With EXTRACTION_MODE=process, run_extraction hands (path, file type) to a
+# pool of EXTRACTION_PROCESSES long-lived processes (default: the CPUs this
+# process may use) and gets the result dict back; file bytes never cross the
+# boundary, the child reads the temp file itself.
+# The pool forks: spawned (and forkserver) children re-import the main
+# module, i.e. re-run worker.py's module code (clients, engine, config
+# prints). start() launches every process up front, before the consumer
+# threads exist, and they are reused for the life of the worker.
+#
+# Restarts are the exception. When a child dies (a parser crash) every job
+# in flight on that pool fails with BrokenProcessPool; the pool is replaced
+# and each of those jobs is retried once on the new one, so only a job that
+# breaks the pool twice fails. A job over EXTRACTION_TIMEOUT_SECONDS kills
+# the pool (its process cannot be freed otherwise) and fails; its
+# neighbours are retried the same way. The replacement pool is forked from
+# a consumer thread while other threads run, so a lock another thread held
+# at that moment (boto3, redis, SQLAlchemy, stdout) stays held in the
+# children. They only ever run extract_file, which touches none of those,
+# and CPython re-initialises the import, logging and threading locks after
+# fork - keep it that way when changing what runs in the pool.
+
+EXTRACTION_MODE = os.getenv("EXTRACTION_MODE", "thread").lower()  # thread | process
+
+
+def _usable_cpus() -> int:
+    try:
+        return len(os.sched_getaffinity(0))  # honours container CPU sets
+    except AttributeError:
+        return os.cpu_count() or 1
+
+
+EXTRACTION_PROCESSES = int(os.getenv("EXTRACTION_PROCESSES", "0")) or _usable_cpus()
+# a parser hung on one file must not pin a consumer thread forever
+EXTRACTION_TIMEOUT_SECONDS = float(os.getenv("EXTRACTION_TIMEOUT_SECONDS", "300"))
+
+
+def _ready(_: int) -> int:
+    return os.getpid()
+
+
+def _report_pid(pids):
+    """Pool initializer: tell the parent which pid to kill on a timeout."""
+    pids.put(os.getpid())
+
+
+class ExtractionPool:
+    def __init__(
+        self,
+        processes: int = EXTRACTION_PROCESSES,
+        timeout: float = EXTRACTION_TIMEOUT_SECONDS,
+    ):
+        self.processes = processes
+        self.timeout = timeout
+        self._lock = threading.Lock()
+        self._executor: ProcessPoolExecutor | None = None
+        # executor -> queue its children report their pids on
+        self._pid_queues: dict[ProcessPoolExecutor, object] = {}
+        self.restarts = 0
+
+    def _get(self) -> ProcessPoolExecutor:
+        with self._lock:
+            if self._executor is None:
+                context = multiprocessing.get_context("fork")
+                pids = context.SimpleQueue()
+                self._executor = ProcessPoolExecutor(
+                    max_workers=self.processes,
+                    mp_context=context,
+                    initializer=_report_pid,
+                    initargs=(pids,),
+                )
+                self._pid_queues[self._executor] = pids
+            return self._executor
+
+    def start(self) -> list[int]:
+        """Launch the processes now; returns their pids."""
+        executor = self._get()
+        pids = sorted(set(executor.map(_ready, range(self.processes))))
+        print(f"[WORKER] Extraction pool ready: {self.processes} processes")
+        return pids
+
+    def run(self, file_path: str, file_type: str) -> dict:
+        for attempt in (1, 2):
+            executor = self._get()
+            try:
+                future = executor.submit(extract_file, file_path, file_type)
+                return future.result(timeout=self.timeout)
+            except FutureTimeout:
+                print(f"[WORKER] Extraction of {file_path} took over {self.timeout:.0f}s, "
+                      "restarting the pool")
+                self._discard(executor, kill=True)
+                raise
+            except BrokenProcessPool:
+                # a child died, maybe on another job: retry this one once
+                self._discard(executor)
+                if attempt == 2:
+                    raise
+                print("[WORKER] Extraction process died, retrying on a new pool")
+
+    def _discard(self, executor: ProcessPoolExecutor, kill: bool = False):
+        with self._lock:
+            if self._executor is not executor:
+                return  # another thread replaced it already
+            self._executor = None
+            self.restarts += 1
+            pids = self._pid_queues.pop(executor)
+        if kill:
+            # a busy child ignores shutdown(); kill every pid the pool reported
+            while not pids.empty():
+                try:
+                    os.kill(pids.get(), signal.SIGKILL)
+                except ProcessLookupError:
+                    pass
+        executor.shutdown(wait=False, cancel_futures=True)
+        pids.close()
+
+    def shutdown(self):
+        with self._lock:
+            executor, self._executor = self._executor, None
+            pids = self._pid_queues.pop(executor, None)
+        if executor is not None:
+            executor.shutdown(wait=True)
+            pids.close()
+
+
+pool = ExtractionPool()
+
+
+def run_extraction(file_path: str, file_type: str) -> dict:
+    if EXTRACTION_MODE == "process":
+        return pool.run(file_path, file_type)
+    return extract_file(file_path, file_type)
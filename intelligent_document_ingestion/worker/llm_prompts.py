@@ -1,3 +1,6 @@
+from datetime import datetime
+
+
 def build_metadata_prompt(doc_type: str, text: str, page_count: int | None) -> str:
     base = f"Document type: {doc_type}\nPage count: {page_count}\n\n"
     base += "You must return ONLY valid JSON, no explanation.\n"
@@ -112,3 +115,14 @@ Return this JSON:
 
 Text:
 \"\"\"""" + text[:8000] + "\"\"\""
+
+
+def metadata_record(ai_meta: dict, text: str, page_count: int | None) -> dict:
+    """What the worker stores in extracted_metadata for one LLM answer."""
+    return {
+        "processedAt": datetime.utcnow().isoformat() + "Z",
+        "documentType": ai_meta.get("documentType", "unknown"),
+        "llmMetadata": ai_meta,
+        "textPreview": text[:1000],
+        "pageCount": page_count,
+    }
@@ -0,0 +1,266 @@
+import asyncio
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+# ================== Staged asyncio pipeline ==================
+# WORKER_MODE=pipeline. A job (one SQS message, a dict) flows through the
+# stages in order; stage i has its own thread pool of `concurrency` threads
+# and its own asyncio workers feeding it, with a bounded queue in front. When
+# a stage is saturated its queue fills, the previous stage's workers block on
+# put(), and so on back to the SQS poller, which only receives as many
+# messages as there are free in-flight slots.
+#
+# Stage functions take the job and update it in place. If one raises, the
+# exception is stored as job["error"] and the remaining stages are skipped
+# except those marked `always` (cleanup / final DB write); a stage may also
+# set job["skip"] to end the job early. `run_inline` applies the same rules
+# sequentially, which is what the thread-pool mode uses.
+
+SQS_MAX_MESSAGES = 10  # ReceiveMessage limit
+RECEIVE_ERROR_BACKOFF_SECONDS = 2
+
+
+class Stage:
+    def __init__(self, name: str, fn, concurrency: int, always: bool = False):
+        self.name = name
+        self.fn = fn
+        self.concurrency = max(1, concurrency)
+        self.always = always
+        self._lock = threading.Lock()
+        self.busy = 0
+        self.processed = 0
+        self.failed = 0
+        self.seconds = 0.0
+
+    def wanted(self, job: dict) -> bool:
+        return self.always or not (job.get("error") or job.get("skip"))
+
+    def call(self, job: dict):
+        """Run the stage on `job`, recording a failure in the job."""
+        started = time.perf_counter()
+        ok = False
+        try:
+            self.fn(job)
+            ok = True
+        except Exception as e:
+            print(f"[WORKER] Stage {self.name} failed:", e)
+            job["error"] = e
+            job["failedStage"] = self.name
+        finally:
+            with self._lock:
+                self.seconds += time.perf_counter() - started
+                if ok:
+                    self.processed += 1
+                else:
+                    self.failed += 1
+
+
+def run_inline(stages, job: dict) -> dict:
+    """All stages on the calling thread, same skip rules as the pipeline."""
+    for stage in stages:
+        if stage.wanted(job):
+            stage.call(job)
+    return job
+
+
+class Pipeline:
+    """
+    `receive(n)` returns up to n SQS messages (blocking long poll),
+    `make_job(message)` turns one into a job dict and `finish(job)` runs
+    after the last stage (acknowledge / delete). The three run on threads.
+    A message `make_job` raises on never enters the stages; it is passed to
+    `discard(message)` if given, otherwise left for redelivery.
+    """
+
+    def __init__(
+        self,
+        stages,
+        receive,
+        make_job,
+        finish,
+        discard=None,
+        queue_size: int = 8,
+        max_in_flight: int | None = None,
+        stats_interval: float = 30,
+    ):
+        self.stages = list(stages)
+        self.receive = receive
+        self.make_job = make_job
+        self.finish = finish
+        self.discard = discard
+        self.queue_size = queue_size
+        self.max_in_flight = max_in_flight or (
+            sum(s.concurrency for s in self.stages) + queue_size
+        )
+        self.stats_interval = stats_interval
+        self.in_flight = 0
+        self.completed = 0
+        self.discarded = 0
+        self._queues: list[asyncio.Queue] = []
+        self._stopping: asyncio.Event | None = None
+        self._last_report = (time.monotonic(), {})
+
+    # ---- visibility ----
+    def stats(self) -> dict:
+        return {
+            "inFlight": self.in_flight,
+            "maxInFlight": self.max_in_flight,
+            "completed": self.completed,
+            "discarded": self.discarded,
+            "stages": [
+                {
+                    "name": s.name,
+                    "queued": q.qsize(),
+                    "busy": s.busy,
+                    "concurrency": s.concurrency,
+                    "processed": s.processed,
+                    "failed": s.failed,
+                    "avgSeconds": round(s.seconds / max(1, s.processed + s.failed), 3),
+                }
+                for s, q in zip(self.stages, self._queues)
+            ],
+        }
+
+    def report(self):
+        """Log queue depth, busy threads and throughput per stage."""
+        now = time.monotonic()
+        since, before = self._last_report
+        elapsed = max(now - since, 1e-9)
+        stats = self.stats()
+        parts = []
+        for st in stats["stages"]:
+            done = st["processed"] + st["failed"]
+            rate = (done - before.get(st["name"], 0)) / elapsed
+            parts.append(
+                f"{st['name']} q={st['queued']}/{self.queue_size} "
+                f"busy={st['busy']}/{st['concurrency']} {rate:.2f}/s"
+            )
+        print(f"[WORKER] pipeline in_flight={stats['inFlight']}/{self.max_in_flight} | "
+              + " | ".join(parts))
+        self._last_report = (
+            now,
+            {st["name"]: st["processed"] + st["failed"] for st in stats["stages"]},
+        )
+
+    # ---- tasks ----
+    async def _stage_worker(self, i: int, executor):
+        stage, queue = self.stages[i], self._queues[i]
+        loop = asyncio.get_running_loop()
+        while True:
+            job = await queue.get()
+            try:
+                if stage.wanted(job):
+                    stage.busy += 1
+                    try:
+                        await loop.run_in_executor(executor, stage.call, job)
+                    finally:
+                        stage.busy -= 1
+                if i + 1 < len(self.stages):
+                    await self._queues[i + 1].put(job)  # blocks while the next stage is full
+                else:
+                    await self._finish(job)
+            finally:
+                queue.task_done()
+
+    async def _finish(self, job: dict):
+        try:
+            await asyncio.get_running_loop().run_in_executor(self._io, self.finish, job)
+        except Exception as e:
+            print("[WORKER] Finishing job failed:", e)
+        self.in_flight -= 1
+        self.completed += 1
+        self._slots.release()
+
+    async def _discard(self, message: dict, error: Exception):
+        print("[WORKER] Dropping unreadable message:", error)
+        self.discarded += 1
+        if self.discard is not None:
+            try:
+                await asyncio.get_running_loop().run_in_executor(
+                    self._io, self.discard, message
+                )
+            except Exception as e:
+                print("[WORKER] Discarding message failed:", e)
+
+    async def _admit(self, message: dict):
+        """Hand one received message (holding one slot) to the first stage."""
+        try:
+            job = self.make_job(message)
+        except Exception as e:
+            self._slots.release()
+            await self._discard(message, e)
+            return
+        self.in_flight += 1
+        try:
+            await self._queues[0].put(job)
+        except BaseException:
+            self.in_flight -= 1
+            self._slots.release()
+            raise
+
+    async def _poll(self):
+        loop = asyncio.get_running_loop()
+        while not self._stopping.is_set():
+            await self._slots.acquire()
+            if self._stopping.is_set():
+                self._slots.release()
+                break
+            taken = 1
+            while taken < SQS_MAX_MESSAGES and not self._slots.locked():
+                await self._slots.acquire()
+                taken += 1
+            messages = []
+            try:
+                messages = await loop.run_in_executor(self._receiver, self.receive, taken)
+            except Exception as e:
+                print("[WORKER] SQS receive failed:", e)
+                await asyncio.sleep(RECEIVE_ERROR_BACKOFF_SECONDS)
+            for _ in range(taken - len(messages)):
+                self._slots.release()
+            for m in messages:
+                await self._admit(m)
+
+    async def _report_loop(self):
+        while True:
+            await asyncio.sleep(self.stats_interval)
+            self.report()
+
+    async def run(self):
+        """Poll and process until stop(); then drain what was received."""
+        self._stopping = asyncio.Event()
+        self._slots = asyncio.Semaphore(self.max_in_flight)
+        self._queues = [asyncio.Queue(maxsize=self.queue_size) for _ in self.stages]
+        self._receiver = ThreadPoolExecutor(1, thread_name_prefix="sqs-receive")
+        self._io = ThreadPoolExecutor(4, thread_name_prefix="sqs-ack")
+        executors = [
+            ThreadPoolExecutor(s.concurrency, thread_name_prefix=f"stage-{s.name}")
+            for s in self.stages
+        ]
+        workers = [
+            asyncio.create_task(self._stage_worker(i, executors[i]))
+            for i, s in enumerate(self.stages)
+            for _ in range(s.concurrency)
+        ]
+        reporter = asyncio.create_task(self._report_loop()) if self.stats_interval else None
+        print("[WORKER] Pipeline: " + ", ".join(
+            f"{s.name}×{s.concurrency}" for s in self.stages
+        ) + f"; up to {self.max_in_flight} messages in flight")
+
+        try:
+            # the poller returns once stop() is set and its receive is back
+            await self._poll()
+            for q in self._queues:  # jobs only move forward, so drain in order
+                await q.join()
+        finally:
+            for t in workers + ([reporter] if reporter else []):
+                t.cancel()
+            await asyncio.gather(*workers, return_exceptions=True)
+            for ex in executors + [self._receiver, self._io]:
+                ex.shutdown(wait=True)
+            self.report()
+            print(f"[WORKER] Pipeline stopped after {self.completed} jobs")
+
+    def stop(self):
+        if self._stopping is not None:
+            self._stopping.set()
@@ -1,10 +1,14 @@
 import os
+import sys
 import json
+import hashlib
 from datetime import datetime
+import asyncio
+import signal
 import tempfile
-from concurrent.futures import ThreadPoolExecutor, as_completed
 
 import boto3
+import redis
 from sqlalchemy import (
     create_engine, Column, String, DateTime, Text, Integer, JSON
 )
@@ -13,14 +17,22 @@ from dotenv import load_dotenv
 
 import google.generativeai as genai
 
-# extract libs
-import PyPDF2
-import pytesseract
-from PIL import Image
-import docx
-import pandas as pd
-
-from llm_prompts import build_metadata_prompt
+import extraction
+from consumer import SqsConsumer
+from extraction import run_extraction
+from pipeline import Pipeline, Stage, run_inline
+from llm_prompts import build_metadata_prompt, metadata_record
+
+# status_cache / presign_cache (and their metrics) and events are the backend's
+# modules, so both sides build status entries and channel names the same way.
+# The Docker image copies them next to this file; from a checkout they are
+# imported in place.
+sys.path.append(
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "file-processing-backend")
+)
+from presign_cache import PresignedUrlCache  # noqa: E402
+from status_cache import status_entry, status_key, ttl_for  # noqa: E402
+from events import status_channel  # noqa: E402
 
 
 # ================== Env + Config ==================
@@ -34,6 +46,14 @@ GOOGLE_API_KEY = os.getenv("GOOGLE_API_KEY")
 
 # Thread pool for parallel message processing inside one worker process
 MAX_WORKER_THREADS = int(os.getenv("WORKER_THREADS", "5"))
+# messages received ahead of a free thread, so one is ready the moment a job ends
+WORKER_PREFETCH = int(os.getenv("WORKER_PREFETCH", "2"))
+SQS_WAIT_SECONDS = int(os.getenv("SQS_WAIT_SECONDS", "10"))
+# "threads": every message runs all stages on one pool thread (SqsConsumer);
+# "pipeline": asyncio pipeline with a concurrency limit per stage (pipeline.py)
+WORKER_MODE = os.getenv("WORKER_MODE", "threads").lower()
+# reuse the metadata of the user's earlier completed upload of the same bytes
+WORKER_DEDUP = os.getenv("WORKER_DEDUP", "true").lower() == "true"
 
 print("[WORKER] Starting with config:")
 print("  S3 Bucket:", S3_BUCKET_NAME)
@@ -41,6 +61,9 @@ print("  AWS Region:", AWS_REGION)
 print("  Database URL:", DATABASE_URL)
 print("  SQS Queue URL:", SQS_QUEUE_URL)
 print("  Worker threads:", MAX_WORKER_THREADS)
+print("  Prefetch:", WORKER_PREFETCH)
+print("  Mode:", WORKER_MODE)
+print("  Extraction:", extraction.EXTRACTION_MODE)
 
 # ---------- DB engine with pooling (safe for concurrency) ----------
 engine = create_engine(
@@ -67,6 +90,9 @@ class Document(Base):
     s3_key = Column(String)
     error = Column(Text, nullable=True)
     extracted_metadata = Column(JSON, nullable=True)  # flexible for demo
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    content_sha256 = Column(String(64), nullable=True)
+    document_type = Column(String, nullable=True)  # indexed copy for search
 
 
 # ---------- AWS clients ----------
@@ -74,6 +100,55 @@ print("[WORKER] Setting up AWS clients.")
 s3_client = boto3.client("s3", region_name=AWS_REGION)
 sqs_client = boto3.client("sqs", region_name=AWS_REGION)
 
+# ---------- Optional Redis (status push to the backend) ----------
+REDIS_HOST = os.getenv("REDIS_HOST")
+REDIS_PORT = int(os.getenv("REDIS_PORT", "6379"))
+redis_client: redis.Redis | None = None
+
+if REDIS_HOST:
+    try:
+        redis_client = redis.Redis(
+            host=REDIS_HOST,
+            port=REDIS_PORT,
+            decode_responses=True,
+        )
+        redis_client.ping()
+        print(f"[WORKER] Connected to Redis at {REDIS_HOST}:{REDIS_PORT}")
+    except Exception as e:
+        print("[WORKER] Redis unavailable, status push disabled:", e)
+        redis_client = None
+
+
+# Status cache entries are read by the backend's get_status; both build them
+# with status_cache.status_entry. Download URLs go through the same
+# PresignedUrlCache (and presign:* keys), so a URL the worker signed is the
+# one the backend hands out, and the entry TTL stops short of its expiry.
+presigned_urls = PresignedUrlCache(
+    lambda **kwargs: s3_client.generate_presigned_url(**kwargs), redis_client
+)
+
+
+def publish_status(doc: "Document"):
+    """Write the committed status through to the backend's cache and push
+    the transition to subscribers.
+
+    Channel name must match `events.status_channel` in the backend.
+    """
+    if not redis_client:
+        return
+    payload = status_entry(doc, presigned_urls, S3_BUCKET_NAME)
+    try:
+        pipe = redis_client.pipeline(transaction=False)
+        pipe.set(status_key(doc.file_id), json.dumps(payload), ex=ttl_for(payload))
+        pipe.publish(
+            status_channel(doc.file_id),
+            json.dumps({"fileId": doc.file_id, "status": doc.status, "error": doc.error}),
+        )
+        pipe.execute()
+    except Exception as e:
+        print("[WORKER] Redis publish error:", e)
+
+
 # ---------- Gemini model ----------
 print("[WORKER] Setting up Gemini model.")
 if GOOGLE_API_KEY:
@@ -154,7 +229,11 @@ Document text (partial):
 
 
 def extract_structured_metadata(text: str, page_count: int | None) -> dict:
-    doc_type = classify_document_type(text)
+    return structured_metadata_for(classify_document_type(text), text, page_count)
+
+
+def structured_metadata_for(doc_type: str, text: str, page_count: int | None) -> dict:
+    """Metadata LLM call for an already classified document."""
     if doc_type == "To be supported":
         return {
             "documentType": "To be supported",
@@ -175,160 +254,271 @@ def extract_structured_metadata(text: str, page_count: int | None) -> dict:
     return meta
 
 
-# ================== Extraction Helpers ==================
-def extract_pdf_text(fpath):
-    with open(fpath, "rb") as f:
-        reader = PyPDF2.PdfReader(f)
-        text = ""
-        for page in reader.pages:
-            text += page.extract_text() or ""
-        return {
-            "text": text[:5000],   # limit size for DB
-            "pageCount": len(reader.pages),
-        }
+# ================== Content hash / dedup ==================
+def file_sha256(path: str) -> str:
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+def record_content_hash(doc: "Document", digest: str):
+    """Store the real hash; a wrong client-supplied one must not feed dedup."""
+    if doc.content_sha256 and doc.content_sha256 != digest:
+        print(f"[WORKER] {doc.file_id}: client sha256 {doc.content_sha256} "
+              f"does not match content {digest}, keeping the computed one")
+    doc.content_sha256 = digest
+
+
+def find_processed_duplicate(db, doc: "Document") -> "Document | None":
+    """The user's newest completed document with the same content."""
+    return (
+        db.query(Document)
+        .filter(
+            Document.user_id == doc.user_id,
+            Document.content_sha256 == doc.content_sha256,
+            Document.status == "completed",
+            Document.file_id != doc.file_id,
+        )
+        .order_by(Document.completed_time.desc())
+        .first()
+    )
 
 
-def extract_image_text(fpath):
-    img = Image.open(fpath)
-    text = pytesseract.image_to_string(img)
-    return {
-        "text": text[:5000],
-        "pageCount": 1,
-    }
+# ================== Core Processing ==================
+# One message is a job dict passed through these stages in order:
+# download -> extract -> classify -> metadata -> store. In WORKER_MODE=threads
+# they run back to back on one pool thread (process_message); in
+# WORKER_MODE=pipeline each stage has its own concurrency limit. A stage that
+# raises marks the job failed and only `store` (always=True) still runs.
+def stage_download(job: dict):
+    """Claim the document, fetch the file, hash it, look for a duplicate."""
+    body = job["body"]
+    file_id = body["fileId"]
+    job["fileId"] = file_id
+    print("[WORKER] Processing message:", body)
 
+    db = SessionLocal()
+    try:
+        doc = db.query(Document).filter(Document.file_id == file_id).first()
+        if not doc:
+            print("[WORKER] Document not found in DB for file_id:", file_id)
+            job["skip"] = job["settled"] = True
+            return
 
-def extract_docx_text(fpath):
-    document = docx.Document(fpath)
-    full_text = "\n".join(p.text for p in document.paragraphs)
-    return {
-        "text": full_text[:5000],
-        "pageCount": None,
-    }
+        doc.status = "processing"
+        db.commit()
+        publish_status(doc)
+        job["fileType"] = doc.file_type
 
+        # download to temp file
+        tmp = tempfile.NamedTemporaryFile(delete=False)
+        job["path"] = tmp.name
+        tmp.close()
+        s3_client.download_file(
+            Bucket=body["s3Location"]["bucket"],
+            Key=body["s3Location"]["key"],
+            Filename=job["path"],
+        )
 
-def extract_csv_info(fpath):
-    df = pd.read_csv(fpath, nrows=5)
-    return {
-        "columns": df.columns.tolist(),
-        "sampleRows": df.head(3).to_dict(),
-        "pageCount": None,
-    }
+        job["sha256"] = file_sha256(job["path"])
+        record_content_hash(doc, job["sha256"])  # not committed; store writes it
+        source = find_processed_duplicate(db, doc) if WORKER_DEDUP else None
+        if source is not None and source.extracted_metadata:
+            # same bytes already went through extraction + LLM
+            print(f"[WORKER] {file_id} duplicates {source.file_id}, reusing its metadata")
+            job["metadata"] = {**source.extracted_metadata, "deduplicatedFrom": source.file_id}
+    finally:
+        db.close()
 
 
-def run_extraction(file_path: str, file_type: str) -> dict:
-    if file_type == "application/pdf":
-        return extract_pdf_text(file_path)
-    elif file_type in ["image/jpeg", "image/png"]:
-        return extract_image_text(file_path)
-    elif file_type == "application/vnd.openxmlformats-officedocument.wordprocessingml.document":
-        return extract_docx_text(file_path)
-    elif file_type == "text/csv":
-        return extract_csv_info(file_path)
-    else:
-        return {"text": "Unsupported format", "pageCount": None}
+def _remove_download(job: dict):
+    path = job.pop("path", None)
+    if path and os.path.exists(path):
+        os.remove(path)
 
 
-# ================== Core Processing ==================
-def process_message(body: dict):
-    """Process one SQS message: download -> extract -> LLM -> update DB."""
-    print("[WORKER] Processing message:", body)
-    file_id = body["fileId"]
-    s3_info = body["s3Location"]
-    bucket = s3_info["bucket"]
-    key = s3_info["key"]
+def stage_extract(job: dict):
+    if "metadata" in job:
+        return
+    try:
+        extracted = run_extraction(job["path"], job["fileType"])  # {"text": ..., "pageCount": ...}
+    finally:
+        _remove_download(job)
+    job["text"] = extracted.get("text", "") or ""
+    job["pageCount"] = extracted.get("pageCount")
 
-    db = SessionLocal()
-    doc = db.query(Document).filter(Document.file_id == file_id).first()
-    if not doc:
-        db.close()
-        print("[WORKER] Document not found in DB for file_id:", file_id)
+
+def stage_classify(job: dict):
+    if "metadata" in job:
         return
+    job["documentType"] = classify_document_type(job["text"])
 
-    doc.status = "processing"
-    db.commit()
 
-    try:
-        # download to temp file
-        tmp = tempfile.NamedTemporaryFile(delete=False)
-        tmp_path = tmp.name
-        tmp.close()
+def stage_metadata(job: dict):
+    if "metadata" in job:
+        return
+    text, page_count = job["text"], job["pageCount"]
+    ai_meta = structured_metadata_for(job["documentType"], text, page_count)
+    job["metadata"] = metadata_record(ai_meta, text, page_count)
 
-        try:
-            s3_client.download_file(Bucket=bucket, Key=key, Filename=tmp_path)
-            extracted = run_extraction(tmp_path, doc.file_type)  # {"text": ..., "pageCount": ...}
-            text = extracted.get("text", "") or ""
-            page_count = extracted.get("pageCount")
-
-            ai_meta = extract_structured_metadata(text, page_count)
-
-            metadata = {
-                "processedAt": datetime.utcnow().isoformat() + "Z",
-                "documentType": ai_meta.get("documentType", "unknown"),
-                "llmMetadata": ai_meta,
-                "textPreview": text[:1000],
-                "pageCount": page_count,
-            }
-        finally:
-            if os.path.exists(tmp_path):
-                os.remove(tmp_path)
-
-        doc.status = "completed"
-        doc.completed_time = datetime.utcnow()
-        doc.extracted_metadata = metadata
-        doc.error = None
-        db.commit()
-        print(f"[OK] Real processing done for {file_id}")
 
-    except Exception as e:
-        print(f"[ERROR] {file_id} failed: {e}")
-        doc.status = "failed"
-        doc.error = str(e)
+def stage_store(job: dict):
+    """Write the outcome (completed or failed) and push the status."""
+    _remove_download(job)
+    if job.get("skip"):
+        return
+    file_id = job["fileId"]
+    db = SessionLocal()
+    try:
+        doc = db.query(Document).filter(Document.file_id == file_id).first()
+        if not doc:
+            job["settled"] = True
+            return
+        doc.content_sha256 = job.get("sha256", doc.content_sha256)
+        error = job.get("error")
+        if error is None:
+            metadata = job["metadata"]
+            doc.status = "completed"
+            doc.completed_time = datetime.utcnow()
+            doc.extracted_metadata = metadata
+            doc.document_type = metadata.get("documentType")
+            doc.error = None
+        else:
+            print(f"[ERROR] {file_id} failed: {error}")
+            doc.status = "failed"
+            doc.error = str(error)
         db.commit()
-
+        publish_status(doc)
+        job["settled"] = True
+        if error is None:
+            print(f"[OK] Real processing done for {file_id}")
     finally:
         db.close()
 
 
+WORKER_STAGES = [
+    # S3 + short DB queries
+    Stage("download", stage_download, int(os.getenv("WORKER_DOWNLOAD_CONCURRENCY", "16"))),
+    # CPU (PDF parsing, OCR); one per pool process in EXTRACTION_MODE=process
+    Stage(
+        "extract",
+        stage_extract,
+        int(os.getenv("WORKER_EXTRACT_CONCURRENCY", "0"))
+        or (extraction.EXTRACTION_PROCESSES if extraction.EXTRACTION_MODE == "process" else 2),
+    ),
+    # Gemini
+    Stage("classify", stage_classify, int(os.getenv("WORKER_LLM_CONCURRENCY", "8"))),
+    Stage("metadata", stage_metadata, int(os.getenv("WORKER_LLM_CONCURRENCY", "8"))),
+    # final DB write
+    Stage("store", stage_store, int(os.getenv("WORKER_DB_CONCURRENCY", "4")), always=True),
+]
+
+
+def process_message(body: dict):
+    """Process one SQS message: download -> extract -> LLM -> update DB."""
+    job = run_inline(WORKER_STAGES, {"body": body})
+    if not job.get("settled"):
+        # the outcome never reached the DB: leave the message for redelivery
+        raise RuntimeError(f"{body.get('fileId')} not processed: {job.get('error')}")
+
+
 # ================== SQS Main Loop (with thread pool) ==================
+class MalformedMessage(ValueError):
+    """A message body no redelivery can fix."""
+
+
+def _parse_body(msg: dict) -> dict:
+    try:
+        body = json.loads(msg["Body"])
+    except (KeyError, TypeError, ValueError) as e:
+        raise MalformedMessage(f"{msg.get('MessageId')}: unreadable body ({e})") from e
+    if not isinstance(body, dict) or "fileId" not in body:
+        raise MalformedMessage(f"{msg.get('MessageId')}: no fileId in body")
+    return body
+
+
 def _handle_sqs_message(msg: dict):
     """Wrapper to process an SQS message (for thread pool)."""
-    body = json.loads(msg["Body"])
+    try:
+        body = _parse_body(msg)
+    except MalformedMessage as e:
+        # returning lets the consumer delete it instead of redelivering it forever
+        print("[WORKER] Dropping unreadable message:", e)
+        return
     process_message(body)
-    return msg["ReceiptHandle"]
 
 
-def main():
+def run_threads():
     print("[WORKER] Running with REAL extraction + thread pool.")
-    print("[WORKER] Listening to SQS queue:", SQS_QUEUE_URL)
+    consumer = SqsConsumer(
+        sqs_client,
+        SQS_QUEUE_URL,
+        _handle_sqs_message,
+        threads=MAX_WORKER_THREADS,
+        prefetch=WORKER_PREFETCH,
+        wait_seconds=SQS_WAIT_SECONDS,
+    )
+    # finish in-flight jobs on shutdown instead of leaving them to time out
+    for sig in (signal.SIGTERM, signal.SIGINT):
+        signal.signal(sig, lambda *_: consumer.stop())
+    consumer.run()
+
+
+# ================== SQS Main Loop (staged pipeline) ==================
+def _receive(n: int) -> list[dict]:
+    resp = sqs_client.receive_message(
+        QueueUrl=SQS_QUEUE_URL,
+        MaxNumberOfMessages=n,
+        WaitTimeSeconds=SQS_WAIT_SECONDS,  # long-polling to reduce empty calls
+    )
+    return resp.get("Messages", [])
+
+
+def _make_job(msg: dict) -> dict:
+    return {"message": msg, "body": _parse_body(msg)}
+
+
+def _delete_message(msg: dict):
+    sqs_client.delete_message(QueueUrl=SQS_QUEUE_URL, ReceiptHandle=msg["ReceiptHandle"])
+
+
+def _finish_job(job: dict):
+    # delete only once the outcome is in the DB; otherwise SQS redelivers
+    if job.get("settled"):
+        _delete_message(job["message"])
+
+
+async def run_pipeline():
+    pipeline = Pipeline(
+        WORKER_STAGES,
+        _receive,
+        _make_job,
+        _finish_job,
+        discard=_delete_message,  # unreadable bodies, same as the thread-pool mode
+        queue_size=int(os.getenv("WORKER_STAGE_QUEUE_SIZE", "8")),
+        max_in_flight=int(os.getenv("WORKER_PIPELINE_MAX_IN_FLIGHT", "0")) or None,
+        stats_interval=float(os.getenv("WORKER_STATS_INTERVAL_SECONDS", "30")),
+    )
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGTERM, signal.SIGINT):
+        loop.add_signal_handler(sig, pipeline.stop)
+    await pipeline.run()
 
-    executor = ThreadPoolExecutor(max_workers=MAX_WORKER_THREADS)
-
-    while True:
-        resp = sqs_client.receive_message(
-            QueueUrl=SQS_QUEUE_URL,
-            MaxNumberOfMessages=10,   # pull more per batch
-            WaitTimeSeconds=10,       # long-polling to reduce empty calls
-        )
 
-        messages = resp.get("Messages", [])
-        if not messages:
-            continue
-
-        futures = {executor.submit(_handle_sqs_message, m): m for m in messages}
-
-        for fut in as_completed(futures):
-            msg = futures[fut]
-            try:
-                receipt_handle = fut.result()
-                # delete only if processing finished without raising
-                sqs_client.delete_message(
-                    QueueUrl=SQS_QUEUE_URL,
-                    ReceiptHandle=receipt_handle,
-                )
-            except Exception as e:
-                # process_message already handles its own errors, so this is defensive
-                print("[WORKER] Unexpected error in thread:", e)
-                # we do NOT delete the message → SQS will retry after visibility timeout
+def main():
+    print("[WORKER] Listening to SQS queue:", SQS_QUEUE_URL)
+    if extraction.EXTRACTION_MODE == "process":
+        # fork the extraction processes before any consumer thread exists
+        extraction.pool.start()
+    try:
+        if WORKER_MODE == "pipeline":
+            asyncio.run(run_pipeline())
+        else:
+            run_threads()
+    finally:
+        extraction.pool.shutdown()
 
 
 if __name__ == "__main__":